@@ -0,0 +1,68 @@
+"""
+Measure memory footprint of in-memory trees per appended entry.
+"""
+
+import sys
+import argparse
+import gc
+import tracemalloc
+
+from pymerkle import InmemoryTree, CompactTree, constants
+
+DEFAULT_ALGORITHM = 'sha256'
+DEFAULT_SIZE = 10 ** 5
+
+
+def parse_cli_args():
+    config = {'prog': sys.argv[0], 'usage': 'python %s' % sys.argv[0],
+              'description': __doc__, 'epilog': '\n',
+              'formatter_class': argparse.ArgumentDefaultsHelpFormatter}
+    parser = argparse.ArgumentParser(**config)
+
+    parser.add_argument('--algorithm', choices=constants.ALGORITHMS,
+        default=DEFAULT_ALGORITHM, help='Hashing algorithm')
+    parser.add_argument('--size', type=int, default=DEFAULT_SIZE,
+        help='Nr entries to append')
+
+    return parser.parse_args()
+
+
+def measure(factory, entries):
+    """
+    Returns the number of bytes allocated for the tree (excluding the entries
+    themselves) along with the tree.
+    """
+    gc.collect()
+    tracemalloc.start()
+    tree = factory(entries)
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return current, tree
+
+
+if __name__ == '__main__':
+    args = parse_cli_args()
+
+    entries = [f'entry-{i}'.encode('utf-8') for i in range(args.size)]
+    opts = {'algorithm': args.algorithm, 'disable_cache': True}
+
+    factories = {
+        'InmemoryTree': lambda entries: InmemoryTree.init_from_entries(
+            entries, **opts),
+        'CompactTree': lambda entries: CompactTree.init_from_entries(
+            entries, **opts),
+        'CompactTree (disable_entries)': lambda entries:
+            CompactTree.init_from_entries(entries, disable_entries=True,
+                **opts),
+    }
+
+    print(f"\nEntries: {args.size}, algorithm: {args.algorithm}\n")
+    for (name, factory) in factories.items():
+        nbytes, tree = measure(factory, entries)
+        assert tree.get_size() == args.size
+
+        print(f"{name:32} {nbytes / 2 ** 20:10.2f} MiB"
+              f"{nbytes / args.size:10.1f} bytes/entry")
+        del tree
@@ -0,0 +1,76 @@
+"""
+Compare JSON against binary encoding of proofs of various depths.
+"""
+
+import os
+import sys
+import json
+import argparse
+import timeit
+
+from pymerkle import MerkleProof, constants
+from pymerkle.hasher import MerkleHasher
+
+DEFAULT_ALGORITHM = 'sha256'
+DEFAULT_DEPTHS = [20, 25, 30, 35, 40]
+DEFAULT_ROUNDS = 10 ** 4
+
+
+def parse_cli_args():
+    config = {'prog': sys.argv[0], 'usage': 'python %s' % sys.argv[0],
+              'description': __doc__, 'epilog': '\n',
+              'formatter_class': argparse.ArgumentDefaultsHelpFormatter}
+    parser = argparse.ArgumentParser(**config)
+
+    parser.add_argument('--algorithm', choices=constants.ALGORITHMS,
+        default=DEFAULT_ALGORITHM, help='Hashing algorithm')
+    parser.add_argument('--depths', type=int, nargs='+',
+        default=DEFAULT_DEPTHS, help='Path lengths to consider')
+    parser.add_argument('--rounds', type=int, default=DEFAULT_ROUNDS,
+        help='Nr rounds per measurement')
+    parser.add_argument('--consistency', action='store_true', default=False,
+        help='Include subset as for consistency proofs')
+
+    return parser.parse_args()
+
+
+def make_proof(algorithm, depth, consistency):
+    """
+    Returns a proof with random path of the provided length.
+    """
+    digest_size = MerkleHasher(algorithm).hashfunc().digest_size
+
+    rule = [bit & 1 for bit in os.urandom(depth - 1)] + [0]
+    subset = [bit & 1 for bit in os.urandom(depth)] if consistency else []
+    path = [os.urandom(digest_size) for _ in range(depth)]
+
+    return MerkleProof(algorithm, True, 1 << depth, rule, subset, path)
+
+
+def measure(func, rounds):
+    """
+    Returns the average time per call in microseconds.
+    """
+    return timeit.timeit(func, number=rounds) / rounds * 10 ** 6
+
+
+if __name__ == '__main__':
+    args = parse_cli_args()
+
+    print(f"\nAlgorithm: {args.algorithm}, rounds: {args.rounds}\n")
+    print(f"{'depth':>6}{'format':>8}{'bytes':>8}"
+          f"{'encode (us)':>14}{'decode (us)':>14}")
+
+    for depth in args.depths:
+        proof = make_proof(args.algorithm, depth, args.consistency)
+
+        text = json.dumps(proof.serialize())
+        encode = measure(lambda: json.dumps(proof.serialize()), args.rounds)
+        decode = measure(lambda: MerkleProof.deserialize(json.loads(text)),
+            args.rounds)
+        print(f"{depth:6}{'json':>8}{len(text):8}{encode:14.2f}{decode:14.2f}")
+
+        buff = proof.to_bytes()
+        encode = measure(proof.to_bytes, args.rounds)
+        decode = measure(lambda: MerkleProof.from_bytes(buff), args.rounds)
+        print(f"{depth:6}{'binary':>8}{len(buff):8}{encode:14.2f}{decode:14.2f}")
@@ -0,0 +1,69 @@
+"""
+Measure ingest throughput of sharded logs against the number of shards.
+"""
+
+import os
+import sys
+import argparse
+import tempfile
+import time
+
+from pymerkle import ShardedLog, SqliteTree, MmapTree, constants
+
+DEFAULT_ALGORITHM = 'sha256'
+DEFAULT_SIZE = 10 ** 5
+DEFAULT_BATCH = 10 ** 4
+DEFAULT_SHARDS = [1, 2, 4, 8]
+
+
+def parse_cli_args():
+    config = {'prog': sys.argv[0], 'usage': 'python %s' % sys.argv[0],
+              'description': __doc__, 'epilog': '\n',
+              'formatter_class': argparse.ArgumentDefaultsHelpFormatter}
+    parser = argparse.ArgumentParser(**config)
+
+    parser.add_argument('--algorithm', choices=constants.ALGORITHMS,
+        default=DEFAULT_ALGORITHM, help='Hashing algorithm')
+    parser.add_argument('--backend', choices=['sqlite', 'mmap'],
+        default='sqlite', help='Shard backend')
+    parser.add_argument('--size', type=int, default=DEFAULT_SIZE,
+        help='Nr entries to append')
+    parser.add_argument('--batch', type=int, default=DEFAULT_BATCH,
+        help='Nr entries per bulk append')
+    parser.add_argument('--entry-size', type=int, default=64,
+        help='Entry size in bytes')
+    parser.add_argument('--shards', type=int, nargs='+',
+        default=DEFAULT_SHARDS, help='Nr shards to consider')
+
+    return parser.parse_args()
+
+
+def make_shard(backend, path, algorithm):
+    if backend == 'mmap':
+        return MmapTree(path + '.bin', algorithm, fsync=False)
+
+    return SqliteTree(path + '.db', algorithm)
+
+
+if __name__ == '__main__':
+    args = parse_cli_args()
+
+    entries = [os.urandom(args.entry_size) for _ in range(args.size)]
+
+    print(f"\nEntries: {args.size}, backend: {args.backend}, "
+          f"algorithm: {args.algorithm}\n")
+    for nr_shards in args.shards:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            shards = [make_shard(args.backend, os.path.join(tmpdir,
+                f'shard-{k}'), args.algorithm) for k in range(nr_shards)]
+            top = SqliteTree(os.path.join(tmpdir, 'top.db'), args.algorithm)
+
+            with ShardedLog(shards, top) as log:
+                start_time = time.time()
+                for offset in range(0, args.size, args.batch):
+                    log.append_entries(entries[offset: offset + args.batch])
+                log.commit()
+                elapsed_time = time.time() - start_time
+
+        print(f"{nr_shards:4} shards {elapsed_time:10.3f} sec"
+              f"{args.size / elapsed_time:14.0f} entries/sec")
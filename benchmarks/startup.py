@@ -0,0 +1,62 @@
+"""
+Measure startup time of in-memory trees rebuilt from entries against trees
+restored from binary snapshots.
+"""
+
+import os
+import sys
+import argparse
+import tempfile
+import time
+
+from pymerkle import InmemoryTree, CompactTree, constants
+
+DEFAULT_ALGORITHM = 'sha256'
+DEFAULT_SIZE = 10 ** 6
+
+
+def parse_cli_args():
+    config = {'prog': sys.argv[0], 'usage': 'python %s' % sys.argv[0],
+              'description': __doc__, 'epilog': '\n',
+              'formatter_class': argparse.ArgumentDefaultsHelpFormatter}
+    parser = argparse.ArgumentParser(**config)
+
+    parser.add_argument('--algorithm', choices=constants.ALGORITHMS,
+        default=DEFAULT_ALGORITHM, help='Hashing algorithm')
+    parser.add_argument('--size', type=int, default=DEFAULT_SIZE,
+        help='Nr entries to consider')
+    parser.add_argument('--disable-entries', action='store_true',
+        default=False, help='Exclude entries from snapshots')
+
+    return parser.parse_args()
+
+
+def timed(func, *args, **kwargs):
+    start_time = time.time()
+    result = func(*args, **kwargs)
+    elapsed_time = time.time() - start_time
+
+    return result, elapsed_time
+
+
+if __name__ == '__main__':
+    args = parse_cli_args()
+
+    entries = [f'entry-{i}'.encode('utf-8') for i in range(args.size)]
+
+    print(f"\nEntries: {args.size}, algorithm: {args.algorithm}\n")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, 'merkle.dump')
+
+        for cls in (InmemoryTree, CompactTree):
+            tree, built = timed(cls.init_from_entries, entries,
+                algorithm=args.algorithm)
+            _, dumped = timed(tree.dump, path,
+                disable_entries=args.disable_entries)
+            clone, loaded = timed(cls.load, path)
+
+            assert clone.get_state() == tree.get_state()
+
+            print(f"{cls.__name__:16} build {built:8.3f} sec"
+                  f"   dump {dumped:8.3f} sec   load {loaded:8.3f} sec"
+                  f"   ({os.path.getsize(path) / 2 ** 20:.1f} MiB)")
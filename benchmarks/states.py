@@ -0,0 +1,114 @@
+"""
+Compare batch against individual computation of states and proofs of
+consistency for many historical sizes.
+"""
+
+import os
+import sys
+import argparse
+import random
+import tempfile
+import time
+
+from pymerkle import CompactTree, SqliteTree, MmapTree, constants
+
+DEFAULT_BACKEND = 'mmap'
+DEFAULT_ALGORITHM = 'sha256'
+DEFAULT_SIZE = 10 ** 7
+DEFAULT_SIZES = 1000
+DEFAULT_CHUNKSIZE = 10 ** 5
+
+
+def parse_cli_args():
+    config = {'prog': sys.argv[0], 'usage': 'python %s' % sys.argv[0],
+              'description': __doc__, 'epilog': '\n',
+              'formatter_class': argparse.ArgumentDefaultsHelpFormatter}
+    parser = argparse.ArgumentParser(**config)
+
+    parser.add_argument('--backend', choices=['compact', 'sqlite', 'mmap'],
+        default=DEFAULT_BACKEND, help='Storage backend')
+    parser.add_argument('--algorithm', choices=constants.ALGORITHMS,
+        default=DEFAULT_ALGORITHM, help='Hashing algorithm')
+    parser.add_argument('--size', type=int, default=DEFAULT_SIZE,
+        help='Nr leaves of the tree')
+    parser.add_argument('--sizes', type=int, default=DEFAULT_SIZES,
+        help='Nr historical sizes to query')
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE,
+        help='Nr entries appended at once while populating the tree')
+    parser.add_argument('--seed', type=int, default=0,
+        help='Seed for sampling the historical sizes')
+
+    return parser.parse_args()
+
+
+def make_tree(backend, algorithm, dirpath):
+    if backend == 'compact':
+        return CompactTree(algorithm)
+
+    if backend == 'sqlite':
+        return SqliteTree(os.path.join(dirpath, 'merkle.db'), algorithm)
+
+    return MmapTree(os.path.join(dirpath, 'merkle.bin'), algorithm,
+        fsync=False)
+
+
+def populate(tree, size, chunksize):
+    offset = 0
+    while offset < size:
+        width = min(chunksize, size - offset)
+        tree.append_entries([os.urandom(32) for _ in range(width)])
+        offset += width
+
+
+def measure(tree, func):
+    """
+    Returns the result and elapsed time in seconds, starting with a cold
+    subroot cache.
+    """
+    tree.cache_clear()
+
+    start = time.perf_counter()
+    result = func()
+
+    return result, time.perf_counter() - start
+
+
+def report(label, elapsed, baseline):
+    print(f"{label:>28}{elapsed:10.3f}{baseline / elapsed:10.1f}")
+
+
+if __name__ == '__main__':
+    args = parse_cli_args()
+
+    with tempfile.TemporaryDirectory() as dirpath:
+        tree = make_tree(args.backend, args.algorithm, dirpath)
+        populate(tree, args.size, args.chunksize)
+
+        sizes = random.Random(args.seed).sample(range(1, args.size + 1),
+            min(args.sizes, args.size))
+
+        print(f"\nBackend: {args.backend}, tree size: {args.size}, "
+              f"sizes: {len(sizes)}, algorithm: {args.algorithm}\n")
+        print(f"{'':>28}{'time (s)':>10}{'speedup':>10}")
+
+        expected, baseline = measure(tree, lambda: [tree.get_state(size)
+            for size in sizes])
+        report('get_state', baseline, baseline)
+
+        states, elapsed = measure(tree, lambda: tree.get_states(sizes))
+        assert states == expected
+        report('get_states', elapsed, baseline)
+
+        expected, baseline = measure(tree, lambda: [tree.prove_consistency(
+            size1) for size1 in sizes])
+        report('prove_consistency', baseline, baseline)
+
+        proofs, elapsed = measure(tree, lambda: tree.prove_consistency_many(
+            sizes))
+        assert [proof.serialize() for proof in proofs] == \
+            [proof.serialize() for proof in expected]
+        report('prove_consistency_many', elapsed, baseline)
+
+        close = getattr(tree, 'close', None)
+        if close is not None:
+            close()
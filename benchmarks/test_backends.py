@@ -0,0 +1,61 @@
+import os
+from random import randint
+import pytest
+
+from pymerkle import SqliteTree, MmapTree, PartitionedSqliteTree
+from .conftest import option
+
+defaults = {'warmup_rounds': 0, 'rounds': option.rounds}
+
+WIDTH = 1 << 12
+SEGMENT_SIZE = 1 << 10
+
+
+@pytest.fixture(scope='module')
+def trees(tmp_path_factory):
+    tmpdir = tmp_path_factory.mktemp('backends')
+    entries = [f'entry-{i}'.encode() for i in range(option.size)]
+
+    sqlite = SqliteTree(os.path.join(tmpdir, 'merkle.db'),
+        algorithm=option.algorithm)
+    sqlite.append_entries(entries)
+
+    mmap = MmapTree(os.path.join(tmpdir, 'merkle.bin'),
+        algorithm=option.algorithm, fsync=False)
+    mmap.append_entries(entries)
+
+    partitioned = PartitionedSqliteTree(os.path.join(tmpdir, 'merkle'),
+        algorithm=option.algorithm, segment_size=SEGMENT_SIZE)
+    partitioned.append_entries(entries)
+
+    yield {'sqlite': sqlite, 'mmap': mmap, 'partitioned': partitioned}
+
+    sqlite.close()
+    mmap.close()
+    partitioned.close()
+
+
+@pytest.mark.parametrize('backend', ['sqlite', 'mmap', 'partitioned'])
+def test_leaves(benchmark, trees, backend):
+    tree = trees[backend]
+    width = min(WIDTH, option.size)
+
+    def setup():
+        offset = randint(0, option.size - width) if option.randomize else 0
+
+        return (offset, width), {}
+
+    benchmark.pedantic(tree._get_leaves, setup=setup, **defaults)
+
+
+@pytest.mark.parametrize('backend', ['sqlite', 'mmap', 'partitioned'])
+def test_uncached_root(benchmark, trees, backend):
+    tree = trees[backend]
+
+    def setup():
+        tree.cache.clear()
+        size = randint(1, option.size) if option.randomize else option.size
+
+        return (0, size), {}
+
+    benchmark.pedantic(tree._get_root, setup=setup, **defaults)
@@ -0,0 +1,103 @@
+"""
+Measure batch verification throughput of proofs against the number of
+worker processes.
+"""
+
+import os
+import sys
+import argparse
+import tempfile
+import time
+
+from pymerkle import CompactTree, verify_many, constants
+from pymerkle.proof import read_proofs, write_proofs
+
+DEFAULT_ALGORITHM = 'sha256'
+DEFAULT_SIZE = 2 ** 16
+DEFAULT_PROOFS = 10 ** 5
+DEFAULT_PROCESSES = [0, 1, 2, 4]
+
+
+def parse_cli_args():
+    config = {'prog': sys.argv[0], 'usage': 'python %s' % sys.argv[0],
+              'description': __doc__, 'epilog': '\n',
+              'formatter_class': argparse.ArgumentDefaultsHelpFormatter}
+    parser = argparse.ArgumentParser(**config)
+
+    parser.add_argument('--algorithm', choices=constants.ALGORITHMS,
+        default=DEFAULT_ALGORITHM, help='Hashing algorithm')
+    parser.add_argument('--size', type=int, default=DEFAULT_SIZE,
+        help='Nr leaves of the tree')
+    parser.add_argument('--proofs', type=int, default=DEFAULT_PROOFS,
+        help='Nr proofs to verify')
+    parser.add_argument('--processes', type=int, nargs='+',
+        default=DEFAULT_PROCESSES,
+        help='Nr worker processes to consider (0 for none)')
+    parser.add_argument('--chunksize', type=int, default=1024,
+        help='Nr proofs dispatched at once to a worker process')
+    parser.add_argument('--consistency', action='store_true', default=False,
+        help='Verify proofs of consistency instead of inclusion')
+
+    return parser.parse_args()
+
+
+def make_items(tree, count, consistency):
+    """
+    Returns verification items cycling over the leaves of the tree.
+    """
+    size = tree.get_size()
+    state = tree.get_state()
+
+    if consistency:
+        states = {}
+        for k in range(count):
+            size1 = k % size + 1
+            if size1 not in states:
+                states[size1] = (tree.get_state(size1),
+                    tree.prove_consistency(size1))
+            yield ('consistency', states[size1][0], state,
+                states[size1][1])
+        return
+
+    for k in range(count):
+        index = k % size + 1
+        yield 'inclusion', tree.get_leaf(index), state, \
+            tree.prove_inclusion(index)
+
+
+def report(label, count, elapsed, cores):
+    rate = count / elapsed
+    print(f"{label:>12}{elapsed:10.2f}{rate:14.0f}{rate / cores:14.0f}")
+
+
+if __name__ == '__main__':
+    args = parse_cli_args()
+
+    tree = CompactTree.init_from_entries([os.urandom(32) for _ in
+        range(args.size)], args.algorithm)
+    items = list(make_items(tree, args.proofs, args.consistency))
+
+    print(f"\nProofs: {args.proofs}, tree size: {args.size}, "
+          f"algorithm: {args.algorithm}, cpus: {os.cpu_count()}\n")
+    print(f"{'processes':>12}{'time (s)':>10}{'proofs/s':>14}"
+          f"{'proofs/s/core':>14}")
+
+    for processes in args.processes:
+        start = time.perf_counter()
+        results = verify_many(items, processes=processes,
+            chunksize=args.chunksize)
+        elapsed = time.perf_counter() - start
+        assert all(results)
+        report(str(processes), args.proofs, elapsed, max(processes, 1))
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for binary in (False, True):
+            path = os.path.join(tmpdir, 'proofs')
+            write_proofs(path, items, binary=binary)
+
+            start = time.perf_counter()
+            results = verify_many(read_proofs(path, binary=binary))
+            elapsed = time.perf_counter() - start
+            assert all(results)
+            report('binary file' if binary else 'ndjson file', args.proofs,
+                elapsed, 1)
@@ -1,7 +1,14 @@
 from .concrete.inmemory import InmemoryTree
+from .concrete.compact import CompactTree
 from .concrete.sqlite import SqliteTree
+from .concrete.mmapfile import MmapTree
+from .concrete.tiered import TieredTree
+from .concrete.partitioned import PartitionedSqliteTree
 from .core import BaseMerkleTree, InvalidChallenge
-from .proof import MerkleProof, verify_inclusion, verify_consistency, InvalidProof
+from .proof import MerkleProof, RangeProof, AuditProof, verify_inclusion, \
+    verify_consistency, verify_range, verify_audit, verify_many, \
+    ConsistencyVerifier, InvalidProof
+from .sharded import ShardedLog, ShardedProof, verify_sharded_inclusion
 
 
 __version__ = '6.1.0'
@@ -9,10 +16,23 @@ __version__ = '6.1.0'
 __all__ = (
     'BaseMerkleTree',
     'InmemoryTree',
+    'CompactTree',
     'SqliteTree',
+    'MmapTree',
+    'TieredTree',
+    'PartitionedSqliteTree',
     'InvalidProof',
     'InvalidChallenge',
     'MerkleProof',
+    'RangeProof',
+    'AuditProof',
     'verify_inclusion',
     'verify_consistency',
+    'verify_range',
+    'verify_audit',
+    'verify_many',
+    'ConsistencyVerifier',
+    'ShardedLog',
+    'ShardedProof',
+    'verify_sharded_inclusion',
 )
@@ -0,0 +1,402 @@
+"""
+Subroot cache shared across processes
+"""
+
+from contextlib import contextmanager
+from hashlib import blake2b
+from threading import Lock
+import os
+import struct
+
+try:
+    from multiprocessing import resource_tracker, shared_memory
+except ImportError:     # Python < 3.8
+    resource_tracker = shared_memory = None
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+_MAGIC = b'PYMKLSC1'
+_HEADER = struct.Struct('<8sQII')
+_STATS = struct.Struct('<QQQ')
+_SLOT = struct.Struct('<QQQ8s')
+_SEQ = struct.Struct('<Q')
+
+_NPROCS = 256
+_PROBES = 8
+
+
+def _attach(name):
+    """
+    Attaches to an existing shared memory block without leaving it registered
+    with the resource tracker, which would otherwise unlink it as soon as the
+    current process exits.
+
+    .. note:: Pythons without the *track* option register the block upon
+        attaching, in which case it is unregistered right afterwards.
+    """
+    try:
+        return shared_memory.SharedMemory(name, track=False)
+    except TypeError:
+        pass
+
+    shm = shared_memory.SharedMemory(name)
+    if os.name == 'posix':
+        resource_tracker.unregister(shm._name, 'shared_memory')
+
+    return shm
+
+
+def _is_alive(pid):
+    """
+    Checks whether the provided process exists.
+
+    .. note:: Processes are assumed alive on non-POSIX platforms.
+    """
+    if os.name != 'posix':
+        return True
+
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+
+    return True
+
+
+class SharedCache:
+    """
+    Subroot cache residing in shared memory, so that all processes of a host
+    serving the same tree can read and fill a single copy of it.
+
+    This is a fixed-slot open-addressing table mapping subroot ranges to
+    digests. Reads are lock-free: every slot is guarded by a sequence number,
+    which is odd while the slot is being written, along with a checksum over
+    its contents. A read that overlaps with a write is simply treated as a
+    miss. Writes never block; when the probed slots are exhausted, the home
+    slot is overwritten.
+
+    .. note:: Hits and misses are recorded per process in the shared block and
+        reported aggregated across all processes. Records of exited processes
+        are reclaimed by new ones when no free record is left, carrying
+        their counts over.
+
+    .. warning:: The process that creates the cache owns the shared memory
+        block and should ``unlink`` it when done. The cache must only be
+        shared among trees with identical leaves and hashing configuration.
+
+    :param name: [optional] name of the shared memory block. If not provided,
+        a fresh block will be created under a random name.
+    :type name: str
+    :param slots: [optional] number of slots. Defaults to 65536.
+    :type slots: int
+    :param digest_size: [optional] digest size in bytes. Defaults to 32.
+    :type digest_size: int
+    :param create: [optional] if *False*, the cache will attach to the
+        existing shared memory block under the provided name, ignoring
+        *slots* and *digest_size*. Defaults to *True*.
+    :type create: bool
+    :raises ValueError: if shared memory is not supported (Python < 3.8)
+    """
+
+    def __init__(self, name=None, slots=1 << 16, digest_size=32, create=True):
+        if shared_memory is None:
+            raise ValueError('Shared memory requires Python 3.8 or later')
+
+        if create:
+            slotsize = _SLOT.size + digest_size
+            size = _HEADER.size + _NPROCS * _STATS.size + slots * slotsize
+            self.shm = shared_memory.SharedMemory(name, create=True,
+                size=size)
+            _HEADER.pack_into(self.shm.buf, 0, _MAGIC, slots, digest_size,
+                _NPROCS)
+        else:
+            if name is None:
+                raise ValueError('Name is required in order to attach')
+
+            self.shm = _attach(name)
+
+        magic, slots, digest_size, nprocs = _HEADER.unpack_from(self.shm.buf)
+        if magic != _MAGIC:
+            raise ValueError(f'{name} is not a shared subroot cache')
+
+        self.name = self.shm.name
+        self.slots = slots
+        self.digest_size = digest_size
+        self.slotsize = _SLOT.size + digest_size
+        self.nprocs = nprocs
+        self.buf = self.shm.buf
+        self.start = _HEADER.size + nprocs * _STATS.size
+        self.pid = None
+        self.stat = None
+        self.lock = Lock()
+
+
+    def __reduce__(self):
+        return (self.__class__, (self.name, None, None, False))
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+    def close(self):
+        """
+        Detaches the current process from the shared memory block.
+        """
+        self.buf = None
+        self.shm.close()
+
+
+    def unlink(self):
+        """
+        Requests destruction of the shared memory block.
+        """
+        self.shm.unlink()
+
+
+    def _get_stat(self):
+        """
+        Returns the position of the statistics record of the current process,
+        claiming a free record if not already claimed.
+
+        .. note:: Records of exited processes are reclaimed if no free
+            record is left. The counts of a reclaimed record are kept, so
+            that the aggregated statistics are preserved. Returns *None* if
+            no record is available, in which case statistics of the current
+            process will not be recorded.
+
+        .. note:: Records are claimed under an exclusive lock over the
+            statistics area, so that no two processes claim the same record.
+
+        :rtype: int
+        """
+        pid = os.getpid()
+        if pid == self.pid:
+            return self.stat
+
+        with self.lock, self._locked(_HEADER.size, self.nprocs * _STATS.size):
+            if pid == self.pid:
+                return self.stat
+
+            buf = self.buf
+            positions = [_HEADER.size + i * _STATS.size for i in
+                range(self.nprocs)]
+
+            stat = None
+            for position in positions:
+                owner, _, _ = _STATS.unpack_from(buf, position)
+
+                if owner == pid:
+                    stat = position
+                    break
+
+                if owner == 0 and stat is None:
+                    stat = position
+
+            if stat is None:
+                for position in positions:
+                    owner, _, _ = _STATS.unpack_from(buf, position)
+                    if not _is_alive(owner):
+                        stat = position
+                        break
+
+            if stat is not None:
+                owner, hits, misses = _STATS.unpack_from(buf, stat)
+                if owner != pid:
+                    _STATS.pack_into(buf, stat, pid, hits, misses)
+
+            self.stat = stat
+            self.pid = pid
+
+        return stat
+
+
+    @contextmanager
+    def _locked(self, start, length):
+        """
+        Holds an exclusive lock over the provided byte range of the shared
+        memory block across processes.
+
+        .. note:: Locking is advisory and relies on ``fcntl``; it is skipped
+            on platforms where the block cannot be locked.
+        """
+        fd = getattr(self.shm, '_fd', -1)
+        if fcntl is None or fd < 0:
+            yield
+            return
+
+        try:
+            fcntl.lockf(fd, fcntl.LOCK_EX, length, start)
+        except OSError:
+            yield
+            return
+
+        try:
+            yield
+        finally:
+            fcntl.lockf(fd, fcntl.LOCK_UN, length, start)
+
+
+    def _record(self, hit):
+        stat = self._get_stat()
+        if stat is None:
+            return
+
+        pid, hits, misses = _STATS.unpack_from(self.buf, stat)
+        if hit:
+            hits += 1
+        else:
+            misses += 1
+        _STATS.pack_into(self.buf, stat, pid, hits, misses)
+
+
+    def _checksum(self, offset, width, digest):
+        return blake2b(_SEQ.pack(offset) + _SEQ.pack(width) + digest,
+            digest_size=8).digest()
+
+
+    def _probe(self, offset, width):
+        """
+        Generates the positions of the slots to be probed for the provided key.
+        """
+        h = (offset * 0x9E3779B97F4A7C15 + width) & 0xFFFFFFFFFFFFFFFF
+        home = (h ^ (h >> 29)) % self.slots
+
+        for i in range(min(_PROBES, self.slots)):
+            yield self.start + ((home + i) % self.slots) * self.slotsize
+
+
+    def __getitem__(self, key):
+        offset, width = key
+        buf = self.buf
+        digest_size = self.digest_size
+
+        for position in self._probe(offset, width):
+            seq, _offset, _width, checksum = _SLOT.unpack_from(buf, position)
+
+            if seq == 0:
+                break
+
+            if seq & 1 or _offset != offset or _width != width:
+                continue
+
+            start = position + _SLOT.size
+            digest = bytes(buf[start: start + digest_size])
+
+            if _SEQ.unpack_from(buf, position)[0] != seq:
+                continue
+
+            if checksum != self._checksum(offset, width, digest):
+                continue
+
+            self._record(True)
+            return digest
+
+        self._record(False)
+        raise KeyError(key)
+
+
+    def __setitem__(self, key, digest):
+        offset, width = key
+        if len(digest) != self.digest_size:
+            raise ValueError('Digest size does not match')
+
+        buf = self.buf
+        target = None
+        for position in self._probe(offset, width):
+            seq, _offset, _width, _ = _SLOT.unpack_from(buf, position)
+
+            if seq == 0 or (_offset == offset and _width == width):
+                target = position
+                break
+
+        if target is None:
+            target = next(self._probe(offset, width))
+
+        seq = _SEQ.unpack_from(buf, target)[0]
+        seq += 1 if not seq & 1 else 0
+
+        _SEQ.pack_into(buf, target, seq)
+        _SLOT.pack_into(buf, target, seq, offset, width,
+            self._checksum(offset, width, digest))
+        start = target + _SLOT.size
+        buf[start: start + self.digest_size] = digest
+        _SEQ.pack_into(buf, target, seq + 1)
+
+
+    def clear(self):
+        """
+        Empties the cache and resets statistics for all processes.
+        """
+        start = _HEADER.size
+        self.buf[start:] = bytes(len(self.buf) - start)
+        self.pid = None
+        self.stat = None
+
+
+    def _get_totals(self):
+        hits = 0
+        misses = 0
+        for i in range(self.nprocs):
+            position = _HEADER.size + i * _STATS.size
+            _, _hits, _misses = _STATS.unpack_from(self.buf, position)
+            hits += _hits
+            misses += _misses
+
+        return hits, misses
+
+
+    @property
+    def hits(self):
+        """
+        Number of cache hits aggregated across all processes.
+
+        :rtype: int
+        """
+        return self._get_totals()[0]
+
+
+    @property
+    def misses(self):
+        """
+        Number of cache misses aggregated across all processes.
+
+        :rtype: int
+        """
+        return self._get_totals()[1]
+
+
+    @property
+    def currsize(self):
+        """
+        Size of cached digests in bytes.
+
+        :rtype: int
+        """
+        count = 0
+        for i in range(self.slots):
+            position = self.start + i * self.slotsize
+            if _SEQ.unpack_from(self.buf, position)[0]:
+                count += 1
+
+        return count * self.digest_size
+
+
+    @property
+    def maxsize(self):
+        """
+        Capacity of the cache in bytes.
+
+        :rtype: int
+        """
+        return self.slots * self.digest_size
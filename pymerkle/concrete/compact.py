@@ -0,0 +1,401 @@
+from pymerkle.core import BaseMerkleTree
+from pymerkle.dump import write_dump, read_dump, load_options
+
+
+class CompactTree(BaseMerkleTree):
+    """
+    Non-persistent Merkle-tree storing each level as a contiguous buffer of
+    digests.
+
+    Inserted data is expected to be in binary format and hashed without
+    further processing.
+
+    .. note:: Level *h* consists of the roots of the successive perfect
+        subtrees with *2^h* leaves, with level *0* consisting of the leaf
+        hashes. Levels are extended incrementally on append. Since perfect
+        subtrees never change, every aligned subroot is retrieved in constant
+        time against any size of the tree. This takes roughly twice the digest
+        size per leaf in total.
+
+    :param algorithm: [optional] hashing algorithm. Defaults to *sha256*
+    :type algorithm: str
+    :param disable_entries: [optional] if *True*, only leaf hashes will be
+        stored. Defaults to *False*.
+    :type disable_entries: bool
+    """
+
+    def __init__(self, algorithm='sha256', **opts):
+        self.levels = [bytearray()]
+        self.entries = None if opts.get('disable_entries', False) else []
+
+        super().__init__(algorithm, **opts)
+
+        self.digest_size = self.hashfunc().digest_size
+
+
+    def _encode_entry(self, data):
+        """
+        Returns the binary format of the provided data entry.
+
+        :param data: data to encode
+        :type data: bytes
+        :rtype: bytes
+        """
+        return data
+
+
+    def _store_leaf(self, data, digest):
+        """
+        Appends the provided hash value to the bottom level and extends the
+        upper levels by the subroots completed thereby.
+
+        :param data: data entry
+        :type data: whatever expected according to application logic
+        :param digest: hashed data
+        :type digest: bytes
+        :returns: index of newly appended leaf counting from one
+        :rtype: int
+        """
+        if self.entries is not None:
+            self.entries += [data]
+
+        levels = self.levels
+        levels[0] += digest
+
+        index = len(levels[0]) // self.digest_size
+        self._complete_levels(index - 1, index)
+
+        return index
+
+
+    def _store_leaves(self, entries, digests):
+        """
+        Appends in respective order the provided hash values to the bottom
+        level and extends the upper levels in a single pass.
+
+        :param entries: data entries
+        :type entries: list
+        :param digests: hashed data
+        :type digests: list of bytes
+        :returns: index of last appended leaf counting from one
+        :rtype: int
+        """
+        if self.entries is not None:
+            self.entries += entries
+
+        prior = self._get_size()
+        self.levels[0] += b''.join(digests)
+
+        size = self._get_size()
+        self._complete_levels(prior, size)
+
+        return size
+
+
+    def _complete_levels(self, prior, size):
+        """
+        Extends the upper levels by the subroots completed when growing the
+        bottom level from the provided prior size to the provided size.
+
+        :param prior: number of leaves before growing
+        :type prior: int
+        :param size: number of leaves after growing
+        :type size: int
+        """
+        levels = self.levels
+        hashfunc = self.hashfunc
+        prefx01 = self.prefx01
+        pair = 2 * self.digest_size
+
+        height = 0
+        while size >> (height + 1) > prior >> (height + 1):
+            level = levels[height]
+            start = (prior >> height) & ~1
+            end = (size >> height) & ~1
+
+            if height + 1 == len(levels):
+                levels += [bytearray()]
+
+            upper = levels[height + 1]
+            for p in range(start * self.digest_size, end * self.digest_size,
+                    pair):
+                upper += hashfunc(prefx01 + level[p: p + pair]).digest()
+
+            height += 1
+
+
+    def _get_leaf(self, index):
+        """
+        Returns the hash stored at the specified leaf.
+
+        :param index: leaf index counting from one
+        :type index: int
+        :rtype: bytes
+        """
+        if index < 1 or index > self._get_size():
+            raise ValueError("%d not in leaf range" % index)
+
+        digest_size = self.digest_size
+        position = (index - 1) * digest_size
+
+        return bytes(self.levels[0][position: position + digest_size])
+
+
+    def _get_leaves(self, offset, width):
+        """
+        Returns in respective order the hashes stored by the leaves in the
+        specified range.
+
+        :param offset: starting position counting from zero
+        :type offset: int
+        :param width: number of leaves to consider
+        :type width: int
+        :rtype: list of bytes
+        """
+        digest_size = self.digest_size
+        level = self.levels[0]
+
+        start = offset * digest_size
+        end = min(offset + width, self._get_size()) * digest_size
+
+        return [bytes(level[p: p + digest_size]) for p in range(start, end,
+            digest_size)]
+
+
+    def _get_size(self):
+        """
+        :returns: current number of leaves
+        :rtype: int
+        """
+        return len(self.levels[0]) // self.digest_size
+
+
+    def _lookup_subroot(self, offset, width):
+        """
+        Retrieves the requested subroot from the respective level.
+
+        .. note:: Returns *None* if the requested range is not aligned to
+            a perfect subtree of the current tree.
+
+        :param offset: index of leftmost leaf counting from zero
+        :type offset: int
+        :param width: number of leaves to consider
+        :type width: int
+        :rtype: bytes
+        """
+        height = width.bit_length() - 1
+
+        if width != 1 << height or offset & (width - 1) or \
+                height >= len(self.levels):
+            return
+
+        digest_size = self.digest_size
+        position = (offset >> height) * digest_size
+        value = self.levels[height][position: position + digest_size]
+
+        if len(value) == digest_size:
+            return bytes(value)
+
+
+    def _get_subroot(self, offset, width):
+        """
+        Retrieves the requested subroot from the respective level if aligned
+        (bypassing the cache), otherwise falls back to the inherited
+        computation.
+
+        .. note:: Overrides the function inherited from the base class.
+
+        :param offset: index of leftmost leaf counting from zero
+        :type offset: int
+        :param width: number of leaves to consider
+        :type width: int
+        :rtype: bytes
+        """
+        value = self._lookup_subroot(offset, width)
+        if value is not None:
+            return value
+
+        return super()._get_subroot(offset, width)
+
+
+    def _get_subroot_uncached(self, offset, width):
+        """
+        .. note:: Overrides the function inherited from the base class, so
+            that aligned subroots are retrieved from the respective level
+            also when caching is disabled.
+
+        :param offset: index of leftmost leaf counting from zero
+        :type offset: int
+        :param width: number of leaves to consider
+        :type width: int
+        :rtype: bytes
+        """
+        value = self._lookup_subroot(offset, width)
+        if value is not None:
+            return value
+
+        return super()._get_subroot_uncached(offset, width)
+
+
+    def get_entry(self, index):
+        """
+        Returns the unhashed data stored at the specified leaf.
+
+        :param index: leaf index counting from one
+        :type index: int
+        :rtype: bytes
+        """
+        if self.entries is None:
+            raise ValueError('Entries are not stored')
+
+        if index < 1 or index > len(self.entries):
+            raise ValueError("%d not in leaf range" % index)
+
+        return self.entries[index - 1]
+
+
+    def get_entries(self, offset, width):
+        """
+        Returns in respective order the unhashed data stored by the leaves in
+        the specified range.
+
+        :param offset: starting position counting from zero
+        :type offset: int
+        :param width: number of leaves to consider
+        :type width: int
+        :rtype: list of bytes
+        """
+        if self.entries is None:
+            raise ValueError('Entries are not stored')
+
+        return self.entries[offset: offset + width]
+
+
+    def append_entries(self, entries, prove=False):
+        """
+        Bulk operation for appending a batch of entries.
+
+        :param entries: data entries to append
+        :type entries: iterable of bytes
+        :param prove: [optional] if *True*, also return the proofs of
+            inclusion of the appended leaves against the post-append size.
+            Defaults to *False*.
+        :type prove: bool
+        :returns: index of last appended entry (along with the proofs of
+            inclusion of the appended leaves if requested)
+        :rtype: int or (int, list[MerkleProof])
+        """
+        entries = list(entries)
+
+        encode = self._encode_entry
+        hash_entry = self._hash_entry
+        digests = [hash_entry(encode(data)) for data in entries]
+
+        index = self._store_leaves(entries, digests)
+
+        if prove:
+            return index, self._prove_appended(index - len(digests), digests)
+
+        return index
+
+
+    def _get_levels(self):
+        """
+        Generator yielding level by level the digests of nodes in the order
+        of bottom-up construction.
+
+        .. note:: Digests of nodes which do not root a perfect subtree (at most
+            one per level) are computed on the fly.
+
+        :rtype: generator of bytes
+        """
+        size = self._get_size()
+        digest_size = self.digest_size
+        levels = self.levels
+
+        yield bytes(levels[0])
+
+        extra = None
+        height = 0
+        while (size >> height) + (extra is not None) > 1:
+            count = size >> height
+            upper = b''
+            if height + 1 < len(levels):
+                upper = bytes(levels[height + 1])
+
+            if count & 1:
+                position = (count - 1) * digest_size
+                last = bytes(levels[height][position: position + digest_size])
+
+                if extra is not None:
+                    extra = self._hash_nodes(last, extra)
+                    upper += extra
+                else:
+                    extra = last
+
+            yield upper
+            height += 1
+
+
+    def dump(self, path, disable_entries=False):
+        """
+        Writes a binary snapshot of the tree to the provided file.
+
+        .. note:: The snapshot format is shared with ``InmemoryTree``.
+
+        :param path: filepath of snapshot
+        :type path: str
+        :param disable_entries: [optional] if *True*, entries will not be
+            included. Defaults to *False*.
+        :type disable_entries: bool
+        :raises ValueError: if entries are included and some entry is not
+            binary
+        """
+        entries = None if disable_entries else self.entries
+
+        write_dump(path, self, self._get_size(), self._get_levels(), entries)
+
+
+    @classmethod
+    def load(cls, path, **opts):
+        """
+        Restores the tree from the binary snapshot stored in the provided file.
+
+        .. note:: Levels are restored by bulk copy without any hashing. Hashing
+            configuration is read from the snapshot. Entries are not available
+            if not included in the snapshot.
+
+        :param path: filepath of snapshot
+        :type path: str
+        :raises ValueError: if the file is not a valid snapshot or the
+            provided options specify a different hashing configuration
+        """
+        dump = read_dump(path)
+        tree = cls(dump.algorithm, **load_options(dump, opts))
+
+        size = dump.size
+        digest_size = dump.digest_size
+        tree.levels = [bytearray(buff[: (size >> height) * digest_size]) for
+            (height, buff) in enumerate(dump.levels) if height == 0 or
+                size >> height]
+
+        if tree.entries is not None:
+            tree.entries = dump.entries
+
+        return tree
+
+
+    @classmethod
+    def init_from_entries(cls, entries, algorithm='sha256', **opts):
+        """
+        Create tree from initial data
+
+        :param entries: initial data to append
+        :type entries: iterable of bytes
+        :param algorithm: [optional] hash function. Defaults to *sha256*
+        :type algorithm: str
+        """
+        tree = cls(algorithm, **opts)
+        tree.append_entries(entries)
+
+        return tree
@@ -1,5 +1,8 @@
+import sys
+
 from pymerkle.utils import decompose
 from pymerkle.core import BaseMerkleTree
+from pymerkle.dump import write_dump, read_dump, load_options
 
 
 class Node:
@@ -106,39 +109,82 @@ class Node:
         :type ignored: str
         :rtype: str
         """
-        ignored = ignored or []
+        return ''.join(self.iter_lines(indent, trim, level, ignored))
+
+
+    def iter_lines(self, indent=2, trim=None, level=0, ignored=None,
+            max_depth=None, span=None, window=None):
+        """
+        Generator yielding line by line the representation of the subtree
+        rooted at the present node, as returned by ``expand``.
+
+        .. note:: Nodes are traversed iteratively in pre-order, so that
+            arbitrarily deep subtrees are rendered in linear time and without
+            hitting the recursion limit.
+
+        :param indent: [optional]
+        :type indent: int
+        :param trim: [optional]
+        :type trim: int
+        :param level: [optional]
+        :type level: int
+        :param ignored: [optional]
+        :type ignored: list[int]
+        :param max_depth: [optional] maximum depth of displayed nodes relative
+            to the present node. Defaults to *None* (no limit).
+        :type max_depth: int
+        :param span: [optional] position of leftmost leaf counting from zero
+            and number of leaves under the present node. Required for windowing.
+        :type span: tuple[int, int]
+        :param window: [optional] leaf range *[start, limit)* counting from
+            zero. If provided, only subtrees overlapping this range are
+            displayed.
+        :type window: tuple[int, int]
+        :rtype: generator of str
+        """
+        ignored = set(ignored or [])
 
         if level == 0:
-            out = 2 * '\n' + ' └─' if not self.parent else ''
+            base = 2 * '\n' + ' └─' if not self.parent else ''
         else:
-            out = (indent + 1) * ' '
+            base = (indent + 1) * ' ' + ''.join((' │' if col not in ignored
+                else 2 * ' ') + indent * ' ' for col in range(1, level))
 
-        col = 1
-        while col < level:
-            out += ' │' if col not in ignored else 2 * ' '
-            out += indent * ' '
-            col += 1
+        stack = [(self, level, base, span)]
+        while stack:
+            node, curr, base, span = stack.pop()
 
-        if self.is_left_child():
-            out += ' ├──'
+            parent = node.parent
+            is_right = parent is not None and node is parent.right
+            marker = '' if parent is None else ' └──' if is_right else ' ├──'
 
-        if self.is_right_child():
-            out += ' └──'
-            ignored += [level]
+            checksum = node.digest.hex()
+            yield base + marker + ((checksum[:trim] + '...') if trim else
+                checksum) + '\n'
 
-        checksum = self.digest.hex()
-        out += (checksum[:trim] + '...') if trim else checksum
-        out += '\n'
+            if node.left is None or \
+                    (max_depth is not None and curr - level >= max_depth):
+                continue
 
-        if self.is_leaf():
-            return out
+            if curr == 0:
+                base = (indent + 1) * ' '
+            else:
+                base += (2 * ' ' if is_right or curr in ignored else ' │') + \
+                    indent * ' '
 
-        recursion = (indent, trim, level + 1, ignored[:])
+            lspan = rspan = None
+            if span:
+                offset, width = span
+                cut = 1 << (width - 1).bit_length() - 1
+                lspan = (offset, cut)
+                rspan = (offset + cut, width - cut)
 
-        out += self.left.expand(*recursion)
-        out += self.right.expand(*recursion)
+            for child, span in ((node.right, rspan), (node.left, lspan)):
+                if window and span and (span[0] >= window[1] or
+                        span[0] + span[1] <= window[0]):
+                    continue
 
-        return out
+                stack += [(child, curr + 1, base, span)]
 
 
 class Leaf(Node):
@@ -151,6 +197,9 @@ class Leaf(Node):
     :type digest: bytes
     """
 
+    __slots__ = ('data',)
+
+
     def __init__(self, data, digest):
         self.data = data
 
@@ -165,7 +214,8 @@ class InmemoryTree(BaseMerkleTree):
     further processing.
 
     .. warning:: This is a very memory inefficient implementation. Use it
-        for debugging, testing and investigating the tree structure.
+        for debugging, testing and investigating the tree structure. Use
+        ``CompactTree`` for holding large trees in memory.
     """
 
     def __init__(self, algorithm='sha256', **opts):
@@ -186,6 +236,63 @@ class InmemoryTree(BaseMerkleTree):
         return self.root.expand(indent, trim) + '\n'
 
 
+    def render(self, file=None, indent=2, trim=8, max_depth=None,
+            window=None, subroot=None):
+        """
+        Writes line by line the visual representation of the tree (or part of
+        it) to the provided file-like object.
+
+        .. note:: The full picture coincides with the string representation
+            of the tree, but is never built in memory as a whole.
+
+        :param file: [optional] writable text stream. Defaults to standard
+            output.
+        :type file: io.TextIOBase
+        :param indent: [optional] Defaults to 2.
+        :type indent: int
+        :param trim: [optional] number of hex characters displayed per digest.
+            Defaults to 8.
+        :type trim: int
+        :param max_depth: [optional] maximum depth of displayed nodes relative
+            to the displayed root. Defaults to *None* (no limit).
+        :type max_depth: int
+        :param window: [optional] leaf range *[start, limit)* counting from
+            zero. If provided, only subtrees overlapping this range are
+            displayed.
+        :type window: tuple[int, int]
+        :param subroot: [optional] position of leftmost leaf counting from one
+            and height of the perfect subtree to display. Defaults to the
+            whole tree.
+        :type subroot: tuple[int, int]
+        :raises ValueError: if no perfect subtree exists for the provided
+            parameters
+        """
+        file = file or sys.stdout
+
+        if not self.root:
+            file.write('\n └─[None]\n')
+            return
+
+        if subroot:
+            index, height = subroot
+            node = None
+            if 0 < index <= len(self.leaves):
+                node = self._get_subroot_node(index, height)
+
+            if not node:
+                raise ValueError('No perfect subtree at %d with height %d' %
+                    (index, height))
+
+            span = (index - 1, 1 << height)
+        else:
+            node = self.root
+            span = (0, len(self.leaves))
+
+        file.writelines(node.iter_lines(indent, trim, max_depth=max_depth,
+            span=span, window=window))
+        file.write('\n')
+
+
     def _encode_entry(self, data):
         """
         Returns the binary format of the provided data entry.
@@ -264,6 +371,20 @@ class InmemoryTree(BaseMerkleTree):
         return [l.digest for l in self.leaves[offset: offset + width]]
 
 
+    def get_entries(self, offset, width):
+        """
+        Returns in respective order the unhashed data stored by the leaves in
+        the specified range.
+
+        :param offset: starting position counting from zero
+        :type offset: int
+        :param width: number of leaves to consider
+        :type width: int
+        :rtype: list of bytes
+        """
+        return [l.data for l in self.leaves[offset: offset + width]]
+
+
     def _get_size(self):
         """
         :returns: current number of leaves
@@ -272,21 +393,180 @@ class InmemoryTree(BaseMerkleTree):
         return len(self.leaves)
 
 
+    def _store_leaves(self, entries, digests):
+        """
+        Creates in respective order new leaves storing the provided entries
+        along with their hash values.
+
+        .. note:: Levels are constructed bottom-up in a single pass, starting
+            from the perfect subtrees of the current tree which are left
+            unpaired (i.e., its successive maximal subtrees). An unpaired last
+            node at any level is promoted to the next one, which yields the
+            same structure as appending the entries one by one with
+            a linear number of hashing operations.
+
+        :param entries: data entries
+        :type entries: list
+        :param digests: hashed data
+        :type digests: list of bytes
+        :returns: index of last appended leaf counting from one
+        :rtype: int
+        """
+        tail = [Leaf(data, digest) for (data, digest) in zip(entries, digests)]
+        if not tail:
+            return self._get_size()
+
+        prior = self._get_size()
+        peaks = dict(zip(decompose(prior), self._get_subroots(prior)))
+        self.leaves += tail
+        size = self._get_size()
+
+        hashfunc = self.hashfunc
+        prefx01 = self.prefx01
+
+        level = tail
+        height = 0
+        while (1 << height) < size:
+            if height in peaks:
+                level = [peaks[height]] + level
+
+            upper = [Node(hashfunc(prefx01 + lnode.digest + rnode.digest
+                ).digest(), lnode, rnode) for (lnode, rnode) in zip(
+                    level[0::2], level[1::2])]
+
+            if len(level) & 1:
+                upper += [level[-1]]
+
+            level = upper
+            height += 1
+
+        self.root = level[0]
+        self.root.parent = None
+
+        return size
+
+
+    def append_entries(self, entries, prove=False):
+        """
+        Bulk operation for appending a batch of entries.
+
+        :param entries: data entries to append
+        :type entries: iterable of bytes
+        :param prove: [optional] if *True*, also return the proofs of
+            inclusion of the appended leaves against the post-append size.
+            Defaults to *False*.
+        :type prove: bool
+        :returns: index of last appended entry (along with the proofs of
+            inclusion of the appended leaves if requested)
+        :rtype: int or (int, list[MerkleProof])
+        """
+        entries = list(entries)
+
+        encode = self._encode_entry
+        hash_entry = self._hash_entry
+        digests = [hash_entry(encode(data)) for data in entries]
+
+        index = self._store_leaves(entries, digests)
+
+        if prove:
+            return index, self._prove_appended(index - len(digests), digests)
+
+        return index
+
+
     @classmethod
     def init_from_entries(cls, entries, algorithm='sha256', **opts):
         """
         Create tree from initial data
 
+        .. note:: The tree is constructed bottom-up in a single pass.
+
         :param entries: initial data to append
         :type entries: iterable of bytes
         :param algorithm: [optional] hash function. Defaults to *sha256*
         :type algorithm: str
         """
         tree = cls(algorithm, **opts)
+        tree.append_entries(entries)
+
+        return tree
+
+
+    def _get_levels(self):
+        """
+        Generator yielding level by level the digests of nodes in the order
+        of bottom-up construction.
+
+        :rtype: generator of lists of bytes
+        """
+        level = self.leaves
+        yield [node.digest for node in level]
+
+        while len(level) > 1:
+            upper = [level[i].parent for i in range(0, len(level) - 1, 2)]
+            yield [node.digest for node in upper]
+
+            if len(level) & 1:
+                upper += [level[-1]]
+
+            level = upper
+
+
+    def dump(self, path, disable_entries=False):
+        """
+        Writes a binary snapshot of the tree to the provided file.
+
+        :param path: filepath of snapshot
+        :type path: str
+        :param disable_entries: [optional] if *True*, entries will not be
+            included. Defaults to *False*.
+        :type disable_entries: bool
+        :raises ValueError: if entries are included and some entry is not
+            binary
+        """
+        entries = None
+        if not disable_entries:
+            entries = (leaf.data for leaf in self.leaves)
+
+        levels = (b''.join(level) for level in self._get_levels())
+        write_dump(path, self, self._get_size(), levels, entries)
+
+
+    @classmethod
+    def load(cls, path, **opts):
+        """
+        Restores the tree from the binary snapshot stored in the provided file.
 
-        append_entry = tree.append_entry
-        for data in entries:
-            append_entry(data)
+        .. note:: The exact node structure is restored without any hashing.
+            Hashing configuration is read from the snapshot.
+
+        :param path: filepath of snapshot
+        :type path: str
+        :raises ValueError: if the file is not a valid snapshot or the
+            provided options specify a different hashing configuration
+        """
+        dump = read_dump(path)
+        tree = cls(dump.algorithm, **load_options(dump, opts))
+
+        digest_size = dump.digest_size
+        entries = dump.entries or [None] * dump.size
+        buff = bytes(dump.levels[0])
+
+        level = [Leaf(data, buff[p: p + digest_size]) for (data, p) in
+            zip(entries, range(0, len(buff), digest_size))]
+        tree.leaves = level
+
+        for buff in map(bytes, dump.levels[1:]):
+            upper = [Node(buff[p: p + digest_size], lnode, rnode) for
+                (p, lnode, rnode) in zip(range(0, len(buff), digest_size),
+                    level[0::2], level[1::2])]
+
+            if len(level) & 1:
+                upper += [level[-1]]
+
+            level = upper
+
+        tree.root = level[0] if level else None
 
         return tree
 
@@ -324,39 +604,69 @@ class InmemoryTree(BaseMerkleTree):
         return result
 
 
-    def _inclusion_path_fallback(self, offset):
+    def _inclusion_path_fallback(self, offset, size=None):
         """
         Non-recursive utility using concrete traversals to compute the inclusion
-        path against the current number of leaves.
+        path against the provided number of leaves.
+
+        .. note:: The path is collected by walking up the parent pointers to
+            the root of the perfect subtree containing the base leaf, and then
+            across the successive perfect subtrees of the tree corresponding to
+            the provided size. No leaves are rehashed, so that this works
+            against any previous size of the tree.
 
         :param offset: base leaf index counting from zero
         :type offset: int
+        :param size: [optional] number of leaves to consider. Defaults to
+            current tree size.
+        :type size: int
         :rtype: (list[int], list[bytes])
         """
-        base = self.leaves[offset]
-        bit = 1 if base.is_right_child() else 0
+        if size is None:
+            size = self._get_size()
+
+        subroots = list(reversed(self._get_subroots(size)))
+        heights = list(reversed(decompose(size)))
+
+        start = 0
+        for (j, height) in enumerate(heights):
+            if offset < start + (1 << height):
+                break
+            start += 1 << height
 
-        path = [base.digest]
-        rule = [bit]
+        curr = self.leaves[offset]
+        rule = []
+        path = [curr.digest]
 
-        curr = base
-        while curr.parent:
+        i = 0
+        while i < height:
             parent = curr.parent
 
-            if curr.is_left_child():
-                digest = parent.right.digest
-                bit = 0 if parent.is_left_child() else 1
+            if curr is parent.left:
+                rule += [0]
+                path += [parent.right.digest]
             else:
-                digest = parent.left.digest
-                bit = 1 if parent.is_right_child() else 0
+                rule += [1]
+                path += [parent.left.digest]
 
-            rule += [bit]
-            path += [digest]
             curr = parent
+            i += 1
+
+        if j < len(subroots) - 1:
+            result = subroots[-1].digest
+            for node in reversed(subroots[j + 1:-1]):
+                result = self._hash_nodes(node.digest, result)
+
+            rule += [0]
+            path += [result]
+
+        for node in reversed(subroots[:j]):
+            rule += [1]
+            path += [node.digest]
 
         # Last bit is insignificant; fix it to zero just to be fully compatible
         # with the output of the overriden method
-        rule[-1] = 0
+        rule += [0]
 
         return rule, path
 
@@ -366,8 +676,8 @@ class InmemoryTree(BaseMerkleTree):
         Computes the inclusion path for the leaf located at the provided offset
         against the specified leaf range
 
-        .. warning:: This is an unoptimized recursive function intended for
-        reference and testing. Use ``_inclusion_path`` in production.
+        .. note:: Uses concrete traversals for ranges starting from the first
+            leaf.
 
         :param start: leftmost leaf index counting from zero
         :type start: int
@@ -379,12 +689,128 @@ class InmemoryTree(BaseMerkleTree):
         :type bit: int
         :rtype: (list[int], list[bytes])
         """
-        if start == 0 and limit == self._get_size():
-            return self._inclusion_path_fallback(offset)
+        if start == 0 and bit == 0:
+            return self._inclusion_path_fallback(offset, limit)
 
         return super()._inclusion_path(start, offset, limit, bit)
 
 
+    def _consistency_path_fallback(self, size1, size2=None):
+        """
+        Non-recursive utility using concrete traversals to compute the
+        consistency path for the provided prior size against the provided later
+        size.
+
+        .. note:: The consistency path coincides with the inclusion path of
+            the leaf following the prior state, where left siblings are exactly
+            the successive perfect subtrees of the prior state.
+
+        :param size1: prior number of leaves
+        :type size1: int
+        :param size2: [optional] later number of leaves. Defaults to current
+            tree size.
+        :type size2: int
+        :rtype: (list[int], list[int], list[bytes])
+        """
+        if size2 is None:
+            size2 = self._get_size()
+
+        if size1 == size2:
+            return [0], [1], [self.get_state(size2)]
+
+        rule, path = self._inclusion_path_fallback(size1, size2)
+        subset = [0] + rule[:-1]
+
+        return rule, subset, path
+
+
+    def _consistency_path(self, start, offset, limit, bit):
+        """
+        Computes the consistency path for the state corresponding to the
+        provided offset against the specified leaf range
+
+        .. note:: Uses concrete traversals for ranges starting from the first
+            leaf.
+
+        :param start: leftmost leaf index counting from zero
+        :type start: int
+        :param offset: size corresponding to state under consideration
+        :type offset: int
+        :param limit: rightmost leaf index counting from zero
+        :type limit: int
+        :param bit: indicates direction during path parenthetization
+        :type bit: int
+        :rtype: (list[int], list[int], list[bytes])
+        """
+        if start == 0 and bit == 0:
+            return self._consistency_path_fallback(offset, limit)
+
+        return super()._consistency_path(start, offset, limit, bit)
+
+
+    def _lookup_subroot(self, offset, width):
+        """
+        Retrieves the requested subroot by concrete traversal.
+
+        .. note:: Returns *None* if the requested range does not correspond to
+            a perfect subtree of the current tree.
+
+        :param offset: index of leftmost leaf counting from zero
+        :type offset: int
+        :param width: number of leaves to consider
+        :type width: int
+        :rtype: bytes
+        """
+        height = width.bit_length() - 1
+
+        if width != 1 << height or offset + width > len(self.leaves):
+            return
+
+        node = self._get_subroot_node(offset + 1, height)
+        if node:
+            return node.digest
+
+
+    def _get_subroot(self, offset, width):
+        """
+        Retrieves the requested subroot by concrete traversal if existent
+        (bypassing the cache), otherwise falls back to the inherited
+        computation.
+
+        .. note:: Overrides the function inherited from the base class.
+
+        :param offset: index of leftmost leaf counting from zero
+        :type offset: int
+        :param width: number of leaves to consider
+        :type width: int
+        :rtype: bytes
+        """
+        value = self._lookup_subroot(offset, width)
+        if value is not None:
+            return value
+
+        return super()._get_subroot(offset, width)
+
+
+    def _get_subroot_uncached(self, offset, width):
+        """
+        .. note:: Overrides the function inherited from the base class, so
+            that existing subroots are retrieved by concrete traversal also
+            when caching is disabled.
+
+        :param offset: index of leftmost leaf counting from zero
+        :type offset: int
+        :param width: number of leaves to consider
+        :type width: int
+        :rtype: bytes
+        """
+        value = self._lookup_subroot(offset, width)
+        if value is not None:
+            return value
+
+        return super()._get_subroot_uncached(offset, width)
+
+
     def _get_subroot_node(self, index, height):
         """
         Returns the root node of the perfect subtree of the provided height whose
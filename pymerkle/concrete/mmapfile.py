@@ -0,0 +1,539 @@
+import os
+import mmap
+import struct
+import weakref
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from pymerkle.core import BaseMerkleTree
+
+
+_MAGIC = b'PYMKLMM1'
+_VERSION = 1
+_HEADER = struct.Struct('<8sBBBxI16sQ')
+_SIZE = struct.Struct('<Q')
+_LENGTH = struct.Struct('<I')
+_OFFSET = struct.Struct('<Q')
+
+HEADER_SIZE = 64
+SIZE_OFFSET = 32
+
+
+def _close_fds(fds):
+    for fd in fds:
+        if fd is not None:
+            os.close(fd)
+
+
+class MmapTree(BaseMerkleTree):
+    """
+    Persistent Merkle-tree implementation using flat append-only files as
+    storage.
+
+    Inserted data is expected to be in binary format and hashed without
+    further processing.
+
+    .. note:: Leaf hashes are stored with fixed width after a header in the
+        provided file, which is memory-mapped for reading, so that ranges of
+        leaves are served without any per-leaf lookup. Entries are stored
+        as length-prefixed records in a separate log (*<path>.entries*)
+        whose record offsets are stored in a separate index
+        (*<path>.index*).
+
+    .. note:: The header records the number of committed leaves. Appended
+        data is written (and optionally synced to disk) before the header is
+        updated, so that data written by an interrupted append is discarded
+        when reopening the tree. Reopening never scans the files.
+
+    .. note:: A writer holds an exclusive lock on the leaf hashes file
+        (relying on ``fcntl``), so that opening the same file for writing
+        while another writer is active raises ``ValueError``. Trees opened
+        read-only, including those restored by unpickling (e.g., in worker
+        processes), take no lock and serve the leaves committed at opening,
+        so that they never discard data being appended by the writer.
+        Appending to them raises ``ValueError``.
+
+    :param path: filepath of leaf hashes
+    :type path: str
+    :param algorithm: [optional] hashing algorithm. Defaults to *sha256*
+    :type algorithm: str
+    :param fsync: [optional] if *False*, appended data will not be synced to
+        disk before committing. Defaults to *True*.
+    :type fsync: bool
+    :param disable_entries: [optional] if *True*, only leaf hashes will be
+        stored. Defaults to *False*.
+    :type disable_entries: bool
+    :param readonly: [optional] if *True*, the existing files will be opened
+        read-only and left untouched. Defaults to *False*.
+    :type readonly: bool
+    :raises ValueError: if the files are incompatible with the provided
+        configuration or opened for writing by another writer
+    """
+
+    def __init__(self, path, algorithm='sha256', **opts):
+        self.path = path
+        self.fsync = opts.get('fsync', True)
+        self.entries = not opts.get('disable_entries', False)
+
+        super().__init__(algorithm, **opts)
+
+        self.digest_size = self.hashfunc().digest_size
+        self._open(readonly=opts.get('readonly', False))
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+    def __getstate__(self):
+        state = super().__getstate__()
+        for name in ('fd', 'entries_fd', 'index_fd', 'map', 'finalizer'):
+            del state[name]
+
+        return state
+
+
+    def _reinit(self):
+        """
+        Reopens the files read-only upon unpickling.
+
+        .. note:: File descriptors inherited after ``fork`` are retained, since
+            reads never rely on the file position.
+        """
+        super()._reinit()
+
+        if not hasattr(self, 'fd'):
+            self._open(readonly=True)
+
+
+    def _open(self, readonly=False):
+        """
+        Opens the files (after creating them if not already existent) and
+        restores the committed size from the header.
+
+        :param readonly: [optional] if *True*, the files are opened
+            read-only and left untouched. Otherwise, an exclusive lock is
+            taken on the leaf hashes file. Defaults to *False*.
+        :type readonly: bool
+        :raises ValueError: if the files are incompatible with the tree
+            configuration or locked by another writer
+        """
+        self.readonly = readonly
+        flags = os.O_RDONLY if readonly else os.O_RDWR | os.O_CREAT
+        self.fd = os.open(self.path, flags, 0o644)
+        self.entries_fd = None
+        self.index_fd = None
+        self.map = None
+        self.finalizer = None
+
+        try:
+            if not readonly:
+                self._lock()
+
+            header = os.pread(self.fd, HEADER_SIZE, 0)
+            created = not header and not readonly
+            if not created:
+                self._check_header(header)
+
+            if self.entries:
+                self.entries_fd = os.open(self.path + '.entries', flags,
+                    0o644)
+                self.index_fd = os.open(self.path + '.index', flags, 0o644)
+        except BaseException:
+            _close_fds([self.fd, self.entries_fd, self.index_fd])
+            raise
+
+        self.finalizer = weakref.finalize(self, _close_fds, [self.fd,
+            self.entries_fd, self.index_fd])
+
+        if readonly:
+            return
+
+        if created:
+            self.size = 0
+            algorithm = self.algorithm.encode()
+            header = _HEADER.pack(_MAGIC, _VERSION, self.security,
+                self.entries, self.digest_size, algorithm, 0)
+            os.pwrite(self.fd, header.ljust(HEADER_SIZE, b'\x00'), 0)
+            if self.fsync:
+                os.fsync(self.fd)
+
+        try:
+            self._discard_uncommitted()
+        except BaseException:
+            self.close()
+            raise
+
+
+    def _lock(self):
+        """
+        Takes an exclusive lock on the leaf hashes file without blocking.
+
+        .. note:: Locking is advisory and relies on ``fcntl``; it is skipped
+            where not available. The lock is released along with the file.
+
+        :raises ValueError: if the file is locked by another writer
+        """
+        if fcntl is None:
+            return
+
+        try:
+            fcntl.flock(self.fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise ValueError(f'{self.path} is opened by another writer; '
+                'open it read-only instead') from None
+
+
+    def _check_header(self, header):
+        """
+        Restores the committed size from the provided header after checking
+        that it is compatible with the tree configuration.
+
+        :param header: file header
+        :type header: bytes
+        :raises ValueError: if the header is corrupted or incompatible
+        """
+        if len(header) < HEADER_SIZE:
+            raise ValueError('Corrupted header')
+
+        magic, version, security, entries, digest_size, algorithm, size = \
+            _HEADER.unpack_from(header)
+
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError(f'{self.path} is not a tree file')
+
+        algorithm = algorithm.rstrip(b'\x00').decode()
+        if algorithm != self.algorithm or security != self.security or \
+                digest_size != self.digest_size:
+            raise ValueError('Tree file has incompatible hashing '
+                'configuration')
+
+        if entries != self.entries:
+            raise ValueError('Tree file has incompatible entry storage')
+
+        self.size = size
+
+
+    def _discard_uncommitted(self):
+        """
+        Truncates the files to the committed size, discarding leftovers of an
+        interrupted append.
+
+        :raises ValueError: if the files are shorter than the committed size
+        """
+        length = HEADER_SIZE + self.size * self.digest_size
+        if os.fstat(self.fd).st_size < length:
+            raise ValueError(f'{self.path} is truncated')
+
+        os.ftruncate(self.fd, length)
+
+        self.entries_end = 0
+        if self.entries:
+            if self.size:
+                position = (self.size - 1) * _OFFSET.size
+                buff = os.pread(self.index_fd, _OFFSET.size, position)
+                if len(buff) < _OFFSET.size:
+                    raise ValueError(f'{self.path}.index is truncated')
+
+                offset, = _OFFSET.unpack(buff)
+                buff = os.pread(self.entries_fd, _LENGTH.size, offset)
+                if len(buff) < _LENGTH.size:
+                    raise ValueError(f'{self.path}.entries is truncated')
+
+                length, = _LENGTH.unpack(buff)
+                self.entries_end = offset + _LENGTH.size + length
+
+            os.ftruncate(self.index_fd, self.size * _OFFSET.size)
+            os.ftruncate(self.entries_fd, self.entries_end)
+
+
+    def close(self):
+        """
+        Closes the underlying files.
+        """
+        self.map = None
+
+        if self.finalizer is not None:
+            self.finalizer()
+
+        self.fd = self.entries_fd = self.index_fd = None
+
+
+    def _get_map(self, limit):
+        """
+        Returns a memory-map of the leaf hashes file covering at least the
+        provided number of leaves.
+
+        .. note:: The file is remapped as a whole when it has grown beyond the
+            current mapping, which is never resized in place.
+
+        :param limit: number of leaves to cover
+        :type limit: int
+        :rtype: mmap.mmap
+        """
+        length = HEADER_SIZE + limit * self.digest_size
+        current = self.map
+
+        if current is None or len(current) < length:
+            length = HEADER_SIZE + self.size * self.digest_size
+            current = mmap.mmap(self.fd, length, access=mmap.ACCESS_READ)
+            self.map = current
+
+        return current
+
+
+    def _commit(self, size):
+        """
+        Syncs appended data to disk (if so configured) and records the
+        provided size in the header.
+
+        :param size: new number of leaves
+        :type size: int
+        """
+        fsync = self.fsync
+
+        if fsync:
+            if self.entries:
+                os.fsync(self.entries_fd)
+                os.fsync(self.index_fd)
+            os.fsync(self.fd)
+
+        os.pwrite(self.fd, _SIZE.pack(size), SIZE_OFFSET)
+        if fsync:
+            os.fsync(self.fd)
+
+        self.size = size
+
+
+    def _encode_entry(self, data):
+        """
+        Returns the binary format of the provided data entry.
+
+        :param data: data to encode
+        :type data: bytes
+        :rtype: bytes
+        """
+        return data
+
+
+    def _store_leaves(self, entries, digests):
+        """
+        Appends in respective order the provided entries along with their hash
+        values and commits them at once.
+
+        :param entries: data entries
+        :type entries: list of bytes
+        :param digests: hashed data
+        :type digests: list of bytes
+        :returns: index of last appended leaf counting from one
+        :rtype: int
+        :raises ValueError: if the tree is opened read-only
+        """
+        if self.readonly:
+            raise ValueError('Tree is opened read-only')
+
+        size = self.size
+
+        if self.entries:
+            offset = self.entries_end
+            offsets = []
+            records = []
+            for data in entries:
+                offsets += [_OFFSET.pack(offset)]
+                records += [_LENGTH.pack(len(data)), data]
+                offset += _LENGTH.size + len(data)
+
+            os.pwrite(self.entries_fd, b''.join(records), self.entries_end)
+            os.pwrite(self.index_fd, b''.join(offsets), size * _OFFSET.size)
+            self.entries_end = offset
+
+        position = HEADER_SIZE + size * self.digest_size
+        os.pwrite(self.fd, b''.join(digests), position)
+
+        self._commit(size + len(digests))
+
+        return self.size
+
+
+    def _store_leaf(self, data, digest):
+        """
+        Creates a new leaf storing the provided data along with its
+        hash value.
+
+        :param data: data entry
+        :type data: whatever expected according to application logic
+        :param digest: hashed data
+        :type digest: bytes
+        :returns: index of newly appended leaf counting from one
+        :rtype: int
+        """
+        if not isinstance(data, bytes):
+            raise ValueError('Provided data is not binary')
+
+        return self._store_leaves([data], [digest])
+
+
+    def _get_leaf(self, index):
+        """
+        Returns the hash stored at the specified leaf.
+
+        :param index: leaf index counting from one
+        :type index: int
+        :rtype: bytes
+        """
+        if index < 1 or index > self.size:
+            raise ValueError("%d not in leaf range" % index)
+
+        digest_size = self.digest_size
+        position = HEADER_SIZE + (index - 1) * digest_size
+
+        return self._get_map(index)[position: position + digest_size]
+
+
+    def _get_leaves(self, offset, width):
+        """
+        Returns in respective order the hashes stored by the leaves in the
+        specified range.
+
+        .. note:: Hashes are unpacked one by one directly from the
+            memory-mapped file without intermediate buffering.
+
+        :param offset: starting position counting from zero
+        :type offset: int
+        :param width: number of leaves to consider
+        :type width: int
+        :rtype: list of bytes
+        """
+        limit = min(offset + width, self.size)
+        if limit <= offset:
+            return []
+
+        digest_size = self.digest_size
+        start = HEADER_SIZE + offset * digest_size
+        end = HEADER_SIZE + limit * digest_size
+
+        with memoryview(self._get_map(limit)) as view:
+            return [digest for (digest,) in struct.iter_unpack(
+                f'{digest_size}s', view[start: end])]
+
+
+    def _get_size(self):
+        """
+        :returns: current number of leaves
+        :rtype: int
+        """
+        return self.size
+
+
+    def get_entry(self, index):
+        """
+        Returns the unhashed data stored at the specified leaf.
+
+        :param index: leaf index counting from one
+        :type index: int
+        :rtype: bytes
+        """
+        if not self.entries:
+            raise ValueError('Entries are not stored')
+
+        if index < 1 or index > self.size:
+            raise ValueError("%d not in leaf range" % index)
+
+        offset, = _OFFSET.unpack(os.pread(self.index_fd, _OFFSET.size,
+            (index - 1) * _OFFSET.size))
+        length, = _LENGTH.unpack(os.pread(self.entries_fd, _LENGTH.size,
+            offset))
+
+        return os.pread(self.entries_fd, length, offset + _LENGTH.size)
+
+
+    def get_entries(self, offset, width):
+        """
+        Returns in respective order the unhashed data stored by the leaves in
+        the specified range.
+
+        .. note:: The respective records are read at once.
+
+        :param offset: starting position counting from zero
+        :type offset: int
+        :param width: number of leaves to consider
+        :type width: int
+        :rtype: list of bytes
+        """
+        if not self.entries:
+            raise ValueError('Entries are not stored')
+
+        limit = min(offset + width, self.size)
+        if offset >= limit:
+            return []
+
+        count = limit - offset
+        positions = struct.unpack(f'<{count}Q', os.pread(self.index_fd,
+            count * _OFFSET.size, offset * _OFFSET.size))
+
+        start = positions[0]
+        last = positions[-1] - start
+        buff = os.pread(self.entries_fd, last + _LENGTH.size, start)
+        length, = _LENGTH.unpack_from(buff, last)
+        buff += os.pread(self.entries_fd, length, start + len(buff))
+
+        entries = []
+        for position in positions:
+            position -= start
+            length, = _LENGTH.unpack_from(buff, position)
+            position += _LENGTH.size
+            entries += [buff[position: position + length]]
+
+        return entries
+
+
+    def append_entries(self, entries, chunksize=100_000, prove=False):
+        """
+        Bulk operation for appending a batch of entries.
+
+        :param entries: data entries to append
+        :type entries: iterable of bytes
+        :param chunksize: [optional] number of entries to commit at once
+        :type chunksize: int
+        :param prove: [optional] if *True*, also return the proofs of
+            inclusion of the appended leaves against the post-append size.
+            Defaults to *False*.
+        :type prove: bool
+        :returns: index of last appended entry (along with the proofs of
+            inclusion of the appended leaves if requested)
+        :rtype: int or (int, list[MerkleProof])
+        """
+        hash_buff = self.hash_buff
+        size1 = self.size
+        digests = []
+
+        chunk = []
+        for data in entries:
+            if not isinstance(data, bytes):
+                raise ValueError('Provided data is not binary')
+
+            chunk += [data]
+            if len(chunk) == chunksize:
+                hashes = [hash_buff(d) for d in chunk]
+                self._store_leaves(chunk, hashes)
+                if prove:
+                    digests += hashes
+                chunk = []
+
+        if chunk:
+            hashes = [hash_buff(d) for d in chunk]
+            self._store_leaves(chunk, hashes)
+            if prove:
+                digests += hashes
+
+        if prove:
+            return self.size, self._prove_appended(size1, digests)
+
+        return self.size
@@ -0,0 +1,525 @@
+import os
+import re
+import sqlite3
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from threading import Lock, local
+
+from pymerkle.core import BaseMerkleTree
+from pymerkle.concrete.sqlite import SqliteTree
+
+
+_SEGMENT_NAME = 'segment-%08d.db'
+_SEGMENT_PATTERN = re.compile(r'segment-(\d{8})\.db')
+
+
+class PartitionedSqliteTree(BaseMerkleTree):
+    """
+    Persistent Merkle-tree splitting its leaves into fixed-size segments,
+    each stored in a separate SQLite database.
+
+    Inserted data is expected to be in binary format and hashed without
+    further processing.
+
+    .. note:: Segment *k* stores the leaves from position *k * segment_size*
+        onwards (counting from zero) in the file *segment-k.db* of the
+        provided directory, following the ``SqliteTree`` schema. Once full,
+        a segment is sealed: its root is stored in a table called *seal* and
+        the file is reopened as immutable. Subroots covering whole sealed
+        segments are computed from the stored roots without reading any
+        leaves, whereas leaf ranges spanning several segments are read in
+        parallel. Every thread keeps a read connection open to at most
+        *max_readers* segments, closing the least recently used one when
+        exceeded.
+
+    .. warning:: The segment size is not recorded and must be the same every
+        time the directory is opened.
+
+    :param dirpath: directory hosting the segments. Created if not existent.
+    :type dirpath: str
+    :param algorithm: [optional] hashing algorithm. Defaults to *sha256*
+    :type algorithm: str
+    :param segment_size: [optional] number of leaves per segment. Must be a
+        power of two. Defaults to *2^20*.
+    :type segment_size: int
+    :param workers: [optional] maximum number of threads reading segments
+        in parallel. Defaults to 4.
+    :type workers: int
+    :param max_readers: [optional] maximum number of segments to which every
+        thread keeps a read connection open. Defaults to 8.
+    :type max_readers: int
+    :param pragmas: [optional] connection profile applied to every segment.
+        See ``SqliteTree``.
+    :type pragmas: dict
+    :raises ValueError: if the directory contents are incompatible with the
+        provided segment size
+    """
+
+    def __init__(self, dirpath, algorithm='sha256', **opts):
+        self.dirpath = dirpath
+        self.segment_size = opts.get('segment_size', 1 << 20)
+        self.workers = opts.get('workers', 4)
+        self.max_readers = opts.get('max_readers', 8)
+        self.pragmas = dict(opts.get('pragmas', {}))
+
+        size = self.segment_size
+        if size < 1 or size & (size - 1):
+            raise ValueError('Segment size must be a power of two')
+
+        if self.max_readers < 1:
+            raise ValueError('Max readers must be positive')
+
+        super().__init__(algorithm, **opts)
+
+        self.writer_lock = Lock()
+        self.executor = ThreadPoolExecutor(self.workers)
+        self.local = local()
+        self.segments = []
+        self.roots = []
+        self.size = 0
+
+        os.makedirs(dirpath, exist_ok=True)
+        self._open_segments()
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+    def __getstate__(self):
+        state = super().__getstate__()
+        del state['writer_lock']
+        del state['executor']
+        del state['local']
+
+        return state
+
+
+    def _reinit(self):
+        """
+        Reinitializes locks and the thread pool. The size is reloaded lazily
+        since the source might have grown meanwhile.
+
+        .. note:: Segments are reinitialized on their own.
+        """
+        super()._reinit()
+        self.writer_lock = Lock()
+        self.executor = ThreadPoolExecutor(self.workers)
+        self.local = local()
+        self.size = None
+
+
+    def _segment_path(self, k):
+        return os.path.join(self.dirpath, _SEGMENT_NAME % k)
+
+
+    def _open_segment(self, k, sealed=False):
+        """
+        Opens the specified segment, creating its database if not existent.
+
+        :param k: segment number counting from zero
+        :type k: int
+        :param sealed: [optional] if *True*, the segment will be opened as
+            immutable
+        :type sealed: bool
+        :rtype: pymerkle.SqliteTree
+
+        .. note:: No idle read connections are pooled per segment, since the
+            open ones are already bounded per thread.
+        """
+        return SqliteTree(self._segment_path(k), self.algorithm,
+            disable_security=not self.security, disable_cache=True,
+            pragmas=self.pragmas, immutable=sealed, pool_size=0)
+
+
+    def _read_seal(self, k):
+        """
+        Returns the root stored in the specified segment if sealed.
+
+        :param k: segment number counting from zero
+        :type k: int
+        :rtype: bytes or None
+        """
+        uri = Path(self._segment_path(k)).resolve().as_uri() + '?mode=ro'
+
+        con = sqlite3.connect(uri, uri=True)
+        try:
+            row = con.execute('SELECT root FROM seal').fetchone()
+        except sqlite3.OperationalError:
+            return
+        finally:
+            con.close()
+
+        if row is not None:
+            return row[0]
+
+
+    def _open_segments(self):
+        """
+        Opens the existing segments in order, sealing the last one if found
+        full but not sealed (e.g., after a crash).
+
+        :raises ValueError: if segments are missing or have unexpected size
+        """
+        numbers = sorted(int(match.group(1)) for match in
+            map(_SEGMENT_PATTERN.fullmatch, os.listdir(self.dirpath))
+            if match)
+
+        if numbers != list(range(len(numbers))):
+            raise ValueError(f'Missing segments in {self.dirpath}')
+
+        for k in numbers:
+            root = self._read_seal(k)
+
+            if root is None:
+                if k != numbers[-1]:
+                    raise ValueError(f'Segment {k} is not sealed')
+
+                segment = self._open_segment(k)
+                self.segments += [segment]
+
+                size = segment.get_size()
+                if size > self.segment_size:
+                    raise ValueError(f'Segment {k} exceeds segment size')
+
+                if size == self.segment_size:
+                    self._seal()
+
+                continue
+
+            segment = self._open_segment(k, sealed=True)
+            if segment.get_size() != self.segment_size:
+                raise ValueError(f'Segment {k} has unexpected size')
+
+            self.segments += [segment]
+            self.roots += [root]
+
+        self.size = self._load_size()
+
+
+    def _load_size(self):
+        """
+        Counts the leaves stored by the segments.
+
+        :rtype: int
+        """
+        segments = self.segments
+        if not segments:
+            return 0
+
+        return (len(segments) - 1) * self.segment_size + \
+            segments[-1].get_size()
+
+
+    def _seal(self):
+        """
+        Stores the root of the last segment, which is expected to be full,
+        and reopens it as immutable.
+
+        .. note:: The former segment is not closed, since other threads might
+            be reading from it. Only its writer connection is closed; its
+            reader connections are closed as soon as no thread uses them any
+            longer.
+        """
+        k = len(self.roots)
+        segment = self.segments[k]
+        root = segment._get_subroot_uncached(0, self.segment_size)
+
+        with segment.con as con:
+            con.execute('CREATE TABLE IF NOT EXISTS seal(root BLOB)')
+            con.execute('DELETE FROM seal')
+            con.execute('INSERT INTO seal(root) VALUES (?)', (root,))
+
+        self.segments[k] = self._open_segment(k, sealed=True)
+        self.roots += [root]
+
+        segment._close_writer()
+
+
+    def close(self):
+        """
+        Closes all segments and shuts down the thread pool.
+        """
+        self.executor.shutdown()
+
+        for segment in self.segments:
+            segment.close()
+
+        self.local = local()
+
+
+    def _encode_entry(self, data):
+        """
+        Returns the binary format of the provided data entry.
+
+        :param data: data to encode
+        :type data: bytes
+        :rtype: bytes
+        """
+        return data
+
+
+    def _store_leaves(self, entries, digests):
+        """
+        Appends in respective order the provided entries along with their hash
+        values, sealing every segment filled thereby.
+
+        :param entries: data entries
+        :type entries: list of bytes
+        :param digests: hashed data
+        :type digests: list of bytes
+        :returns: index of last appended leaf counting from one
+        :rtype: int
+        :raises ValueError: if some entry is not binary
+        """
+        for data in entries:
+            if not isinstance(data, bytes):
+                raise ValueError('Provided data is not binary')
+
+        segment_size = self.segment_size
+
+        with self.writer_lock:
+            size = self._get_size()
+
+            offset = 0
+            while offset < len(entries):
+                if len(self.segments) > len(self.roots) and size and \
+                        not size % segment_size:
+                    self._seal()    # Left full by a failed seal
+
+                if len(self.segments) == len(self.roots):
+                    self.segments += [self._open_segment(len(self.segments))]
+
+                segment = self.segments[-1]
+                count = min(segment_size - size % segment_size,
+                    len(entries) - offset)
+
+                segment._store_leaves(entries[offset: offset + count],
+                    digests[offset: offset + count])
+                offset += count
+                size += count
+                self.size = size
+
+                if not size % segment_size:
+                    self._seal()
+
+            return size
+
+
+    def _store_leaf(self, data, digest):
+        """
+        Creates a new leaf storing the provided data along with its
+        hash value.
+
+        :param data: data entry
+        :type data: whatever expected according to application logic
+        :param digest: hashed data
+        :type digest: bytes
+        :returns: index of newly appended leaf counting from one
+        :rtype: int
+        """
+        return self._store_leaves([data], [digest])
+
+
+    def append_entries(self, entries, prove=False):
+        """
+        Bulk operation for appending a batch of entries.
+
+        :param entries: data entries to append
+        :type entries: iterable of bytes
+        :param prove: [optional] if *True*, also return the proofs of
+            inclusion of the appended leaves against the post-append size.
+            Defaults to *False*.
+        :type prove: bool
+        :returns: index of last appended entry (along with the proofs of
+            inclusion of the appended leaves if requested)
+        :rtype: int or (int, list[MerkleProof])
+        """
+        entries = list(entries)
+
+        hash_buff = self.hash_buff
+        digests = [hash_buff(data) for data in entries]
+
+        index = self._store_leaves(entries, digests)
+
+        if prove:
+            return index, self._prove_appended(index - len(digests), digests)
+
+        return index
+
+
+    def _locate(self, index):
+        """
+        Returns the segment containing the specified leaf along with the leaf
+        index within the segment.
+
+        :param index: leaf index counting from one
+        :type index: int
+        :rtype: (pymerkle.SqliteTree, int)
+        """
+        if index < 1 or index > self._get_size():
+            raise ValueError("%d not in leaf range" % index)
+
+        k, position = divmod(index - 1, self.segment_size)
+
+        return self._get_segment(k), position + 1
+
+
+    def _get_segment(self, k):
+        """
+        Returns the specified segment for reading from the current thread,
+        closing the read connection of the thread to the least recently used
+        segment if more than *max_readers* are open.
+
+        :param k: segment number counting from zero
+        :type k: int
+        :rtype: pymerkle.SqliteTree
+        """
+        try:
+            recent = self.local.recent
+        except AttributeError:
+            recent = self.local.recent = OrderedDict()
+
+        if k in recent:
+            recent.move_to_end(k)
+        else:
+            recent[k] = None
+            if len(recent) > self.max_readers:
+                j, _ = recent.popitem(last=False)
+                self.segments[j]._release_cursor()
+
+        return self.segments[k]
+
+
+    def _get_leaf(self, index):
+        """
+        Returns the hash stored at the specified leaf.
+
+        :param index: leaf index counting from one
+        :type index: int
+        :rtype: bytes
+        """
+        segment, index = self._locate(index)
+
+        return segment._get_leaf(index)
+
+
+    def get_entry(self, index):
+        """
+        Returns the unhashed data stored at the specified leaf.
+
+        :param index: leaf index counting from one
+        :type index: int
+        :rtype: bytes
+        """
+        segment, index = self._locate(index)
+
+        return segment.get_entry(index)
+
+
+    def get_entries(self, offset, width):
+        """
+        Returns in respective order the unhashed data stored by the leaves in
+        the specified range.
+
+        :param offset: starting position counting from zero
+        :type offset: int
+        :param width: number of leaves to consider
+        :type width: int
+        :rtype: list of bytes
+        """
+        segment_size = self.segment_size
+        limit = min(offset + width, self._get_size())
+
+        entries = []
+        while offset < limit:
+            k = offset // segment_size
+            end = min((k + 1) * segment_size, limit)
+            entries += self._get_segment(k).get_entries(
+                offset - k * segment_size, end - offset)
+            offset = end
+
+        return entries
+
+
+    def _get_leaves(self, offset, width):
+        """
+        Returns in respective order the hashes stored by the leaves in the
+        specified range, reading the involved segments in parallel.
+
+        :param offset: starting position counting from zero
+        :type offset: int
+        :param width: number of leaves to consider
+        :type width: int
+        :rtype: list of bytes
+        """
+        segment_size = self.segment_size
+        get_segment = self._get_segment
+        limit = min(offset + width, self._get_size())
+
+        parts = []
+        while offset < limit:
+            k = offset // segment_size
+            end = min((k + 1) * segment_size, limit)
+            parts += [(k, offset - k * segment_size, end - offset)]
+            offset = end
+
+        if len(parts) < 2 or self.workers < 2:
+            return [digest for (k, offset, width) in parts for digest
+                in get_segment(k)._get_leaves(offset, width)]
+
+        results = self.executor.map(lambda part:
+            get_segment(part[0])._get_leaves(*part[1:]), parts)
+
+        return [digest for result in results for digest in result]
+
+
+    def _get_size(self):
+        """
+        .. note:: The size is cached and updated under the writer lock.
+
+        :returns: current number of leaves
+        :rtype: int
+        """
+        size = self.size
+        if size is None:
+            size = self.size = self._load_size()
+
+        return size
+
+
+    def _get_subroot_uncached(self, offset, width):
+        """
+        Computes the requested subroot from the stored roots if it covers
+        whole sealed segments, otherwise falls back to the inherited
+        computation.
+
+        .. note:: Overrides the function inherited from the base class.
+
+        :param offset: index of leftmost leaf counting from zero
+        :type offset: int
+        :param width: number of leaves to consider
+        :type width: int
+        :rtype: bytes
+        """
+        segment_size = self.segment_size
+
+        if width >= segment_size and not offset % segment_size:
+            k = offset // segment_size
+            count = width // segment_size
+            level = self.roots[k: k + count]
+
+            if len(level) == count:
+                hash_nodes = self._hash_nodes
+                while len(level) > 1:
+                    level = [hash_nodes(lnode, rnode) for (lnode, rnode) in
+                        zip(level[0::2], level[1::2])]
+
+                return level[0]
+
+        return super()._get_subroot_uncached(offset, width)
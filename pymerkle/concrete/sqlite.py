@@ -1,7 +1,16 @@
 import sqlite3
+import weakref
+from contextlib import contextmanager
+from pathlib import Path
+from threading import Lock, local
+
 from pymerkle.core import BaseMerkleTree
 
 
+DATABASE_PRAGMAS = ('page_size', 'journal_mode')
+CONNECTION_PRAGMAS = ('synchronous', 'mmap_size', 'cache_size', 'temp_store')
+
+
 class SqliteTree(BaseMerkleTree):
     """
     Persistent Merkle-tree implementation using a SQLite database as storage.
@@ -13,26 +22,76 @@ class SqliteTree(BaseMerkleTree):
         with two columns: *index*, which is the primary key serving as leaf
         index, and *entry*, which is a blob field storing the appended data.
 
+    .. note:: Appends go through a single writer connection, whereas reads
+        go through read-only connections assigned lazily per thread, so that
+        proofs can be generated concurrently. Once a thread exits, its
+        connection is returned to a pool of idle connections reused by
+        subsequent threads (or closed if the pool is full). In-memory
+        databases cannot be shared between connections and are always
+        accessed through the writer connection.
+
+    .. note:: In read-only mode the database is opened with ``mode=ro`` (or
+        ``immutable=1`` for frozen snapshots), no schema is created and
+        appends are rejected. This is intended for query-only processes
+        serving proofs from a database written by some other process.
+
     :param dbfile: database filepath
     :type dbfile: str
     :param algorithm: [optional] hashing algorithm. Defaults to *sha256*
     :type algorithm: str
+    :param pragmas: [optional] connection profile mapping any of
+        *page_size*, *journal_mode*, *synchronous*, *mmap_size*, *cache_size*
+        and *temp_store* to the desired value. Defaults to the SQLite
+        defaults.
+    :type pragmas: dict
+    :param readonly: [optional] if *True*, the database will be opened in
+        read-only mode. Defaults to *False*.
+    :type readonly: bool
+    :param immutable: [optional] if *True*, the database will be opened in
+        read-only mode and assumed to never change, so that no locking
+        takes place at all. Defaults to *False*.
+    :type immutable: bool
+    :param pool_size: [optional] maximum number of idle read connections
+        kept open for reuse. Defaults to 8.
+    :type pool_size: int
     """
 
     def __init__(self, dbfile, algorithm='sha256', **opts):
         self.dbfile = dbfile
-        self.con = sqlite3.connect(self.dbfile)
-        self.con.row_factory = lambda cursor, row: row[0]
-        self.cur = self.con.cursor()
-
-        with self.con:
-            query = f'''
-                CREATE TABLE IF NOT EXISTS leaf(
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    entry BLOB,
-                    hash BLOB
-                );'''
-            self.cur.execute(query)
+        self.pragmas = dict(opts.get('pragmas', {}))
+        self.immutable = opts.get('immutable', False)
+        self.readonly = opts.get('readonly', False) or self.immutable
+        self.pool_size = opts.get('pool_size', 8)
+        self._size = None
+
+        for (name, value) in self.pragmas.items():
+            if name not in DATABASE_PRAGMAS + CONNECTION_PRAGMAS:
+                raise ValueError(f'Unsupported pragma: {name}')
+
+            if not str(value).lstrip('-').isalnum():
+                raise ValueError(f'Invalid value for {name}: {value}')
+
+        if self.readonly and self.dbfile in (':memory:', ''):
+            raise ValueError('In-memory database cannot be opened read-only')
+
+        self._con = self._connect()
+        self._cur = None
+        self.writer_lock = Lock()
+        self.handles_lock = Lock()
+        self.local = local()
+        self.readers = []
+        self.idle = []
+        self.inherited = []
+
+        if not self.readonly:
+            with self.con:
+                query = f'''
+                    CREATE TABLE IF NOT EXISTS leaf(
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        entry BLOB,
+                        hash BLOB
+                    );'''
+                self.cur.execute(query)
 
         super().__init__(algorithm, **opts)
 
@@ -42,7 +101,296 @@ class SqliteTree(BaseMerkleTree):
 
 
     def __exit__(self, *exc):
-        self.con.close()
+        self.close()
+
+
+    def __getstate__(self):
+        if self.dbfile in (':memory:', ''):
+            raise TypeError('Cannot pickle tree over in-memory database')
+
+        state = super().__getstate__()
+        for name in ('_con', '_cur', 'writer_lock', 'handles_lock', 'local',
+                'readers', 'idle', 'inherited'):
+            del state[name]
+
+        return state
+
+
+    def _reinit(self):
+        """
+        Reinitializes locks and drops the database connections, which will be
+        reopened lazily.
+
+        .. note:: Connections inherited from the parent process after ``fork``
+            are deliberately kept referenced instead of being closed, since
+            closing them might interfere with the parent's locks. Connections
+            to in-memory databases are retained, since these cannot be
+            reopened.
+        """
+        super()._reinit()
+        self.writer_lock = Lock()
+        self.handles_lock = Lock()
+
+        if self.dbfile in (':memory:', ''):
+            return
+
+        inherited = getattr(self, 'inherited', [])
+        inherited += [con for con in [getattr(self, '_con', None)] +
+            getattr(self, 'readers', []) if con is not None]
+
+        self.inherited = inherited
+        self._con = None
+        self._cur = None
+        self.readers = []
+        self.idle = []
+        self.local = local()
+
+
+    @property
+    def con(self):
+        """
+        Writer connection, opened lazily.
+
+        :rtype: sqlite3.Connection
+        """
+        con = self._con
+        if con is not None:
+            return con
+
+        with self.handles_lock:
+            if self._con is None:
+                self._con = self._connect()
+
+        return self._con
+
+
+    @property
+    def cur(self):
+        """
+        Writer cursor, opened lazily.
+
+        :rtype: sqlite3.Cursor
+        """
+        cur = self._cur
+        if cur is not None:
+            return cur
+
+        con = self.con
+        with self.handles_lock:
+            if self._cur is None:
+                self._cur = con.cursor()
+
+        return self._cur
+
+
+    def close(self):
+        """
+        Closes the writer connection along with all reader connections.
+        """
+        with self.handles_lock:
+            for con in self.readers:
+                con.close()
+
+            if self._con is not None:
+                self._con.close()
+
+            self.readers = []
+            self.idle = []
+            self._con = None
+            self._cur = None
+
+        # Outside the lock, since dropping the cursors triggers their recycling
+        self.local = local()
+
+
+    def _close_writer(self):
+        """
+        Closes the writer connection, leaving the reader connections open.
+        """
+        with self.handles_lock:
+            if self._con is not None:
+                self._con.close()
+
+            self._con = None
+            self._cur = None
+
+
+    def _connect(self):
+        """
+        Opens the writer connection to the database (read-only if the tree
+        has been opened in read-only mode).
+
+        :rtype: sqlite3.Connection
+        """
+        if self.readonly:
+            return self._connect_readonly()
+
+        con = sqlite3.connect(self.dbfile, check_same_thread=False)
+        con.row_factory = lambda cursor, row: row[0]
+        self._set_pragmas(con, DATABASE_PRAGMAS + CONNECTION_PRAGMAS)
+
+        return con
+
+
+    def _set_pragmas(self, con, names):
+        """
+        Applies the configured values of the provided pragmas to the provided
+        connection.
+
+        :param con: database connection
+        :type con: sqlite3.Connection
+        :param names: pragmas to consider
+        :type names: iterable of str
+        """
+        for name in names:
+            if name in self.pragmas:
+                con.execute(f'PRAGMA {name} = {self.pragmas[name]}').fetchall()
+
+
+    def _connect_readonly(self):
+        """
+        Opens a read-only connection to the database.
+
+        :rtype: sqlite3.Connection
+        """
+        uri = Path(self.dbfile).resolve().as_uri()
+        uri += '?immutable=1' if self.immutable else '?mode=ro'
+
+        con = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        con.row_factory = lambda cursor, row: row[0]
+        self._set_pragmas(con, CONNECTION_PRAGMAS)
+
+        return con
+
+
+    def _get_cursor(self):
+        """
+        Returns the read cursor of the current thread, taking an idle
+        read-only connection from the pool or opening a new one if not
+        already existent.
+
+        .. note:: The connection is recycled as soon as the cursor is
+            dropped, i.e., when the thread exits.
+
+        :rtype: sqlite3.Cursor
+        """
+        try:
+            return self.local.cur
+        except AttributeError:
+            pass
+
+        if self.dbfile in (':memory:', ''):
+            self.local.cur = self.con.cursor()
+            return self.local.cur
+
+        with self.handles_lock:
+            con = self.idle.pop() if self.idle else None
+
+        if con is None:
+            con = self._connect_readonly()
+
+            with self.handles_lock:
+                self.readers += [con]
+
+        cur = con.cursor()
+        weakref.finalize(cur, SqliteTree._recycle, weakref.ref(self), con)
+
+        self.local.cur = cur
+        return cur
+
+
+    @staticmethod
+    def _recycle(ref, con):
+        """
+        Returns the provided read connection to the pool of idle connections
+        of the referenced tree, closing it if the pool is full or the tree
+        no longer exists.
+
+        :param ref: weak reference to the tree
+        :type ref: weakref.ref
+        :param con: read connection
+        :type con: sqlite3.Connection
+        """
+        tree = ref()
+        if tree is not None:
+            with tree.handles_lock:
+                if con not in tree.readers:
+                    return      # Already closed or inherited
+
+                if len(tree.idle) < tree.pool_size:
+                    tree.idle += [con]
+                    return
+
+                tree.readers.remove(con)
+
+        con.close()
+
+
+    def _release_cursor(self):
+        """
+        Closes the read connection of the current thread, if any. A new one
+        will be opened on demand.
+        """
+        cur = getattr(self.local, 'cur', None)
+        if cur is None:
+            return
+
+        if self.dbfile in (':memory:', ''):
+            del self.local.cur
+            return
+
+        con = cur.connection
+        with self.handles_lock:
+            owned = con in self.readers
+            if owned:
+                self.readers.remove(con)
+
+        del self.local.cur
+        del cur
+
+        if owned:
+            con.close()
+
+
+    @contextmanager
+    def snapshot(self):
+        """
+        Context manager holding a read transaction on the connection of the
+        current thread, so that all reads performed within see the same
+        database snapshot regardless of concurrent appends.
+
+        .. note:: Proofs against a given size only read leaves which have
+            already been committed, so that a single proof is always
+            consistent. Use this in order to combine several operations
+            (e.g., size polling, state and proof retrieval) consistently.
+            In rollback-journal mode the snapshot blocks the writer until
+            released; prefer ``WAL`` journaling when using it.
+
+        .. note:: This is a no-op for in-memory databases, which are
+            accessed through the writer connection.
+        """
+        cur = self._get_cursor()
+        con = cur.connection
+
+        if con is self.con or con.in_transaction:
+            yield self
+            return
+
+        cur.execute('BEGIN')
+        try:
+            yield self
+        finally:
+            con.commit()
+
+
+    def _check_writable(self):
+        """
+        :raises sqlite3.OperationalError: if the tree has been opened in
+            read-only mode
+        """
+        if self.readonly:
+            raise sqlite3.OperationalError('attempt to write a readonly '
+                'database')
 
 
     def _encode_entry(self, data):
@@ -71,15 +419,45 @@ class SqliteTree(BaseMerkleTree):
         if not isinstance(data, bytes):
             raise ValueError('Provided data is not binary')
 
+        self._check_writable()
         cur = self.cur
 
-        with self.con:
+        with self.writer_lock, self.con:
             query = f'''
                 INSERT INTO leaf(entry, hash) VALUES (?, ?)
             '''
             cur.execute(query, (data, digest))
 
-        return cur.lastrowid
+            return cur.lastrowid
+
+
+    def _store_leaves(self, entries, digests):
+        """
+        Creates in respective order new leaves storing the provided entries
+        along with their hash values within a single transaction.
+
+        :param entries: data entries
+        :type entries: list of bytes
+        :param digests: hashed data
+        :type digests: list of bytes
+        :returns: index of last appended leaf counting from one
+        :rtype: int
+        """
+        self._check_writable()
+        cur = self.cur
+
+        with self.writer_lock, self.con:
+            query = f'''
+                INSERT INTO leaf(entry, hash) VALUES (?, ?)
+            '''
+            cur.executemany(query, zip(entries, digests))
+
+            query = f'''
+                SELECT IFNULL(MAX(id), 0) FROM leaf
+            '''
+            cur.execute(query)
+
+            return cur.fetchone()
 
 
     def _get_leaf(self, index):
@@ -90,7 +468,7 @@ class SqliteTree(BaseMerkleTree):
         :type index: int
         :rtype: bytes
         """
-        cur = self.cur
+        cur = self._get_cursor()
 
         query = f'''
             SELECT hash FROM leaf WHERE id = ?
@@ -110,7 +488,7 @@ class SqliteTree(BaseMerkleTree):
         :param width: number of leaves to consider
         :type width: int
         """
-        cur = self.cur
+        cur = self._get_cursor()
 
         query = f'''
             SELECT hash FROM leaf WHERE id BETWEEN ? AND ?
@@ -122,17 +500,29 @@ class SqliteTree(BaseMerkleTree):
 
     def _get_size(self):
         """
+        .. note:: Leaves are never deleted, so that the size coincides with the
+            greatest leaf index, which is retrieved from the primary key index
+            without scanning the table. The size of an immutable database is
+            retrieved only once.
+
         :returns: current number of leaves
         :rtype: int
         """
-        cur = self.cur
+        if self._size is not None:
+            return self._size
+
+        cur = self._get_cursor()
 
         query = f'''
-            SELECT COUNT(*) FROM leaf
+            SELECT IFNULL(MAX(id), 0) FROM leaf
         '''
         cur.execute(query)
+        size = cur.fetchone()
 
-        return cur.fetchone()
+        if self.immutable:
+            self._size = size
+
+        return size
 
 
     def get_entry(self, index):
@@ -143,7 +533,7 @@ class SqliteTree(BaseMerkleTree):
         :type index: int
         :rtype: bytes
         """
-        cur = self.cur
+        cur = self._get_cursor()
 
         query = f'''
             SELECT entry FROM leaf WHERE id = ?
@@ -153,6 +543,27 @@ class SqliteTree(BaseMerkleTree):
         return cur.fetchone()
 
 
+    def get_entries(self, offset, width):
+        """
+        Returns in respective order the unhashed data stored by the leaves in
+        the specified range.
+
+        :param offset: starting position counting from zero
+        :type offset: int
+        :param width: number of leaves to consider
+        :type width: int
+        :rtype: list of bytes
+        """
+        cur = self._get_cursor()
+
+        query = f'''
+            SELECT entry FROM leaf WHERE id BETWEEN ? AND ?
+        '''
+        cur.execute(query, (offset + 1, offset + width))
+
+        return cur.fetchall()
+
+
     def _hash_per_chunk(self, entries, chunksize):
         """
         Generator yielding in chunks pairs of entry data and hash value.
@@ -174,7 +585,7 @@ class SqliteTree(BaseMerkleTree):
             chunk = entries[offset: offset + chunksize]
 
 
-    def append_entries(self, entries, chunksize=100_000):
+    def append_entries(self, entries, chunksize=100_000, prove=False):
         """
         Bulk operation for appending a batch of entries.
 
@@ -183,16 +594,27 @@ class SqliteTree(BaseMerkleTree):
         :param chunksize: [optional] number entries to insert per
             database transaction.
         :type chunksize: int
-        :returns: index of last appended entry
-        :rtype: int
+        :param prove: [optional] if *True*, also return the proofs of
+            inclusion of the appended leaves against the post-append size.
+            Defaults to *False*.
+        :type prove: bool
+        :returns: index of last appended entry (along with the proofs of
+            inclusion of the appended leaves if requested)
+        :rtype: int or (int, list[MerkleProof])
         """
+        self._check_writable()
         cur = self.cur
 
-        with self.con:
+        with self.writer_lock, self.con:
             query = f'''
                 INSERT INTO leaf(entry, hash) VALUES (?, ?)
             '''
+            digests = []
             for chunk in self._hash_per_chunk(entries, chunksize):
+                if prove:
+                    chunk = list(chunk)
+                    digests += [digest for (_, digest) in chunk]
+
                 cur.execute('BEGIN TRANSACTION')
 
                 for (data, digest) in chunk:
@@ -200,4 +622,9 @@ class SqliteTree(BaseMerkleTree):
 
                 cur.execute('END TRANSACTION')
 
-        return cur.lastrowid
+            index = cur.lastrowid
+
+        if prove:
+            return index, self._prove_appended(index - len(digests), digests)
+
+        return index
@@ -0,0 +1,398 @@
+import time
+from collections import namedtuple
+from threading import Condition, Lock, Thread
+
+from pymerkle.core import BaseMerkleTree
+
+
+_SpillInfo = namedtuple('SpillInfo', ['size', 'budget', 'hot', 'cold',
+    'spills', 'elapsed'])
+
+
+class TieredTree(BaseMerkleTree):
+    """
+    Merkle-tree keeping the most recent leaves in memory, while spilling older
+    leaves to a persistent tree.
+
+    Inserted data is expected to be in binary format and hashed without
+    further processing.
+
+    .. note:: Leaves are appended to the in-memory (hot) tier. Whenever its
+        size exceeds the memory budget, the oldest leaves are spilled in the
+        background to the persistent (cold) tier until the hot tier is down
+        to half the budget. Leaf ranges spanning both tiers are stitched
+        transparently. Leaves are moved out of the hot tier only after being
+        committed to the cold one, so that reads never miss a leaf.
+
+    .. warning:: Leaves which have not yet been spilled are lost if the
+        process exits without calling ``flush`` or ``close``.
+
+    :param cold: persistent tree storing older leaves, e.g., ``SqliteTree``
+        or ``MmapTree``. Its leaves are considered as already spilled and its
+        hashing configuration is inherited.
+    :type cold: pymerkle.BaseMerkleTree
+    :param budget: [optional] memory budget of the hot tier in bytes,
+        counting entries along with their hashes. Defaults to 64MiB.
+    :type budget: int
+    :param disable_async: [optional] if *True*, leaves will be spilled
+        synchronously upon append. Defaults to *False*.
+    :type disable_async: bool
+    """
+
+    def __init__(self, cold, **opts):
+        self.cold = cold
+        self.budget = opts.get('budget', 64 * 1024 ** 2)
+        self.asynchronous = not opts.get('disable_async', False)
+
+        self.entries = []
+        self.digests = []
+        self.offset = cold.get_size()
+        self.nbytes = 0
+        self.spills = 0
+        self.elapsed = 0.0
+        self.error = None
+        self.closed = False
+
+        self.cond = Condition()
+        self.spill_lock = Lock()
+        self.worker = None
+
+        opts['disable_security'] = not cold.security
+        super().__init__(cold.algorithm, **opts)
+
+        self.digest_size = self.hashfunc().digest_size
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+    def __getstate__(self):
+        raise TypeError('Cannot pickle tree with in-memory tier')
+
+
+    def _reinit(self):
+        """
+        Reinitializes locks and drops the spilling thread, which will be
+        restarted on demand.
+        """
+        super()._reinit()
+        self.cond = Condition()
+        self.spill_lock = Lock()
+        self.worker = None
+
+
+    def _encode_entry(self, data):
+        """
+        Returns the binary format of the provided data entry.
+
+        :param data: data to encode
+        :type data: bytes
+        :rtype: bytes
+        """
+        return data
+
+
+    def _store_leaves(self, entries, digests):
+        """
+        Appends in respective order the provided entries along with their hash
+        values to the hot tier, triggering spilling if the memory budget is
+        exceeded.
+
+        :param entries: data entries
+        :type entries: list of bytes
+        :param digests: hashed data
+        :type digests: list of bytes
+        :returns: index of last appended leaf counting from one
+        :rtype: int
+        :raises ValueError: if some entry is not binary
+
+        .. note:: Spilling failures, either in the background or upon
+            synchronous spilling, do not affect the append which triggered
+            them. They are raised by the next append (before taking any
+            effect) and by ``close``.
+        """
+        for data in entries:
+            if not isinstance(data, bytes):
+                raise ValueError('Provided data is not binary')
+
+        with self.cond:
+            if self.error is not None:
+                raise self.error
+
+            self.entries += entries
+            self.digests += digests
+            self.nbytes += sum(map(len, entries)) + \
+                len(digests) * self.digest_size
+
+            index = self.offset + len(self.digests)
+            exceeded = self.nbytes > self.budget
+
+            if exceeded and self.asynchronous:
+                if self.worker is None:
+                    self.worker = Thread(target=self._run, daemon=True)
+                    self.worker.start()
+
+                self.cond.notify()
+
+        if exceeded and not self.asynchronous:
+            try:
+                self._spill(self.budget // 2)
+            except Exception as err:
+                with self.cond:
+                    self.error = err
+
+        return index
+
+
+    def _store_leaf(self, data, digest):
+        """
+        Creates a new leaf storing the provided data along with its
+        hash value.
+
+        :param data: data entry
+        :type data: whatever expected according to application logic
+        :param digest: hashed data
+        :type digest: bytes
+        :returns: index of newly appended leaf counting from one
+        :rtype: int
+        """
+        return self._store_leaves([data], [digest])
+
+
+    def append_entries(self, entries, prove=False):
+        """
+        Bulk operation for appending a batch of entries.
+
+        :param entries: data entries to append
+        :type entries: iterable of bytes
+        :param prove: [optional] if *True*, also return the proofs of
+            inclusion of the appended leaves against the post-append size.
+            Defaults to *False*.
+        :type prove: bool
+        :returns: index of last appended entry (along with the proofs of
+            inclusion of the appended leaves if requested)
+        :rtype: int or (int, list[MerkleProof])
+        """
+        entries = list(entries)
+
+        hash_buff = self.hash_buff
+        digests = [hash_buff(data) for data in entries]
+
+        index = self._store_leaves(entries, digests)
+
+        if prove:
+            return index, self._prove_appended(index - len(digests), digests)
+
+        return index
+
+
+    def _run(self):
+        """
+        Spills the hot tier in the background whenever the memory budget is
+        exceeded.
+        """
+        while True:
+            with self.cond:
+                while self.nbytes <= self.budget and not self.closed:
+                    self.cond.wait()
+
+                if self.closed:
+                    return
+
+            try:
+                self._spill(self.budget // 2)
+            except Exception as err:
+                with self.cond:
+                    self.error = err
+                return
+
+
+    def _spill(self, target, chunksize=100_000):
+        """
+        Moves the oldest leaves of the hot tier to the cold tier until the
+        former is down to the provided size.
+
+        .. note:: Leaves are committed to the cold tier without holding the
+            lock of the hot tier, so that appends and reads are not blocked.
+
+        :param target: size of hot tier in bytes
+        :type target: int
+        :param chunksize: [optional] maximum number of leaves to commit at once
+        :type chunksize: int
+        """
+        with self.spill_lock:
+            while True:
+                with self.cond:
+                    if self.nbytes <= target or not self.digests:
+                        return
+
+                    excess = self.nbytes - target
+                    count = 0
+                    nbytes = 0
+                    for data in self.entries[:chunksize]:
+                        count += 1
+                        nbytes += len(data) + self.digest_size
+                        if nbytes >= excess:
+                            break
+
+                    entries = self.entries[:count]
+                    digests = self.digests[:count]
+
+                start_time = time.time()
+                self.cold._store_leaves(entries, digests)
+                elapsed_time = time.time() - start_time
+
+                with self.cond:
+                    del self.entries[:count]
+                    del self.digests[:count]
+                    self.offset += count
+                    self.nbytes -= nbytes
+                    self.spills += 1
+                    self.elapsed += elapsed_time
+
+
+    def flush(self):
+        """
+        Spills synchronously the hot tier as a whole.
+        """
+        self._spill(0)
+
+
+    def close(self):
+        """
+        Stops background spilling, flushes the hot tier and closes the cold
+        tier.
+
+        .. note:: The cold tier is closed even if spilling has failed, in
+            which case the failure is raised.
+        """
+        with self.cond:
+            self.closed = True
+            self.cond.notify()
+            worker = self.worker
+
+        if worker is not None:
+            worker.join()
+
+        try:
+            if self.error is not None:
+                raise self.error
+
+            self.flush()
+        finally:
+            self.cold.close()
+
+
+    def get_spill_info(self):
+        """
+        Returns spilling info, namely the size of the hot tier in bytes, the
+        memory budget, the number of leaves in the hot and cold tier
+        respectively, the number of spills and the total time spent spilling
+        in seconds.
+        """
+        with self.cond:
+            return _SpillInfo(self.nbytes, self.budget, len(self.digests),
+                self.offset, self.spills, self.elapsed)
+
+
+    def _get_leaf(self, index):
+        """
+        Returns the hash stored at the specified leaf.
+
+        :param index: leaf index counting from one
+        :type index: int
+        :rtype: bytes
+        """
+        with self.cond:
+            offset = self.offset
+            if index > offset:
+                if index > offset + len(self.digests):
+                    raise ValueError("%d not in leaf range" % index)
+
+                return self.digests[index - offset - 1]
+
+        return self.cold._get_leaf(index)
+
+
+    def _get_leaves(self, offset, width):
+        """
+        Returns in respective order the hashes stored by the leaves in the
+        specified range, stitching together the cold and hot tier if needed.
+
+        :param offset: starting position counting from zero
+        :type offset: int
+        :param width: number of leaves to consider
+        :type width: int
+        :rtype: list of bytes
+        """
+        limit = offset + width
+
+        with self.cond:
+            start = self.offset
+            hot = self.digests[max(offset - start, 0): max(limit - start, 0)]
+
+        if offset >= start:
+            return hot
+
+        cold = self.cold._get_leaves(offset, min(limit, start) - offset)
+
+        return list(cold) + hot
+
+
+    def get_entries(self, offset, width):
+        """
+        Returns in respective order the unhashed data stored by the leaves in
+        the specified range, stitching together the cold and hot tier if
+        needed.
+
+        :param offset: starting position counting from zero
+        :type offset: int
+        :param width: number of leaves to consider
+        :type width: int
+        :rtype: list of bytes
+        """
+        limit = offset + width
+
+        with self.cond:
+            start = self.offset
+            hot = self.entries[max(offset - start, 0): max(limit - start, 0)]
+
+        if offset >= start:
+            return hot
+
+        cold = self.cold.get_entries(offset, min(limit, start) - offset)
+
+        return list(cold) + hot
+
+
+    def _get_size(self):
+        """
+        :returns: current number of leaves
+        :rtype: int
+        """
+        with self.cond:
+            return self.offset + len(self.digests)
+
+
+    def get_entry(self, index):
+        """
+        Returns the unhashed data stored at the specified leaf.
+
+        :param index: leaf index counting from one
+        :type index: int
+        :rtype: bytes
+        """
+        with self.cond:
+            offset = self.offset
+            if index > offset:
+                if index > offset + len(self.entries):
+                    raise ValueError("%d not in leaf range" % index)
+
+                return self.entries[index - offset - 1]
+
+        return self.cold.get_entry(index)
@@ -14,3 +14,8 @@ except ImportError:
     pass
 else:
     ALGORITHMS += KECCAK_ALGORITHMS
+
+
+# Identifiers of hash functions in binary encodings (never to be reassigned)
+ALGORITHM_IDS = {name: code for (code, name) in enumerate(SHA2_ALGORITHMS +
+    SHA3_ALGORITHMS + KECCAK_ALGORITHMS, start=1)}
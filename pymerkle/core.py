@@ -3,14 +3,18 @@ Merkle-tree core functionality
 """
 
 from abc import ABCMeta, abstractmethod
+from bisect import bisect_left
 from collections import deque, namedtuple
 from threading import Lock
+from weakref import WeakSet
 import builtins
+import os
 
 from cachetools import LRUCache
 
 from pymerkle.hasher import MerkleHasher
-from pymerkle.proof import MerkleProof
+from pymerkle.proof import MerkleProof, RangeProof, AuditProof, \
+    _consistency_ranges
 from pymerkle.utils import log2, decompose
 
 
@@ -34,6 +38,18 @@ class InvalidChallenge(Exception):
 _CacheInfo = namedtuple('CacheInfo', ['size', 'capacity', 'hits', 'misses'])
 
 
+_trees = WeakSet()
+
+
+def _reinit_after_fork():
+    for tree in list(_trees):
+        tree._reinit()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reinit_after_fork)
+
+
 class BaseMerkleTree(MerkleHasher, metaclass=ABCMeta):
     """
     Abstract base class encapsulating the core Merkle-tree functionalities in
@@ -63,6 +79,21 @@ class BaseMerkleTree(MerkleHasher, metaclass=ABCMeta):
     :param disable_cache: [optional] if *True*, subroot caching will be
         deactivated. Defaults to *False*.
     :type cache: boolean
+    :param cache: [optional] custom subroot cache, e.g., a
+        ``pymerkle.cache.SharedCache`` shared across processes. Defaults to a
+        process-local LRU cache of the provided capacity.
+    :type cache: mapping
+    :raises ValueError: if the digest size of the provided cache does not
+        match the hash algorithm
+    :param pickle_cache: [optional] if *True*, the current subroot cache will
+        be included when pickling the tree, e.g., in order to send it warm to
+        a process pool. Defaults to *False*.
+    :type pickle_cache: boolean
+
+    .. note:: Trees are picklable by configuration: process-local resources
+        (locks, storage handles) are excluded and reinitialized on the
+        receiving side. Similarly, they are reinitialized in the child
+        process after ``fork``, where the subroot cache is inherited as is.
     """
 
     def __init__(self, algorithm='sha256', **opts):
@@ -70,10 +101,14 @@ class BaseMerkleTree(MerkleHasher, metaclass=ABCMeta):
         self.security = not opts.get('disable_security', False)
         self.threshold = opts.get('threshold', 128)
         self.capacity = opts.get('capacity', 1024 ** 3)
-        self.cache = LRUCache(maxsize=self.capacity, getsizeof=len)
+        self.cache = opts.get('cache')
+        if self.cache is None:
+            self.cache = LRUCache(maxsize=self.capacity, getsizeof=len)
         self.hits = 0
         self.misses = 0
         self.lock = Lock()
+        self.pickle_cache = opts.get('pickle_cache', False)
+        _trees.add(self)
 
         if opts.get('disable_optimizations', False):
             self._get_root = self._get_root_naive
@@ -85,6 +120,41 @@ class BaseMerkleTree(MerkleHasher, metaclass=ABCMeta):
 
         super().__init__(self.algorithm, self.security)
 
+        digest_size = getattr(self.cache, 'digest_size', None)
+        if digest_size is not None and \
+                digest_size != self.hashfunc().digest_size:
+            raise ValueError('Cache digest size does not match algorithm')
+
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['lock']
+
+        if not self.pickle_cache and isinstance(self.cache, LRUCache):
+            state['cache'] = LRUCache(maxsize=self.capacity, getsizeof=len)
+            state['hits'] = 0
+            state['misses'] = 0
+
+        return state
+
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._reinit()
+        _trees.add(self)
+
+
+    def _reinit(self):
+        """
+        Reinitializes process-local resources. Invoked in the child process
+        after ``fork`` and upon unpickling.
+
+        .. note:: Concrete implementations holding storage handles which
+            cannot be shared across processes should extend this method so
+            as to reopen them lazily.
+        """
+        self.lock = Lock()
+
 
     def _hash_entry(self, data):
         return self.hash_buff(data)
@@ -94,22 +164,104 @@ class BaseMerkleTree(MerkleHasher, metaclass=ABCMeta):
         return self.hash_pair(lnode, rnode)
 
 
-    def append_entry(self, data):
+    def append_entry(self, data, prove=False):
         """
         Appends a new leaf storing the provided data entry.
 
         :param data: data to append
         :type data: whatever expected according to application logic
-        :returns: index of newly appended leaf counting from one
-        :rtype: int
+        :param prove: [optional] if *True*, also return the proof of inclusion
+            of the new leaf against the post-append size. Defaults to *False*.
+        :type prove: bool
+        :returns: index of newly appended leaf counting from one (along with
+            its proof of inclusion if requested)
+        :rtype: int or (int, MerkleProof)
         """
         buffer = self._encode_entry(data)
         digest = self._hash_entry(buffer)
         index = self._store_leaf(data, digest)
 
+        if prove:
+            return index, self._prove_appended(index - 1, [digest])[0]
+
         return index
 
 
+    def _prove_appended(self, size1, digests):
+        """
+        Computes the proofs of inclusion for the leaves appended after the
+        provided size against the post-append size.
+
+        .. note:: Nodes lying entirely within the appended batch are built
+            bottom-up from the provided hashes, while nodes lying entirely
+            within the prior tree are among the subroots it decomposes to.
+            Storage is thus accessed only for these *O(log n)* subroots,
+            which are usually cached.
+
+        :param size1: number of leaves before the append
+        :type size1: int
+        :param digests: hashes of the appended leaves in respective order
+        :type digests: list[bytes]
+        :rtype: list[MerkleProof]
+        """
+        size2 = size1 + len(digests)
+        if size1 == size2:
+            return []
+
+        peaks = {}
+        offset = 0
+        for p in reversed(decompose(size1)):
+            width = 1 << p
+            peaks[(offset, offset + width)] = self._get_subroot(offset, width)
+            offset += width
+
+        # Level per height holding the perfect subtrees lying entirely within
+        # the batch, along with the index of the first one
+        hash_nodes = self._hash_nodes
+        levels = [(size1, digests)]
+        height = 0
+        while True:
+            first, level = levels[-1]
+            upper = -(-size1 >> (height + 1))
+            count = (size2 >> (height + 1)) - upper
+            if count <= 0:
+                break
+
+            position = 2 * upper - first
+            levels += [(upper, [hash_nodes(level[i], level[i + 1]) for i in
+                range(position, position + 2 * count, 2)])]
+            height += 1
+
+        nodes = {}
+
+        def get_node(offset, limit):
+            width = limit - offset
+            if limit <= size1:
+                node = peaks.get((offset, limit))
+                return node if node is not None else self._get_root(offset,
+                    limit)
+
+            if offset >= size1 and width & (width - 1) == 0 and \
+                    offset % width == 0:
+                first, level = levels[width.bit_length() - 1]
+                return level[offset // width - first]
+
+            node = nodes.get((offset, limit))
+            if node is None:
+                k = 1 << log2(width)
+                if k == width:
+                    k >>= 1
+
+                node = hash_nodes(get_node(offset, offset + k),
+                    get_node(offset + k, limit))
+                nodes[(offset, limit)] = node
+
+            return node
+
+        return list(self._iter_inclusion_paths(size1, size2, size2, get_node,
+            False))
+
+
     def get_leaf(self, index):
         """
         Returns the leaf hash located at the provided position.
@@ -146,6 +298,90 @@ class BaseMerkleTree(MerkleHasher, metaclass=ABCMeta):
         return self._get_root(0, size)
 
 
+    def get_states(self, sizes):
+        """
+        Computes the root-hashes of the tree corresponding to the provided
+        numbers of leaves.
+
+        .. note:: Sizes are swept in ascending order by means of
+            ``_sweep_subroots``, so that subroots shared by consecutive sizes
+            are retrieved only once.
+
+        :param sizes: numbers of leaves to consider
+        :type sizes: iterable of int
+        :returns: states in respective order
+        :rtype: list[bytes]
+        :raises InvalidChallenge: if some of the provided sizes is out of
+            bounds
+        """
+        sizes = list(sizes)
+        if not sizes:
+            return []
+
+        if not (0 <= min(sizes) and max(sizes) <= self.get_size()):
+            raise InvalidChallenge('Provided size is out of bounds')
+
+        hash_nodes = self._hash_nodes
+
+        states = {0: self.hash_empty()}
+        for (size, peaks) in self._sweep_subroots(sorted(set(sizes)), {}):
+            if size == 0:
+                continue
+
+            state = peaks[-1]
+            for node in reversed(peaks[:-1]):
+                state = hash_nodes(node, state)
+
+            states[size] = state
+
+        return [states[size] for size in sizes]
+
+
+    def _sweep_subroots(self, sizes, nodes):
+        """
+        Iterates over the provided sizes along with the subroots each
+        decomposes to, maintaining the latter while advancing from one size
+        to the next.
+
+        .. note:: Advancing fetches only the subroots lying between
+            consecutive sizes, merging them with the maintained ones wherever
+            possible, so that the whole sweep hashes every leaf at most once
+            even if the subroot cache is cold. Every fetched or merged
+            subroot is recorded in the provided mapping for later reuse.
+
+        :param sizes: numbers of leaves in ascending order
+        :type sizes: iterable of int
+        :param nodes: mapping from leaf ranges to the respective subroots
+        :type nodes: dict
+        :returns: size along with its subroots in left to right order
+        :rtype: iterator of (int, list[bytes])
+        """
+        _get_subroot = self._get_subroot
+        hash_nodes = self._hash_nodes
+
+        peaks = []
+        offset = 0
+        for size in sizes:
+            while offset < size:
+                width = offset & -offset or 1 << log2(size)
+                while width > size - offset:
+                    width >>= 1
+
+                node = _get_subroot(offset, width)
+                offset += width
+                nodes[(offset - width, offset)] = node
+
+                while peaks and peaks[-1][0] == width:
+                    _, lnode = peaks.pop()
+                    node = hash_nodes(lnode, node)
+                    width <<= 1
+                    nodes[(offset - width, offset)] = node
+
+                peaks += [(width, node)]
+
+            yield size, [node for (_, node) in peaks]
+
+
     def prove_inclusion(self, index, size=None):
         """
         Proves inclusion of the hash located at the provided index against the
@@ -208,12 +444,314 @@ class BaseMerkleTree(MerkleHasher, metaclass=ABCMeta):
                 subset, path)
 
 
+    def prove_consistency_many(self, sizes1, size2=None):
+        """
+        Proves consistency between the states corresponding to each of the
+        provided prior sizes and the state corresponding to the provided
+        later size.
+
+        .. note:: The consistency paths against a common later state share
+            their rightmost nodes, while paths of nearby prior sizes share
+            most of their leftmost ones. Prior sizes are first swept in
+            ascending order by means of ``_sweep_subroots``, which yields
+            the subroots lying next to every prior size. Every node is then
+            computed once for the whole batch, with non-perfect nodes derived
+            from their children instead of being recomputed from subroots.
+
+        :param sizes1: numbers of leaves for prior states
+        :type sizes1: iterable of int
+        :param size2: [optional] number of leaves for later state. Defaults to
+            current tree size.
+        :type size2: int
+        :returns: proofs in respective order
+        :rtype: list[MerkleProof]
+        :raises InvalidChallenge: if the provided parameters are invalid or
+            incompatible with each other
+        """
+        currsize = self.get_size()
+
+        if size2 is None:
+            size2 = currsize
+
+        if not (0 < size2 <= currsize):
+            raise InvalidChallenge('Provided later size out of bounds')
+
+        sizes1 = list(sizes1)
+        if sizes1 and not (0 < min(sizes1) and max(sizes1) <= size2):
+            raise InvalidChallenge('Provided prior size out of bounds')
+
+        _get_leaf = self._get_leaf
+        _get_subroot = self._get_subroot
+        hash_nodes = self._hash_nodes
+
+        nodes = {}
+        for _ in self._sweep_subroots(sorted(set(sizes1)) + [size2], nodes):
+            pass
+
+        def get_node(offset, limit):
+            node = nodes.get((offset, limit))
+            if node is None:
+                width = limit - offset
+                if width == 1:
+                    node = _get_leaf(limit)
+                elif width & (width - 1) == 0 and offset % width == 0:
+                    node = _get_subroot(offset, width)
+                else:
+                    k = 1 << log2(width)
+                    if k == width:
+                        k >>= 1
+
+                    node = hash_nodes(get_node(offset, offset + k),
+                        get_node(offset + k, limit))
+
+                nodes[(offset, limit)] = node
+
+            return node
+
+        proofs = {}
+        for size1 in sorted(set(sizes1)):
+            rule, subset, ranges = _consistency_ranges(size1, size2)
+            path = [get_node(*args) for args in ranges]
+            proofs[size1] = MerkleProof(self.algorithm, self.security, size2,
+                rule, subset, path)
+
+        return [proofs[size1] for size1 in sizes1]
+
+
+    def iter_inclusion_proofs(self, start, end, size=None, binary=False,
+            chunksize=1024):
+        """
+        Iterates over the proofs of inclusion for the provided range of
+        leaves in left to right order against the tree corresponding to the
+        provided number of leaves.
+
+        .. note:: Consecutive leaves share most of their path. Only the
+            nodes that change from one leaf to the next are retrieved, the
+            ones lying on the left being rebuilt from the previous path
+            without accessing storage. Leaves are read in chunks, so that
+            memory remains bounded regardless of the range length.
+
+        :param start: leftmost leaf of the range counting from zero
+        :type start: int
+        :param end: rightmost leaf of the range counting from one
+        :type end: int
+        :param size: [optional] number of leaves to consider. Defaults to
+            current tree size
+        :type size: int
+        :param binary: [optional] if *True*, yield binary encodings instead of
+            proof objects. Defaults to *False*.
+        :type binary: bool
+        :param chunksize: [optional] number of leaves to read at once
+        :type chunksize: int
+        :rtype: iterator of MerkleProof (or bytes)
+        :raises InvalidChallenge: if the provided parameters are invalid or
+            incompatible with each other
+        """
+        currsize = self.get_size()
+
+        if size is None:
+            size = currsize
+
+        if not (0 < size <= currsize):
+            raise InvalidChallenge('Provided size is out of bounds')
+
+        if not (0 <= start < end <= size):
+            raise InvalidChallenge('Provided range is out of bounds')
+
+        buff = []
+        buff_start = start
+
+        def get_leaf(offset):
+            nonlocal buff, buff_start
+            if not (buff_start <= offset < buff_start + len(buff)):
+                buff = self._get_leaves(offset, min(chunksize, size - offset))
+                buff_start = offset
+
+            return buff[offset - buff_start]
+
+        _get_root = self._get_root
+
+        def get_node(offset, limit):
+            if limit - offset == 1:
+                return get_leaf(offset)
+
+            return _get_root(offset, limit)
+
+        return self._iter_inclusion_paths(start, end, size, get_node, binary)
+
+
+    def _iter_inclusion_paths(self, start, end, size, get_node, binary):
+        """
+        Generator underlying ``iter_inclusion_proofs``.
+
+        .. note:: The descent from the root to the current leaf is kept as a
+            stack of nodes along with their siblings. Moving to the next
+            leaf pops the nodes not containing it, folding the previous path
+            into the left sibling of the new branch, and descends again from
+            there. This takes amortized constant time per leaf.
+
+        .. warning:: Do not use this method directly unless you know what you
+            do. Use ``iter_inclusion_proofs`` instead.
+
+        :param get_node: returns the root-hash for the provided leaf range
+            (offset counting from zero, limit counting from one). Invoked
+            only for nodes not covered by the previous path.
+        :type get_node: callable
+        """
+        hash_nodes = self._hash_nodes
+
+        # Per depth: bounds of the node containing the current leaf, its
+        # direction, its sibling and the rule bits accumulated from the root
+        starts, limits, bits, siblings, rules = [0], [size], [0], [], [0]
+
+        leaf = start
+        left = None
+        while True:
+            lower, upper = starts[-1], limits[-1]
+            while upper - lower > 1:
+                k = 1 << log2(upper - lower)
+                if k == upper - lower:
+                    k >>= 1
+
+                if leaf < lower + k:
+                    siblings += [get_node(lower + k, upper)]
+                    upper = lower + k
+                    bit = 0
+                else:
+                    siblings += [left if left is not None else
+                        get_node(lower, lower + k)]
+                    left = None
+                    lower += k
+                    bit = 1
+
+                starts += [lower]
+                limits += [upper]
+                bits += [bit]
+                rules += [(rules[-1] << 1) | bit]
+
+            node = get_node(leaf, leaf + 1)
+            proof = MerkleProof(self.algorithm, self.security, size,
+                rules[-1], [], [node] + siblings[::-1])
+
+            yield proof.to_bytes() if binary else proof
+
+            leaf += 1
+            if leaf == end:
+                break
+
+            while limits[-2] <= leaf:
+                sibling = siblings.pop()
+                if bits.pop():
+                    node = hash_nodes(sibling, node)
+                else:
+                    node = hash_nodes(node, sibling)
+
+                starts.pop()
+                limits.pop()
+                rules.pop()
+
+            starts.pop()
+            limits.pop()
+            bits.pop()
+            siblings.pop()
+            rules.pop()
+            left = node
+
+
+    def prove_range(self, start, end, size=None):
+        """
+        Proves inclusion of the hashes located at the provided range of
+        leaves against the tree corresponding to the provided number of
+        leaves.
+
+        .. note:: The proof consists only of the nodes adjacent to the range
+            (*O(log n)* regardless of its length), retrieved through
+            ``_get_root`` so that the subroot cache is reused.
+
+        :param start: leftmost leaf of the range counting from zero
+        :type start: int
+        :param end: rightmost leaf of the range counting from one
+        :type end: int
+        :param size: [optional] number of leaves to consider. Defaults to
+            current tree size
+        :type size: int
+        :rtype: RangeProof
+        :raises InvalidChallenge: if the provided parameters are invalid or
+            incompatible with each other
+        """
+        currsize = self.get_size()
+
+        if size is None:
+            size = currsize
+
+        if not (0 < size <= currsize):
+            raise InvalidChallenge('Provided size is out of bounds')
+
+        if not (0 <= start < end <= size):
+            raise InvalidChallenge('Provided range is out of bounds')
+
+        path = self._range_path(0, size, start, end)
+
+        return RangeProof(self.algorithm, self.security, size, start, end,
+                path)
+
+
+    def prove_audit(self, size1, indices, size2=None):
+        """
+        Proves consistency between the states corresponding to the provided
+        sizes along with inclusion of the provided leaves against the later
+        state, by means of a single bundle.
+
+        .. note:: The paths of hashes of the individual proofs overlap
+            heavily. The bundle includes every node only once and omits the
+            ones computable from the provided leaves, so that ``_get_root``
+            is invoked once per included node.
+
+        :param size1: number of leaves for prior state
+        :type size1: int
+        :param indices: leaf indices counting from one
+        :type indices: iterable of int
+        :param size2: [optional] number of leaves for later state. Defaults to
+            current tree size.
+        :type size2: int
+        :rtype: AuditProof
+        :raises InvalidChallenge: if the provided parameters are invalid or
+            incompatible with each other
+        """
+        currsize = self.get_size()
+
+        if size2 is None:
+            size2 = currsize
+
+        if not (0 < size2 <= currsize):
+            raise InvalidChallenge('Provided later size out of bounds')
+
+        if not (0 < size1 <= size2):
+            raise InvalidChallenge('Provided prior size out of bounds')
+
+        indices = sorted(set(indices))
+        if indices and not (0 < indices[0] and indices[-1] <= size2):
+            raise InvalidChallenge('Provided index is out of bounds')
+
+        offsets = [index - 1 for index in indices]
+        path = self._audit_path(0, size2, size1, offsets)
+
+        return AuditProof(self.algorithm, self.security, size1, size2,
+                indices, path)
+
+
     def get_cache_info(self):
         """
         Returns subroot cache info.
+
+        .. note:: If the cache keeps track of hits and misses by itself (e.g.,
+            aggregated across processes), these are reported instead.
         """
-        return _CacheInfo(self.cache.currsize, self.cache.maxsize, self.hits,
-                self.misses)
+        cache = self.cache
+        hits = getattr(cache, 'hits', self.hits)
+        misses = getattr(cache, 'misses', self.misses)
+
+        return _CacheInfo(cache.currsize, cache.maxsize, hits, misses)
 
 
     def cache_clear(self):
@@ -315,7 +853,12 @@ class BaseMerkleTree(MerkleHasher, metaclass=ABCMeta):
                 pass
 
             self.misses += 1
-            value = self._get_subroot_uncached(offset, width)
+
+        # Compute outside the lock so that concurrent readers do not serialize;
+        # subroots never change, so a duplicate computation is harmless
+        value = self._get_subroot_uncached(offset, width)
+
+        with self.lock:
             self.cache[key] = value
 
         return value
@@ -503,6 +1046,76 @@ class BaseMerkleTree(MerkleHasher, metaclass=ABCMeta):
         return rule, subset, path
 
 
+    @profile
+    def _range_path(self, offset, limit, start, end):
+        """
+        Computes in left to right order the nodes of the specified leaf range
+        which are adjacent to the provided range of leaves.
+
+        .. warning:: Do not use this method directly unless you know what you
+            do. Use ``prove_range`` instead.
+
+        :param offset: leftmost leaf index counting from zero
+        :type offset: int
+        :param limit: rightmost leaf index counting from one
+        :type limit: int
+        :param start: leftmost leaf of the range counting from zero
+        :type start: int
+        :param end: rightmost leaf of the range counting from one
+        :type end: int
+        :rtype: list[bytes]
+        """
+        if limit <= start or offset >= end:
+            return [self._get_root(offset, limit)]
+
+        if start <= offset and limit <= end:
+            return []
+
+        k = 1 << log2(limit - offset)
+        if k == limit - offset:
+            k >>= 1
+
+        return self._range_path(offset, offset + k, start, end) + \
+            self._range_path(offset + k, limit, start, end)
+
+
+    @profile
+    def _audit_path(self, offset, limit, size1, offsets):
+        """
+        Computes in left to right order the nodes of the specified leaf range
+        which contain neither any of the provided leaves nor the boundary of
+        the prior tree, descending only into those that do.
+
+        .. warning:: Do not use this method directly unless you know what you
+            do. Use ``prove_audit`` instead.
+
+        :param offset: leftmost leaf index counting from zero
+        :type offset: int
+        :param limit: rightmost leaf index counting from one
+        :type limit: int
+        :param size1: number of leaves for prior state
+        :type size1: int
+        :param offsets: leaf indices counting from zero in ascending order
+        :type offsets: list[int]
+        :rtype: list[bytes]
+        """
+        position = bisect_left(offsets, offset)
+        covered = position < len(offsets) and offsets[position] < limit
+
+        if limit - offset == 1 and covered:
+            return []
+
+        if not covered and not offset < size1 < limit:
+            return [self._get_root(offset, limit)]
+
+        k = 1 << log2(limit - offset)
+        if k == limit - offset:
+            k >>= 1
+
+        return self._audit_path(offset, offset + k, size1, offsets) + \
+            self._audit_path(offset + k, limit, size1, offsets)
+
+
     @profile
     def _get_root_naive(self, start, limit):
         """
@@ -0,0 +1,174 @@
+"""
+Binary snapshots of in-memory trees
+"""
+
+import os
+import struct
+from collections import namedtuple
+
+
+_MAGIC = b'PYMKLDP1'
+_VERSION = 1
+_HEADER = struct.Struct('<8sBBBxI16sQ')
+_LENGTH = struct.Struct('<I')
+
+
+Dump = namedtuple('Dump', ['algorithm', 'security', 'digest_size', 'size',
+    'levels', 'entries'])
+
+
+def level_sizes(size):
+    """
+    Returns the number of nodes created per level when constructing the tree
+    of the provided size bottom-up, where an unpaired last node at any level
+    is promoted to the next one.
+
+    .. note:: Level *0* consists of the leaves. The sizes sum up to
+        *2 * size - 1* for non-empty trees.
+
+    :param size: number of leaves
+    :type size: int
+    :rtype: list[int]
+    """
+    sizes = [size]
+
+    width = size
+    while width > 1:
+        sizes += [width >> 1]
+        width = (width + 1) >> 1
+
+    return sizes
+
+
+def write_dump(path, tree, size, levels, entries=None):
+    """
+    Writes a binary snapshot of the provided tree to the provided file.
+
+    .. note:: The snapshot consists of a header (hashing configuration and
+        size), followed by the node digests level by level in the order of
+        bottom-up construction and, optionally, the entries as
+        length-prefixed records. The file is written aside and atomically
+        renamed when complete.
+
+    :param path: filepath of snapshot
+    :type path: str
+    :param tree: tree to snapshot
+    :type tree: pymerkle.BaseMerkleTree
+    :param size: number of leaves
+    :type size: int
+    :param levels: concatenated node digests per level
+    :type levels: iterable of bytes
+    :param entries: [optional] entries to include
+    :type entries: iterable of bytes
+    :raises ValueError: if some entry is not binary
+    """
+    digest_size = tree.hashfunc().digest_size
+    header = _HEADER.pack(_MAGIC, _VERSION, tree.security,
+        entries is not None, digest_size, tree.algorithm.encode(), size)
+
+    tmpfile = path + '.tmp'
+    try:
+        with open(tmpfile, 'wb') as f:
+            f.write(header)
+
+            for level in levels:
+                f.write(level)
+
+            if entries is not None:
+                records = []
+                for data in entries:
+                    if not isinstance(data, bytes):
+                        raise ValueError('Provided data is not binary')
+
+                    records += [_LENGTH.pack(len(data)), data]
+                f.write(b''.join(records))
+
+        os.replace(tmpfile, path)
+    finally:
+        if os.path.exists(tmpfile):
+            os.remove(tmpfile)
+
+
+def read_dump(path):
+    """
+    Reads at once the binary snapshot stored in the provided file.
+
+    :param path: filepath of snapshot
+    :type path: str
+    :returns: hashing configuration and size of the snapshotted tree along
+        with its node digests per level (as buffers of concatenated digests)
+        and its entries (*None* if not included)
+    :rtype: Dump
+    :raises ValueError: if the file is not a valid snapshot
+    """
+    with open(path, 'rb') as f:
+        buff = f.read()
+
+    if len(buff) < _HEADER.size:
+        raise ValueError(f'{path} is not a tree snapshot')
+
+    magic, version, security, has_entries, digest_size, algorithm, size = \
+        _HEADER.unpack_from(buff)
+
+    if magic != _MAGIC or version != _VERSION:
+        raise ValueError(f'{path} is not a tree snapshot')
+
+    view = memoryview(buff)
+    offset = _HEADER.size
+
+    levels = []
+    for count in level_sizes(size):
+        end = offset + count * digest_size
+        levels += [view[offset: end]]
+        offset = end
+
+    if offset > len(buff):
+        raise ValueError('Corrupted snapshot')
+
+    entries = None
+    if has_entries:
+        entries = []
+        try:
+            for _ in range(size):
+                length, = _LENGTH.unpack_from(buff, offset)
+                offset += _LENGTH.size
+                entries += [buff[offset: offset + length]]
+                offset += length
+        except struct.error:
+            raise ValueError('Corrupted snapshot')
+
+    if offset != len(buff):
+        raise ValueError('Corrupted snapshot')
+
+    algorithm = algorithm.rstrip(b'\x00').decode()
+
+    return Dump(algorithm, bool(security), digest_size, size, levels, entries)
+
+
+def load_options(dump, opts):
+    """
+    Returns the provided tree options with the hashing configuration of the
+    provided snapshot, after checking that they do not contradict each
+    other.
+
+    :param dump: snapshot as returned by ``read_dump``
+    :type dump: Dump
+    :param opts: tree options provided upon loading
+    :type opts: dict
+    :rtype: dict
+    :raises ValueError: if the provided options specify a different hashing
+        configuration
+    """
+    opts = dict(opts)
+
+    algorithm = opts.pop('algorithm', dump.algorithm)
+    if algorithm != dump.algorithm:
+        raise ValueError('Snapshot has different hashing algorithm')
+
+    security = not opts.pop('disable_security', not dump.security)
+    if security != dump.security:
+        raise ValueError('Snapshot has different security mode')
+
+    opts['disable_security'] = not dump.security
+
+    return opts
@@ -102,3 +102,35 @@ class MerkleHasher:
         :rtype: bytes
         """
         return self.hashfunc(self.prefx01 + buff1 + buff2).digest()
+
+
+_hashers = {}
+
+
+def get_hasher(algorithm, security=True):
+    """
+    Returns the hasher configured as specified, which is created upon first
+    request and shared process-wide afterwards.
+
+    .. note:: Hashers are stateless, so that sharing them is safe across
+        threads.
+
+    :param algorithm: hash algorithm
+    :type algorithm: str
+    :param security: [optional] resistance against second-preimage attack.
+        Defaults to *True*
+    :type security: bool
+    :rtype: MerkleHasher
+    :raises ValueError: if the provided algorithm is not supported
+    """
+    key = (algorithm, security)
+
+    try:
+        return _hashers[key]
+    except KeyError:
+        pass
+
+    hasher = MerkleHasher(algorithm, security)
+    _hashers[key] = hasher
+
+    return hasher
@@ -1,8 +1,53 @@
 import os
 import json
+import struct
+from bisect import bisect_left, insort
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from hmac import compare_digest
+from itertools import islice
 
-from pymerkle.hasher import MerkleHasher
+from pymerkle import constants
+from pymerkle.hasher import get_hasher
+from pymerkle.utils import log2
+
+
+_VERSION = 1
+_HEADER = struct.Struct('<BBBBQI')
+_SECURITY = 0x01
+_SUBSET = 0x02
+_ALGORITHMS = {code: name for (name, code) in constants.ALGORITHM_IDS.items()}
+_FRAME = struct.Struct('<BBBI')
+_KINDS = ('inclusion', 'consistency')
+_KEYS = {'inclusion': ('base', 'root'), 'consistency': ('state1', 'state2')}
+
+
+def _pack_bits(bits):
+    """
+    Packs the provided bits into an integer, least significant bit first.
+
+    :type bits: list[int]
+    :rtype: int
+    :raises ValueError: if some bit is neither 0 nor 1
+    """
+    value = 0
+    for bit in reversed(bits):
+        if bit not in (0, 1):
+            raise ValueError('Invalid bit found')
+        value = (value << 1) | bit
+
+    return value
+
+
+def _unpack_bits(value, count):
+    """
+    Inverse of ``_pack_bits``.
+
+    :type value: int
+    :type count: int
+    :rtype: list[int]
+    """
+    return [(value >> i) & 1 for i in range(count)]
 
 
 class InvalidProof(Exception):
@@ -51,6 +96,360 @@ def verify_consistency(state1, state2, proof):
         raise InvalidProof('Later state does not match')
 
 
+def _split(width):
+    """
+    Returns the width of the left subtree of a tree with the provided number
+    of leaves.
+
+    :type width: int
+    :rtype: int
+    """
+    k = 1 << log2(width)
+    if k == width:
+        k >>= 1
+
+    return k
+
+
+def _inclusion_ranges(offset, size):
+    """
+    Returns the rule of the inclusion path for the leaf located at the
+    provided offset against the provided size, along with the leaf ranges
+    spanned by the respective path nodes.
+
+    .. note:: Mirrors ``BaseMerkleTree._inclusion_path``.
+
+    :param offset: base leaf index counting from zero
+    :type offset: int
+    :param size: number of leaves
+    :type size: int
+    :rtype: (list[int], list[(int, int)])
+    """
+    start, limit, bit = 0, size, 0
+
+    stack = []
+    while limit > start + 1:
+        k = _split(limit - start)
+
+        if offset < start + k:
+            stack += [(bit, (start + k, limit))]
+            limit = start + k
+            bit = 0
+        else:
+            stack += [(bit, (start, start + k))]
+            start += k
+            bit = 1
+
+    rule = [bit]
+    ranges = [(offset, offset + 1)]
+    while stack:
+        bit, args = stack.pop()
+        rule += [bit]
+        ranges += [args]
+
+    return rule, ranges
+
+
+def _consistency_ranges(size1, size2):
+    """
+    Returns the rule, subset and leaf ranges spanned by the nodes of the
+    consistency path between the provided sizes.
+
+    .. note:: Mirrors ``BaseMerkleTree._consistency_path``.
+
+    :param size1: prior number of leaves
+    :type size1: int
+    :param size2: later number of leaves
+    :type size2: int
+    :rtype: (list[int], list[int], list[(int, int)])
+    """
+    start, offset, limit, bit = 0, size1, size2, 0
+
+    stack = []
+    while not offset == limit and not (offset == 0 and limit == 1):
+        k = _split(limit)
+
+        if offset < k:
+            stack += [(bit, 0, (start + k, start + limit))]
+            limit = k
+            bit = 0
+        else:
+            stack += [(bit, 1, (start, start + k))]
+            start += k
+            offset -= k
+            limit -= k
+            bit = 1
+
+    if offset == limit:
+        subset = [1]
+        ranges = [(start, start + limit)]
+    else:
+        subset = [0]
+        ranges = [(start + offset, start + offset + 1)]
+
+    rule = [bit]
+    while stack:
+        bit, mask, args = stack.pop()
+        rule += [bit]
+        subset += [mask]
+        ranges += [args]
+
+    return rule, subset, ranges
+
+
+def update_inclusion(index, inclusion, consistency):
+    """
+    Derives the proof of inclusion for the provided leaf against the later
+    state of the provided proof of consistency, from its proof of inclusion
+    against the prior state, without contacting the prover.
+
+    .. note:: Every node of the new path either appears in one of the
+        provided proofs or is obtained by hashing nodes appearing there, so
+        that no extra nodes are ever needed. The new proof should be
+        verified against the later state as usual.
+
+    :param index: leaf index counting from one
+    :type index: int
+    :param inclusion: proof of inclusion against the prior state
+    :type inclusion: MerkleProof
+    :param consistency: proof of consistency between the prior state and
+        the later state
+    :type consistency: MerkleProof
+    :rtype: MerkleProof
+    :raises InvalidProof: if the provided proofs do not match each other
+    """
+    size1, size2 = inclusion.size, consistency.size
+
+    if (inclusion.algorithm, inclusion.security) != \
+            (consistency.algorithm, consistency.security):
+        raise InvalidProof('Proofs have different hashing configuration')
+
+    if not (0 < index <= size1 <= size2):
+        raise InvalidProof('Provided index is out of bounds')
+
+    rule, ranges = _inclusion_ranges(index - 1, size1)
+    if rule != inclusion.rule:
+        raise InvalidProof('Inclusion path does not match index')
+
+    _, _, path2 = _consistency_ranges(size1, size2)
+    if len(path2) != len(consistency.path):
+        raise InvalidProof('Consistency path does not match size')
+
+    if not compare_digest(consistency.retrieve_prior_state(),
+            inclusion.resolve()):
+        raise InvalidProof('Prior state does not match')
+
+    nodes = dict(zip(ranges, inclusion.path))
+    nodes.update(zip(path2, consistency.path))
+    hash_pair = inclusion.hasher.hash_pair
+
+    def get_node(start, limit):
+        node = nodes.get((start, limit))
+        if node is None:
+            if limit - start == 1:
+                raise InvalidProof('Proofs do not cover leaf %d' % (start + 1))
+
+            k = _split(limit - start)
+            node = hash_pair(get_node(start, start + k), get_node(start + k,
+                limit))
+            nodes[(start, limit)] = node
+
+        return node
+
+    rule, ranges = _inclusion_ranges(index - 1, size2)
+
+    return MerkleProof(inclusion.algorithm, inclusion.security, size2, rule,
+        [], [get_node(*args) for args in ranges])
+
+
+class ConsistencyVerifier:
+    """
+    Verifier of consistency proofs remembering the tree heads (pairs of size
+    and state) already found consistent with one another.
+
+    .. note:: Consistency is a prefix order rather than an equivalence: two
+        heads extending a common head need not be consistent with each
+        other (split view). Verified heads are thus kept as an ordered chain
+        keyed by size, every member of which is a verified prefix of all
+        larger members. A pair of heads is accepted without hashing only if
+        both lie on the chain or the pair itself has been verified.
+
+    .. note:: The first head passed to ``trust`` (or else the first pair
+        verified) anchors the chain. ``update`` extends the chain by means of
+        a single proof against its latest head. Heads verified as prefixes of
+        a chain member join the chain as well, while heads verified as
+        extensions of a member other than the latest are remembered only
+        along with that member.
+    """
+
+    def __init__(self):
+        self.heads = {}
+        self.sizes = []
+        self.ancestors = {}
+
+
+    def _on_chain(self, size, state):
+        """
+        Returns *True* if the provided head lies on the trusted chain.
+        """
+        known = self.heads.get(size)
+
+        return known is not None and compare_digest(known, state)
+
+
+    def _join(self, head):
+        """
+        Inserts the provided head into the trusted chain along with its
+        verified ancestors.
+
+        :raises InvalidProof: if some of them conflicts with the chain
+        """
+        joining = {}
+        stack = [head]
+        while stack:
+            size, state = stack.pop()
+            if size in joining or self._on_chain(size, state):
+                continue
+
+            if size in self.heads:
+                raise InvalidProof('Conflicting state at size %d' % size)
+
+            joining[size] = state
+            stack += self.ancestors.get((size, state), ())
+
+        for (size, state) in joining.items():
+            self.heads[size] = state
+            insort(self.sizes, size)
+
+
+    @property
+    def latest(self):
+        """
+        Head of maximum size on the trusted chain (*None* if nothing is
+        trusted yet).
+
+        :rtype: (int, bytes)
+        """
+        if not self.sizes:
+            return None
+
+        size = self.sizes[-1]
+
+        return size, self.heads[size]
+
+
+    def trust(self, size, state):
+        """
+        Records the provided head on the trusted chain without verification.
+
+        :param size: number of leaves
+        :type size: int
+        :param state: acclaimed state
+        :type state: bytes
+        :raises ValueError: if a different state is trusted for this size
+        """
+        try:
+            self._join((size, bytes(state)))
+        except InvalidProof as err:
+            raise ValueError(str(err))
+
+
+    def is_consistent(self, size1, state1, size2, state2):
+        """
+        Returns *True* if one of the provided heads is already known to be a
+        prefix of the other, without any hashing.
+
+        :rtype: bool
+        """
+        head1, head2 = (size1, bytes(state1)), (size2, bytes(state2))
+        if size1 > size2:
+            head1, head2 = head2, head1
+
+        if head1 == head2:
+            return True
+
+        if self._on_chain(*head1) and self._on_chain(*head2):
+            return True
+
+        return head1 in self.ancestors.get(head2, ())
+
+
+    def verify(self, size1, state1, size2, state2, proof):
+        """
+        Verifies the provided Merkle-proof of consistency against the given
+        heads, unless already known to be consistent.
+
+        .. note:: The sizes are not authenticated by the proof itself. They
+            are checked against the size and structure of the proof before
+            anything is remembered.
+
+        :param size1: prior size
+        :type size1: int
+        :param state1: acclaimed prior state
+        :type state1: bytes
+        :param size2: later size
+        :type size2: int
+        :param state2: acclaimed later state
+        :type state2: bytes
+        :param proof: proof of consistency
+        :type proof: MerkleProof
+        :raises InvalidProof: if the proof is found invalid
+        """
+        state1, state2 = bytes(state1), bytes(state2)
+        if proof.size != size2:
+            raise InvalidProof('Proof size does not match')
+
+        if not 0 < size1 <= size2:
+            raise InvalidProof('Prior size is out of bounds')
+
+        if self.is_consistent(size1, state1, size2, state2):
+            return
+
+        rule, subset, ranges = _consistency_ranges(size1, size2)
+        if len(ranges) != len(proof.path) or rule != proof.rule or \
+                subset != proof.subset:
+            raise InvalidProof('Proof does not match sizes')
+
+        verify_consistency(state1, state2, proof)
+
+        head1, head2 = (size1, state1), (size2, state2)
+        ancestors = self.ancestors.setdefault(head2, set())
+        ancestors.add(head1)
+
+        try:
+            if not self.sizes:
+                self._join(head2)
+            elif self._on_chain(*head2):
+                self._join(head1)
+            elif self._on_chain(*head1) and size1 == self.sizes[-1]:
+                self._join(head2)
+        except InvalidProof:
+            ancestors.discard(head1)
+            if not ancestors:
+                del self.ancestors[head2]
+            raise
+
+
+    def update(self, size, state, proof):
+        """
+        Verifies the provided head against the latest trusted one and
+        extends the trusted chain accordingly.
+
+        :param size: later size
+        :type size: int
+        :param state: acclaimed later state
+        :type state: bytes
+        :param proof: proof of consistency from the latest trusted size
+        :type proof: MerkleProof
+        :raises ValueError: if no head is trusted yet
+        :raises InvalidProof: if the proof is found invalid
+        """
+        if self.latest is None:
+            raise ValueError('No trusted head')
+
+        self.verify(*self.latest, size, state, proof)
+
+
 class MerkleProof:
     """
     Verifiable Merkle-proof object
@@ -62,23 +461,82 @@ class MerkleProof:
     :param size: tree size corresponding to requested state
     :type size: int
     :param rule: specifies parenthetization of hashes during state
-        resolution
-    :type rule: list[int]
+        resolution (one bit per hash, or packed least significant bit first)
+    :type rule: list[int] or int
     :param subset: indicates subset of hashes during prior state resolution
-        (makes sense only for consistency proofs)
-    :type subset: list[int]
+        (makes sense only for consistency proofs, empty otherwise)
+    :type subset: list[int] or int
     :param path: path of hashes
     :type path: list[bytes]
+    :raises ValueError: if the algorithm is not supported or rule or subset
+        is invalid
+
+    .. note:: Rule and subset are stored packed into integers, while the
+        hashing machinery is resolved from a process-wide registry shared by
+        all proofs with the same configuration.
     """
 
+    __slots__ = ('algorithm', 'security', 'size', 'path', '_rule', '_subset')
+
+
     def __init__(self, algorithm, security, size, rule, subset, path):
+        get_hasher(algorithm, security)
+
         self.algorithm = algorithm
         self.security = security
         self.size = size
-        self.rule = rule
-        self.subset = subset
         self.path = path
-        self.hasher = MerkleHasher(**self.get_metadata())
+
+        if not isinstance(rule, int):
+            if len(rule) != len(path):
+                raise ValueError('Rule does not match path length')
+            rule = _pack_bits(rule)
+        elif rule < 0 or rule >> len(path):
+            raise ValueError('Rule does not match path length')
+        self._rule = rule
+
+        if subset is not None and not isinstance(subset, int):
+            if subset and len(subset) != len(path):
+                raise ValueError('Subset does not match path length')
+            subset = _pack_bits(subset) if subset else None
+        elif subset is not None and (subset < 0 or subset >> len(path)):
+            raise ValueError('Subset does not match path length')
+        self._subset = subset
+
+
+    def __reduce__(self):
+        return (self.__class__, (self.algorithm, self.security, self.size,
+            self._rule, self._subset, [bytes(digest) for digest in
+                self.path]))
+
+
+    @property
+    def rule(self):
+        """
+        :rtype: list[int]
+        """
+        return _unpack_bits(self._rule, len(self.path))
+
+
+    @property
+    def subset(self):
+        """
+        :rtype: list[int]
+        """
+        if self._subset is None:
+            return []
+
+        return _unpack_bits(self._subset, len(self.path))
+
+
+    @property
+    def hasher(self):
+        """
+        Shared hashing machinery configured as specified by the proof.
+
+        :rtype: pymerkle.hasher.MerkleHasher
+        """
+        return get_hasher(self.algorithm, self.security)
 
 
     def get_metadata(self):
@@ -123,6 +581,96 @@ class MerkleProof:
         return cls(**metadata, rule=rule, subset=subset, path=path)
 
 
+    def to_bytes(self):
+        """
+        Returns the binary encoding of the verifiable object.
+
+        .. note:: The encoding consists of a fixed-size header (format
+            version, algorithm identifier, security and subset flags, digest
+            size, tree size and path length), followed by the bit-packed rule,
+            the bit-packed subset (only for consistency proofs) and the raw
+            concatenated digests.
+
+        :rtype: bytes
+        """
+        path = self.path
+        digest_size = len(path[0]) if path else 0
+
+        nbytes = (len(path) + 7) >> 3
+
+        flags = _SECURITY if self.security else 0
+        if self._subset is not None:
+            flags |= _SUBSET
+
+        header = _HEADER.pack(_VERSION,
+            constants.ALGORITHM_IDS[self.algorithm.lower().replace('-', '_')],
+            flags, digest_size, self.size, len(path))
+
+        parts = [header, self._rule.to_bytes(nbytes, 'little')]
+        if self._subset is not None:
+            parts += [self._subset.to_bytes(nbytes, 'little')]
+
+        return b''.join(parts + path)
+
+
+    @classmethod
+    def from_bytes(cls, buff):
+        """
+        Decodes the verifiable object from its binary encoding.
+
+        .. note:: Digests are decoded as ``memoryview`` slices of the provided
+            buffer without copying, so that the buffer is retained as long as
+            the proof is.
+
+        :param buff: binary encoding
+        :type buff: bytes-like
+        :rtype: MerkleProof
+        :raises ValueError: if the provided buffer is not a valid encoding
+        """
+        view = memoryview(buff)
+
+        try:
+            version, code, flags, digest_size, size, count = \
+                _HEADER.unpack_from(view)
+        except struct.error:
+            raise ValueError('Truncated proof')
+
+        if version != _VERSION:
+            raise ValueError(f'Unsupported proof version: {version}')
+
+        algorithm = _ALGORITHMS.get(code)
+        if algorithm is None:
+            raise ValueError(f'Unknown algorithm identifier: {code}')
+
+        nbytes = (count + 7) >> 3
+        offset = _HEADER.size
+
+        rule = int.from_bytes(view[offset: offset + nbytes], 'little')
+        offset += nbytes
+
+        subset = None
+        if flags & _SUBSET:
+            subset = int.from_bytes(view[offset: offset + nbytes], 'little')
+            offset += nbytes
+
+        if len(view) != offset + count * digest_size:
+            raise ValueError('Invalid proof length')
+
+        if rule >> count or (subset or 0) >> count:
+            raise ValueError('Invalid bit found')
+
+        path = [view[p: p + digest_size] for p in range(offset, len(view),
+            digest_size)]
+
+        proof = cls(algorithm, bool(flags & _SECURITY), size, rule, subset,
+            path)
+
+        if count and proof.hasher.hashfunc().digest_size != digest_size:
+            raise ValueError('Digest size does not match algorithm')
+
+        return proof
+
+
     def retrieve_prior_state(self):
         """
         Computes the acclaimed prior state as specified by the included path of
@@ -132,20 +680,19 @@ class MerkleProof:
 
         :rtype: bytes
         """
-        subpath = [digest for (mask, digest) in zip(self.subset, self.path) if
-            mask]
+        subset = self._subset or 0
+        subpath = [digest for (i, digest) in enumerate(self.path) if
+            (subset >> i) & 1]
 
         if not subpath:
             return self.hasher.hash_empty()
 
         result = subpath[0]
-        index = 0
         hash_pair = self.hasher.hash_pair
-        while index < len(subpath) - 1:
-            result = hash_pair(subpath[index + 1], result)
-            index += 1
+        for digest in subpath[1:]:
+            result = hash_pair(digest, result)
 
-        return result
+        return bytes(result)
 
 
     def resolve(self):
@@ -154,25 +701,554 @@ class MerkleProof:
 
         :rtype: bytes
         """
-        path = list(zip(self.rule, self.path))
+        path = self.path
 
         if not path:
             return self.hasher.hash_empty()
 
-        bit, result = path[0]
-        index = 0
+        rule = self._rule
+        result = path[0]
         hash_pair = self.hasher.hash_pair
-        while index < len(path) - 1:
-            next_bit, digest = path[index + 1]
-
-            if bit == 0:
-                result = hash_pair(result, digest)
-            elif bit == 1:
+        for digest in path[1:]:
+            if rule & 1:
                 result = hash_pair(digest, result)
             else:
-                raise ValueError('Invalid bit found')
+                result = hash_pair(result, digest)
+
+            rule >>= 1
+
+        return bytes(result)
+
+
+class RangeProof:
+    """
+    Proof of inclusion for a contiguous range of leaves, consisting of the
+    nodes adjacent to the range needed for rebuilding the root from the
+    leaves of the range.
+
+    :param algorithm: hash algorithm
+    :type algorithm: str
+    :param security: resistance against second-preimage attack
+    :type security: bool
+    :param size: nr leaves corresponding to the state against which the
+        proof was requested
+    :type size: int
+    :param start: leftmost leaf of the range counting from zero
+    :type start: int
+    :param end: rightmost leaf of the range counting from one
+    :type end: int
+    :param path: boundary nodes in left to right order
+    :type path: list[bytes]
+    :raises ValueError: if the algorithm is not supported
+    """
+
+    __slots__ = ('algorithm', 'security', 'size', 'start', 'end', 'path')
+
+
+    def __init__(self, algorithm, security, size, start, end, path):
+        get_hasher(algorithm, security)
+
+        self.algorithm = algorithm
+        self.security = security
+        self.size = size
+        self.start = start
+        self.end = end
+        self.path = path
+
+
+    def __reduce__(self):
+        return (self.__class__, (self.algorithm, self.security, self.size,
+            self.start, self.end, [bytes(digest) for digest in self.path]))
+
+
+    @property
+    def hasher(self):
+        """
+        Shared hashing machinery configured as specified by the proof.
+
+        :rtype: pymerkle.hasher.MerkleHasher
+        """
+        return get_hasher(self.algorithm, self.security)
+
+
+    def serialize(self):
+        """
+        Returns the JSON representation of the verifiable object.
+
+        :rtype: dict
+        """
+        return {
+            'metadata': {
+                'algorithm': self.algorithm,
+                'security': self.security,
+                'size': self.size,
+            },
+            'start': self.start,
+            'end': self.end,
+            'path': [digest.hex() for digest in self.path]
+        }
+
+
+    @classmethod
+    def deserialize(cls, data):
+        """
+        :param data:
+        :type data: dict
+        :rtype: RangeProof
+        """
+        metadata = data['metadata']
+        path = [bytes.fromhex(checksum) for checksum in data['path']]
+
+        return cls(**metadata, start=data['start'], end=data['end'],
+            path=path)
+
+
+    def resolve(self, bases):
+        """
+        Computes the target hash from the provided leaf hashes of the range
+        and the included boundary nodes.
+
+        :param bases: leaf hashes of the range in respective order
+        :type bases: list[bytes]
+        :rtype: bytes
+        :raises InvalidProof: if the number of hashes does not match the range
+            or the path
+        """
+        start, end = self.start, self.end
+
+        if not (0 <= start < end <= self.size) or len(bases) != end - start:
+            raise InvalidProof('Leaves do not match range')
+
+        nodes = iter(self.path)
+        hash_pair = self.hasher.hash_pair
+
+        def get_node(offset, limit):
+            if limit <= start or offset >= end:
+                node = next(nodes, None)
+                if node is None:
+                    raise InvalidProof('Path is too short')
+
+                return node
+
+            if limit - offset == 1:
+                return bases[offset - start]
+
+            k = _split(limit - offset)
+
+            return hash_pair(get_node(offset, offset + k), get_node(offset + k,
+                limit))
+
+        result = get_node(0, self.size)
+
+        if next(nodes, None) is not None:
+            raise InvalidProof('Path is too long')
+
+        return bytes(result)
+
+
+def verify_range(bases, root, proof):
+    """
+    Verifies the provided proof of inclusion for a range of leaves against
+    the provided leaf hashes and tree state.
+
+    :param bases: acclaimed leaf hashes of the range in respective order
+    :type bases: list[bytes]
+    :param root: acclaimed root hash
+    :type root: bytes
+    :param proof: proof of range inclusion
+    :type proof: RangeProof
+    :raises InvalidProof: if the proof is found invalid
+    """
+    if not compare_digest(proof.resolve(bases), root):
+        raise InvalidProof('State does not match')
+
+
+class AuditProof:
+    """
+    Bundle proving consistency between two states along with inclusion of
+    the provided leaves against the later state, whose paths of hashes are
+    merged so that every node is included only once.
+
+    :param algorithm: hash algorithm
+    :type algorithm: str
+    :param security: resistance against second-preimage attack
+    :type security: bool
+    :param size1: nr leaves corresponding to the prior state
+    :type size1: int
+    :param size2: nr leaves corresponding to the later state
+    :type size2: int
+    :param indices: leaf indices counting from one in ascending order
+    :type indices: list[int]
+    :param path: nodes not covered by the provided leaves in left to right
+        order
+    :type path: list[bytes]
+    :raises ValueError: if the algorithm is not supported
+    """
+
+    __slots__ = ('algorithm', 'security', 'size1', 'size2', 'indices', 'path')
+
+
+    def __init__(self, algorithm, security, size1, size2, indices, path):
+        get_hasher(algorithm, security)
+
+        self.algorithm = algorithm
+        self.security = security
+        self.size1 = size1
+        self.size2 = size2
+        self.indices = indices
+        self.path = path
+
+
+    def __reduce__(self):
+        return (self.__class__, (self.algorithm, self.security, self.size1,
+            self.size2, self.indices, [bytes(digest) for digest in
+                self.path]))
+
+
+    @property
+    def hasher(self):
+        """
+        Shared hashing machinery configured as specified by the proof.
+
+        :rtype: pymerkle.hasher.MerkleHasher
+        """
+        return get_hasher(self.algorithm, self.security)
+
+
+    def serialize(self):
+        """
+        Returns the JSON representation of the verifiable object.
+
+        :rtype: dict
+        """
+        return {
+            'metadata': {
+                'algorithm': self.algorithm,
+                'security': self.security,
+            },
+            'size1': self.size1,
+            'size2': self.size2,
+            'indices': self.indices,
+            'path': [digest.hex() for digest in self.path]
+        }
+
+
+    @classmethod
+    def deserialize(cls, data):
+        """
+        :param data:
+        :type data: dict
+        :rtype: AuditProof
+        """
+        metadata = data['metadata']
+        path = [bytes.fromhex(checksum) for checksum in data['path']]
+
+        return cls(**metadata, size1=data['size1'], size2=data['size2'],
+            indices=data['indices'], path=path)
+
+
+    def resolve(self, bases):
+        """
+        Computes in a single pass the prior and later state from the
+        provided leaf hashes and the included nodes.
+
+        .. note:: Nodes of the later tree containing neither any of the
+            provided leaves nor the boundary of the prior tree are included
+            as is. The prior state is folded from the maximal nodes lying
+            entirely within the prior tree, which are perfect subtrees of
+            both trees.
+
+        :param bases: leaf hashes in the order of ``indices``
+        :type bases: list[bytes]
+        :returns: prior and later state
+        :rtype: (bytes, bytes)
+        :raises InvalidProof: if the provided hashes do not match the indices
+            or the path
+        """
+        size1, size2, indices = self.size1, self.size2, self.indices
+
+        if not 0 < size1 <= size2 or len(bases) != len(indices):
+            raise InvalidProof('Leaves do not match indices')
+
+        if any(not 0 < index <= size2 for index in indices) or \
+                any(i >= j for (i, j) in zip(indices, indices[1:])):
+            raise InvalidProof('Invalid indices')
+
+        offsets = [index - 1 for index in indices]
+        nodes = iter(self.path)
+        hash_pair = self.hasher.hash_pair
+        blocks = []
+
+        def get_node(offset, limit):
+            position = bisect_left(offsets, offset)
+            covered = position < len(offsets) and offsets[position] < limit
+
+            if limit - offset == 1 and covered:
+                return bases[position]
+
+            straddles = offset < size1 < limit
+            if not covered and not straddles:
+                node = next(nodes, None)
+                if node is None:
+                    raise InvalidProof('Path is too short')
+
+                return node
+
+            k = _split(limit - offset)
+            lnode = get_node(offset, offset + k)
+            if straddles and offset + k <= size1:
+                blocks.append(lnode)
+
+            return hash_pair(lnode, get_node(offset + k, limit))
+
+        state2 = get_node(0, size2)
+
+        if next(nodes, None) is not None:
+            raise InvalidProof('Path is too long')
+
+        if size1 == size2:
+            return bytes(state2), bytes(state2)
+
+        state1 = blocks[-1]
+        for node in reversed(blocks[:-1]):
+            state1 = hash_pair(node, state1)
+
+        return bytes(state1), bytes(state2)
+
+
+def verify_audit(bases, state1, state2, proof):
+    """
+    Verifies the provided audit bundle against the provided leaf hashes and
+    states.
+
+    :param bases: acclaimed leaf hashes in the order of the proof indices
+    :type bases: list[bytes]
+    :param state1: acclaimed prior state
+    :type state1: bytes
+    :param state2: acclaimed later state
+    :type state2: bytes
+    :param proof: audit bundle
+    :type proof: AuditProof
+    :raises InvalidProof: if the proof is found invalid
+    """
+    prior, later = proof.resolve(bases)
+
+    if not compare_digest(prior, state1):
+        raise InvalidProof('Prior state does not match')
+
+    if not compare_digest(later, state2):
+        raise InvalidProof('Later state does not match')
+
+
+def _verify_chunk(items):
+    """
+    Verifies the provided items and returns the respective outcomes.
+
+    .. note:: Failures of individual items (including malformed items and
+        proofs) are recorded as invalid instead of aborting the chunk.
+
+    :type items: list[(str, bytes, bytes, MerkleProof)]
+    :returns: one byte per item (*1* for valid, *0* for invalid)
+    :rtype: bytearray
+    """
+    results = bytearray(len(items))
+
+    for (position, item) in enumerate(items):
+        try:
+            kind, first, second, proof = item
+
+            if kind == 'inclusion':
+                if proof._subset is not None:
+                    raise InvalidProof('Proof is not of inclusion')
+                verify_inclusion(first, second, proof)
+            elif kind == 'consistency':
+                if proof._subset is None:
+                    raise InvalidProof('Proof is not of consistency')
+                verify_consistency(first, second, proof)
+            else:
+                raise ValueError('Unknown kind of proof: %s' % kind)
+        except (InvalidProof, ValueError, TypeError, IndexError,
+                AttributeError, struct.error):
+            continue
+
+        results[position] = 1
+
+    return results
+
+
+def verify_many(items, processes=None, chunksize=1024, fail_fast=False):
+    """
+    Verifies the provided Merkle-proofs in batch.
+
+    .. note:: Every item is of the form *('inclusion', base, root, proof)*
+        or *('consistency', state1, state2, proof)*, so that the kind of
+        verification is chosen by the caller rather than by the proof. Items
+        whose proof does not have the requested shape, or which fail in any
+        way, are recorded as invalid. Items are consumed lazily, so that
+        arbitrarily long streams (e.g., ``read_proofs``) are verified in
+        constant memory apart from the result vector.
+
+    .. note:: If processes are requested, items are verified in chunks
+        fanned out to a process pool, with a bounded number of chunks in
+        flight. Results are collected in order.
+
+    :param items: items to verify
+    :type items: iterable of (str, bytes, bytes, MerkleProof)
+    :param processes: [optional] number of worker processes. Defaults to
+        *None* (verify in the current process).
+    :type processes: int
+    :param chunksize: [optional] number of items dispatched at once to a
+        worker process
+    :type chunksize: int
+    :param fail_fast: [optional] if *True*, stop at the first invalid item
+        and raise. Defaults to *False*.
+    :type fail_fast: bool
+    :returns: one byte per item in respective order (*1* for valid, *0* for
+        invalid)
+    :rtype: bytearray
+    :raises InvalidProof: if *fail_fast* is set and some item is found
+        invalid
+    """
+    items = iter(items)
+    results = bytearray()
+
+    if not processes:
+        chunks = (_verify_chunk(chunk) for chunk in iter(lambda:
+            list(islice(items, chunksize)), []))
+        return _collect(chunks, results, fail_fast)
+
+    with ProcessPoolExecutor(processes) as executor:
+        pending = deque()
+
+        def chunks():
+            for chunk in iter(lambda: list(islice(items, chunksize)), []):
+                pending.append(executor.submit(_verify_chunk, chunk))
+                if len(pending) > 2 * processes:
+                    yield pending.popleft().result()
+
+            while pending:
+                yield pending.popleft().result()
+
+        try:
+            return _collect(chunks(), results, fail_fast)
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def _collect(chunks, results, fail_fast):
+    """
+    Accumulates the provided chunk outcomes, stopping at the first invalid
+    item if *fail_fast* is set.
+
+    :rtype: bytearray
+    """
+    for outcome in chunks:
+        if fail_fast and not all(outcome):
+            position = len(results) + outcome.index(0)
+            raise InvalidProof(f'Proof {position} is invalid')
+
+        results += outcome
+
+    return results
+
+
+def write_proofs(path, items, binary=False):
+    """
+    Writes the provided items to the provided file, in the format expected
+    by ``read_proofs``.
+
+    .. note:: In text mode, every item is written as a JSON line with keys
+        *base*, *root* and *proof* (or *state1*, *state2* and *proof* for
+        proofs of consistency). In binary mode, every item is written as a
+        fixed-size frame (kind of proof, lengths of the two hashes and of the
+        encoded proof) followed by the two hashes and the binary encoding of
+        the proof.
+
+    :param path: filepath
+    :type path: str
+    :param items: items of the form expected by ``verify_many``
+    :type items: iterable of (str, bytes, bytes, MerkleProof)
+    :param binary: [optional] if *True*, write binary frames instead of
+        JSON lines. Defaults to *False*.
+    :type binary: bool
+    :returns: number of items written
+    :rtype: int
+    :raises ValueError: if some item is of unknown kind
+    """
+    count = 0
+
+    with open(path, 'wb' if binary else 'w') as f:
+        for (kind, first, second, proof) in items:
+            if kind not in _KINDS:
+                raise ValueError('Unknown kind of proof: %s' % kind)
+
+            if binary:
+                buff = proof.to_bytes()
+                f.write(_FRAME.pack(_KINDS.index(kind), len(first),
+                    len(second), len(buff)))
+                f.write(first)
+                f.write(second)
+                f.write(buff)
+            else:
+                keys = _KEYS[kind]
+                f.write(json.dumps({keys[0]: first.hex(), keys[1]:
+                    second.hex(), 'proof': proof.serialize()}) + '\n')
+
+            count += 1
+
+    return count
+
+
+def read_proofs(path, binary=False):
+    """
+    Streams the items stored in the provided file by ``write_proofs``.
+
+    :param path: filepath
+    :type path: str
+    :param binary: [optional] if *True*, read binary frames instead of JSON
+        lines. Defaults to *False*.
+    :type binary: bool
+    :rtype: iterator of (str, bytes, bytes, MerkleProof)
+    :raises ValueError: if the file is not validly formatted
+    """
+    if not binary:
+        with open(path, 'r') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+
+                record = json.loads(line)
+                proof = MerkleProof.deserialize(record['proof'])
+
+                for (kind, keys) in _KEYS.items():
+                    if keys[0] in record:
+                        break
+                else:
+                    raise ValueError('Unknown kind of proof')
+
+                yield kind, bytes.fromhex(record[keys[0]]), \
+                    bytes.fromhex(record[keys[1]]), proof
+
+        return
+
+    with open(path, 'rb') as f:
+        while True:
+            frame = f.read(_FRAME.size)
+            if not frame:
+                break
+
+            if len(frame) != _FRAME.size:
+                raise ValueError('Truncated frame')
+
+            code, length1, length2, length3 = _FRAME.unpack(frame)
+            if code >= len(_KINDS):
+                raise ValueError('Unknown kind of proof')
 
-            bit = next_bit
-            index += 1
+            buff = f.read(length1 + length2 + length3)
+            if len(buff) != length1 + length2 + length3:
+                raise ValueError('Truncated frame')
 
-        return result
+            yield _KINDS[code], buff[:length1], \
+                buff[length1: length1 + length2], \
+                MerkleProof.from_bytes(memoryview(buff)[length1 + length2:])
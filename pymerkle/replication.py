@@ -0,0 +1,211 @@
+"""
+Incremental replication between trees
+"""
+
+from hmac import compare_digest
+
+from pymerkle.core import InvalidChallenge
+from pymerkle.proof import InvalidProof, verify_consistency
+from pymerkle.utils import log2, decompose
+
+
+def _fold(tree, digests):
+    """
+    Computes the root-hash of the provided leaf hashes without storing them.
+
+    :param tree: tree providing the hashing machinery
+    :type tree: pymerkle.BaseMerkleTree
+    :param digests: leaf hashes
+    :type digests: list of bytes
+    :rtype: bytes
+    """
+    hash_nodes = tree._hash_nodes
+
+    level = digests
+    while len(level) > 1:
+        upper = [hash_nodes(lnode, rnode) for (lnode, rnode) in
+            zip(level[0::2], level[1::2])]
+
+        if len(level) & 1:
+            upper += [level[-1]]
+
+        level = upper
+
+    return level[0]
+
+
+def _extended_root(tree, size, digests, start, limit):
+    """
+    Computes the root-hash for the provided leaf range of the tree extended
+    by the provided leaf hashes, without appending them.
+
+    .. note:: Subroots lying within the current tree are retrieved from the
+        tree itself, so that only the appended hashes are folded.
+
+    :param tree: tree to extend
+    :type tree: pymerkle.BaseMerkleTree
+    :param size: current number of leaves
+    :type size: int
+    :param digests: leaf hashes to be appended
+    :type digests: list of bytes
+    :param start: offset counting from zero
+    :type start: int
+    :param limit: last leaf index counting from one
+    :type limit: int
+    :rtype: bytes
+    """
+    if limit <= size:
+        return tree._get_root(start, limit)
+
+    if start >= size:
+        return _fold(tree, digests[start - size: limit - size])
+
+    k = 1 << log2(limit - start - 1)
+
+    return tree._hash_nodes(
+        _extended_root(tree, size, digests, start, start + k),
+        _extended_root(tree, size, digests, start + k, limit))
+
+
+def _store_leaves(tree, entries, digests):
+    """
+    Appends the provided entries along with their precomputed hash values,
+    in bulk if supported by the tree.
+    """
+    store_leaves = getattr(tree, '_store_leaves', None)
+    if store_leaves is not None:
+        store_leaves(entries, digests)
+        return
+
+    for (data, digest) in zip(entries, digests):
+        tree._store_leaf(data, digest)
+
+
+def sync(source, destination, size=None, chunksize=100_000):
+    """
+    Appends to the destination tree the leaves of the source tree which it is
+    missing, verifying every batch before appending it.
+
+    .. note:: Batches are pulled through ``get_entries`` along with the
+        respective leaf hashes. Entries are rehashed and checked against the
+        pulled hashes; the state of the destination extended by these hashes
+        is computed without appending them and checked against the state of
+        the source, which must also be proven consistent with the current
+        state of the destination. Only then is the batch appended, so that
+        the destination is never left with unverified leaves.
+
+    :param source: tree to replicate. Should implement ``get_entries``.
+    :type source: pymerkle.BaseMerkleTree
+    :param destination: replica with the same hashing configuration
+    :type destination: pymerkle.BaseMerkleTree
+    :param size: [optional] number of leaves to replicate up to. Defaults to
+        the current size of the source.
+    :type size: int
+    :param chunksize: [optional] maximum number of leaves to pull and
+        append at once
+    :type chunksize: int
+    :returns: number of appended leaves
+    :rtype: int
+    :raises ValueError: if the trees have different hashing configuration or
+        the destination is ahead of the requested size
+    :raises InvalidProof: if some batch fails verification, in which case
+        the destination is left at the last verified size
+    """
+    if (source.algorithm, source.security) != \
+            (destination.algorithm, destination.security):
+        raise ValueError('Trees have different hashing configuration')
+
+    if size is None:
+        size = source.get_size()
+
+    prior = destination.get_size()
+    if prior > size:
+        raise ValueError('Destination is ahead of the requested size')
+
+    hash_entry = destination._hash_entry
+    encode = destination._encode_entry
+
+    offset = prior
+    while offset < size:
+        width = min(chunksize, size - offset)
+        entries = source.get_entries(offset, width)
+        hashes = source._get_leaves(offset, width)
+
+        if len(entries) != width or len(hashes) != width:
+            raise InvalidProof('Source returned incomplete batch')
+
+        digests = [hash_entry(encode(data)) for data in entries]
+        for (position, (digest, value)) in enumerate(zip(digests, hashes)):
+            if not compare_digest(digest, value):
+                raise InvalidProof('Leaf hash does not match at index %d' %
+                    (offset + position + 1))
+
+        limit = offset + width
+        state = source.get_state(limit)
+        if not compare_digest(_extended_root(destination, offset, digests, 0,
+                limit), state):
+            raise InvalidProof('State does not match at size %d' % limit)
+
+        if offset > 0:
+            proof = source.prove_consistency(offset, limit)
+            verify_consistency(destination.get_state(offset), state, proof)
+
+        _store_leaves(destination, entries, digests)
+        offset = limit
+
+    return size - prior
+
+
+def find_divergence(tree, other, size=None):
+    """
+    Returns the index of the first leaf at which the provided trees differ,
+    by comparing subroots instead of individual leaves.
+
+    .. note:: Subroots of the perfect subtrees making up the requested range
+        are compared from left to right; the first differing one is bisected
+        down to a single leaf. This takes *O(log n)* subroot comparisons,
+        going through ``_get_subroot`` so that the caches of both trees are
+        reused.
+
+    :param tree: tree to compare
+    :type tree: pymerkle.BaseMerkleTree
+    :param other: tree to compare against or oracle returning the subroot of
+        the remote tree for the provided offset (counting from zero) and width
+        (power of two)
+    :type other: pymerkle.BaseMerkleTree or callable
+    :param size: [optional] number of leaves to consider. Defaults to the
+        minimum size of the trees (or the size of the first tree if compared
+        against an oracle).
+    :type size: int
+    :returns: leaf index counting from one (*None* if the trees coincide
+        in the requested range)
+    :rtype: int
+    :raises InvalidChallenge: if the provided size exceeds the size of
+        either tree (or of the first tree if compared against an oracle)
+    """
+    get_subroot = other
+    limit = tree.get_size()
+    if not callable(other):
+        get_subroot = other._get_subroot
+        limit = min(limit, other.get_size())
+
+    if size is None:
+        size = limit
+
+    if size < 0 or size > limit:
+        raise InvalidChallenge('Provided size is out of bounds')
+
+    offset = 0
+    for p in reversed(decompose(size)):
+        width = 1 << p
+
+        if tree._get_subroot(offset, width) != get_subroot(offset, width):
+            while width > 1:
+                width >>= 1
+                if tree._get_subroot(offset, width) == \
+                        get_subroot(offset, width):
+                    offset += width
+
+            return offset + 1
+
+        offset += width
@@ -0,0 +1,393 @@
+"""
+Sharded logs aggregated by a top-level tree
+"""
+
+import struct
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
+from itertools import count
+from threading import Event, Lock, Thread
+
+from pymerkle.core import InvalidChallenge
+from pymerkle.proof import MerkleProof, InvalidProof, verify_inclusion
+
+
+_RECORD = struct.Struct('<IQ')
+
+
+def encode_commitment(shard, size, state):
+    """
+    Returns the top-level leaf entry committing to the provided shard state.
+
+    :param shard: shard number counting from zero
+    :type shard: int
+    :param size: number of leaves of the shard
+    :type size: int
+    :param state: state of the shard
+    :type state: bytes
+    :rtype: bytes
+    """
+    return _RECORD.pack(shard, size) + state
+
+
+def decode_commitment(data):
+    """
+    Inverse of ``encode_commitment``.
+
+    :param data: top-level leaf entry
+    :type data: bytes
+    :returns: shard number, size and state
+    :rtype: (int, int, bytes)
+    """
+    shard, size = _RECORD.unpack_from(data)
+
+    return shard, size, bytes(data[_RECORD.size:])
+
+
+class ShardedProof:
+    """
+    Composed proof of inclusion for an entry of a sharded log, consisting of
+    the proof of inclusion of the entry against a committed shard state and
+    the proof of inclusion of the commitment against the top-level state.
+
+    :param shard: shard number counting from zero
+    :type shard: int
+    :param size: committed number of leaves of the shard
+    :type size: int
+    :param state: committed state of the shard
+    :type state: bytes
+    :param inclusion: proof of inclusion against the committed shard state
+    :type inclusion: MerkleProof
+    :param commitment: proof of inclusion of the commitment against the
+        top-level state
+    :type commitment: MerkleProof
+    """
+
+    def __init__(self, shard, size, state, inclusion, commitment):
+        self.shard = shard
+        self.size = size
+        self.state = state
+        self.inclusion = inclusion
+        self.commitment = commitment
+
+
+    def serialize(self):
+        """
+        Returns the JSON representation of the verifiable object.
+
+        :rtype: dict
+        """
+        return {
+            'shard': self.shard,
+            'size': self.size,
+            'state': self.state.hex(),
+            'inclusion': self.inclusion.serialize(),
+            'commitment': self.commitment.serialize(),
+        }
+
+
+    @classmethod
+    def deserialize(cls, data):
+        """
+        :param data:
+        :type data: dict
+        :rtype: ShardedProof
+        """
+        return cls(data['shard'], data['size'], bytes.fromhex(data['state']),
+            MerkleProof.deserialize(data['inclusion']),
+            MerkleProof.deserialize(data['commitment']))
+
+
+def verify_sharded_inclusion(base, root, proof):
+    """
+    Verifies the provided composed proof of inclusion against the provided
+    leaf hash and top-level state.
+
+    :param base: acclaimed leaf hash
+    :type base: bytes
+    :param root: acclaimed top-level state
+    :type root: bytes
+    :param proof: composed proof of inclusion
+    :type proof: ShardedProof
+    :raises InvalidProof: if the proof is found invalid
+    """
+    if proof.inclusion.size != proof.size:
+        raise InvalidProof('Shard size does not match')
+
+    verify_inclusion(base, proof.state, proof.inclusion)
+
+    record = encode_commitment(proof.shard, proof.size, proof.state)
+    leaf = proof.commitment.hasher.hash_buff(record)
+
+    verify_inclusion(leaf, root, proof.commitment)
+
+
+class ShardedLog:
+    """
+    Log distributing appends across independent trees (shards), whose states
+    are committed as leaves of a top-level tree.
+
+    .. note:: Every shard is written by its own thread, so that appends to
+        different shards proceed concurrently as far as the backends release
+        the GIL (e.g., database and file I/O, hashing of large entries).
+        Commitments are recorded in the top-level tree as entries encoded by
+        ``encode_commitment`` and restored from there upon reopening.
+
+    .. warning:: Proofs are generated while shards are being written, so
+        that shards should support concurrent reads (e.g., ``SqliteTree``,
+        ``MmapTree``, ``CompactTree``).
+
+    :param shards: trees to distribute appends across
+    :type shards: list[pymerkle.BaseMerkleTree]
+    :param top: tree storing the commitments. Should store binary entries.
+    :type top: pymerkle.BaseMerkleTree
+    :param interval: [optional] period of automatic commits in seconds.
+        Defaults to *None* (commit on demand only).
+    :type interval: float
+    :raises ValueError: if the top-level tree contains invalid commitments
+    """
+
+    def __init__(self, shards, top, interval=None):
+        self.shards = list(shards)
+        self.top = top
+        self.interval = interval
+
+        self.lock = Lock()
+        self.counter = count()
+        self.writers = [ThreadPoolExecutor(1) for _ in self.shards]
+        self.commits = [[] for _ in self.shards]
+
+        for (index, data) in enumerate(self._read_commitments(top), 1):
+            shard, size, state = decode_commitment(data)
+
+            if shard >= len(self.shards):
+                raise ValueError(f'Commitment {index} refers to unknown shard')
+
+            self.commits[shard] += [(index, size, state)]
+
+        self.stopped = Event()
+        self.committer = None
+        if interval is not None:
+            self.committer = Thread(target=self._run, daemon=True)
+            self.committer.start()
+
+
+    @staticmethod
+    def _read_commitments(top, chunksize=10_000):
+        """
+        Iterates over the entries of the provided top-level tree in chunks.
+
+        :param top: top-level tree
+        :type top: pymerkle.BaseMerkleTree
+        :param chunksize: [optional] number of entries to read at once
+        :type chunksize: int
+        :rtype: iterator of bytes
+        :raises ValueError: if the tree does not provide its entries
+        """
+        size = top.get_size()
+
+        get_entries = getattr(top, 'get_entries', None)
+        if size and get_entries is None:
+            raise ValueError('Top-level tree does not provide its entries')
+
+        for offset in range(0, size, chunksize):
+            for data in get_entries(offset, chunksize):
+                if not isinstance(data, (bytes, bytearray, memoryview)):
+                    raise ValueError('Top-level tree does not store '
+                        'binary entries')
+
+                yield data
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+    def _run(self):
+        """
+        Commits periodically until closed.
+        """
+        while not self.stopped.wait(self.interval):
+            self.commit()
+
+
+    def close(self):
+        """
+        Stops automatic commits, waits for pending appends and commits the
+        final state of all shards.
+        """
+        self.stopped.set()
+        if self.committer is not None:
+            self.committer.join()
+
+        self.commit()
+
+        for writer in self.writers:
+            writer.shutdown()
+
+
+    def append_entry(self, data, shard=None):
+        """
+        Appends the provided data entry to the specified shard.
+
+        :param data: data to append
+        :type data: whatever expected according to application logic
+        :param shard: [optional] shard number counting from zero. Defaults to
+            the next shard in round-robin order.
+        :type shard: int
+        :returns: shard number and index of the newly appended leaf in that
+            shard counting from one
+        :rtype: (int, int)
+        """
+        if shard is None:
+            shard = next(self.counter) % len(self.shards)
+
+        index = self.writers[shard].submit(self.shards[shard].append_entry,
+            data).result()
+
+        return shard, index
+
+
+    def append_entries(self, entries):
+        """
+        Bulk operation for appending a batch of entries, split in contiguous
+        chunks written concurrently to the respective shards.
+
+        :param entries: data entries to append
+        :type entries: iterable
+        :returns: shard number and leaf index (counting from one) per entry
+            in respective order
+        :rtype: list[(int, int)]
+        """
+        entries = list(entries)
+        chunksize = -(-len(entries) // len(self.shards))
+
+        futures = []
+        for (shard, tree) in enumerate(self.shards):
+            chunk = entries[shard * chunksize: (shard + 1) * chunksize]
+            if chunk:
+                futures += [(shard, len(chunk),
+                    self.writers[shard].submit(self._append_chunk, tree,
+                        chunk))]
+
+        locations = []
+        for (shard, length, future) in futures:
+            last = future.result()
+            locations += [(shard, index) for index in range(last - length + 1,
+                last + 1)]
+
+        return locations
+
+
+    @staticmethod
+    def _append_chunk(tree, chunk):
+        """
+        Appends the provided entries to the provided shard, in bulk if
+        supported.
+
+        :rtype: int
+        """
+        append_entries = getattr(tree, 'append_entries', None)
+        if append_entries is not None:
+            return append_entries(chunk)
+
+        for data in chunk:
+            index = tree.append_entry(data)
+
+        return index
+
+
+    @staticmethod
+    def _capture(tree):
+        """
+        Returns the current size and state of the provided shard (*None* if
+        empty).
+
+        :rtype: (int, bytes)
+        """
+        size = tree.get_size()
+
+        return size, tree.get_state(size) if size else None
+
+
+    def commit(self):
+        """
+        Appends to the top-level tree the current state of every shard which
+        has grown since its last commitment.
+
+        .. note:: Shard states are captured by the respective writer threads,
+            so that they reflect all appends submitted so far.
+
+        :returns: size of the top-level tree
+        :rtype: int
+        """
+        with self.lock:
+            futures = [writer.submit(self._capture, tree) for (writer, tree) in
+                zip(self.writers, self.shards)]
+
+            for (shard, future) in enumerate(futures):
+                size, state = future.result()
+
+                commits = self.commits[shard]
+                if size == 0 or (commits and commits[-1][1] == size):
+                    continue
+
+                index = self.top.append_entry(encode_commitment(shard, size,
+                    state))
+                commits += [(index, size, state)]
+
+            return self.top.get_size()
+
+
+    def get_state(self, size=None):
+        """
+        Returns the top-level state.
+
+        :param size: [optional] number of commitments to consider. Defaults
+            to the current number of commitments.
+        :type size: int
+        :rtype: bytes
+        """
+        return self.top.get_state(size)
+
+
+    def prove_inclusion(self, shard, index, size=None):
+        """
+        Proves inclusion of the specified leaf against the top-level state
+        corresponding to the provided number of commitments, by means of the
+        latest commitment of the respective shard.
+
+        :param shard: shard number counting from zero
+        :type shard: int
+        :param index: leaf index in the shard counting from one
+        :type index: int
+        :param size: [optional] number of commitments to consider. Defaults
+            to the current number of commitments.
+        :type size: int
+        :rtype: ShardedProof
+        :raises InvalidChallenge: if the leaf has not been committed against
+            the requested top-level state
+        """
+        if not (0 <= shard < len(self.shards)):
+            raise InvalidChallenge('Provided shard is out of bounds')
+
+        with self.lock:
+            if size is None:
+                size = self.top.get_size()
+
+            commits = self.commits[shard]
+            latest = bisect_right(commits, (size + 1,)) - 1
+
+        if latest < 0 or not (0 < index <= commits[latest][1]):
+            raise InvalidChallenge('Provided index has not been committed')
+
+        position, shard_size, state = commits[latest]
+
+        inclusion = self.shards[shard].prove_inclusion(index, shard_size)
+        commitment = self.top.prove_inclusion(position, size)
+
+        return ShardedProof(shard, shard_size, state, inclusion, commitment)
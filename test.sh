@@ -10,7 +10,8 @@ usage_string="usage: ./$(basename "$0") [options] [pytest_options]
 
 Options
   --algorithm HASH              Hash algorithm to be used (default: ${DEFAULT_ALGORITHM})
-  --backend [inmemory|sqlite]   Storage backend (default: ${DEFAULT_STORAGE})
+  --backend [inmemory|compact|sqlite|mmap|tiered|partitioned]
+                                Storage backend (default: ${DEFAULT_STORAGE})
   --maxsize MAX                 Maximum size of tree fixtures (default: ${DEFAULT_MAXSIZE})
   --threshold WIDTH             Subroot cache threshold (default: ${DEFAULT_THRESHOLD})
   --capacity BYTES              Subroout cache capacity in bytes (default: 1GB)
@@ -1,6 +1,10 @@
 import itertools
+import os
+import tempfile
 import pytest
-from pymerkle import constants, InmemoryTree, SqliteTree as _SqliteTree
+from pymerkle import constants, InmemoryTree, CompactTree, \
+    SqliteTree as _SqliteTree, MmapTree as _MmapTree, \
+    TieredTree as _TieredTree, PartitionedSqliteTree as _PartitionedSqliteTree
 
 
 DEFAULT_MAXSIZE = 11
@@ -25,13 +29,85 @@ class SqliteTree(_SqliteTree):
         return tree
 
 
+class MmapTree(_MmapTree):
+    """
+    Make init interface identical to that of InmemoryTree so that it can be
+    used interchangeably
+    """
+
+    tmpdir = None
+
+    def __init__(self, algorithm='sha256', **opts):
+        cls = self.__class__
+        if cls.tmpdir is None:
+            cls.tmpdir = tempfile.TemporaryDirectory()
+
+        path = os.path.join(tempfile.mkdtemp(dir=cls.tmpdir.name),
+            'merkle.bin')
+        super().__init__(path, algorithm, fsync=False, **opts)
+
+    @classmethod
+    def init_from_entries(cls, entries, algorithm='sha256', **opts):
+        tree = cls(algorithm, **opts)
+        tree.append_entries(entries, chunksize=2)
+
+        return tree
+
+
+class TieredTree(_TieredTree):
+    """
+    Make init interface identical to that of InmemoryTree so that it can be
+    used interchangeably. The memory budget is kept small so that leaf ranges
+    span both tiers
+    """
+
+    def __init__(self, algorithm='sha256', **opts):
+        cold = _SqliteTree(':memory:', algorithm,
+            disable_security=opts.get('disable_security', False))
+        super().__init__(cold, budget=200, **opts)
+
+    @classmethod
+    def init_from_entries(cls, entries, algorithm='sha256', **opts):
+        tree = cls(algorithm, **opts)
+        for data in entries:
+            tree.append_entry(data)
+
+        return tree
+
+
+class PartitionedSqliteTree(_PartitionedSqliteTree):
+    """
+    Make init interface identical to that of InmemoryTree so that it can be
+    used interchangeably. Segments are kept small so that leaf ranges span
+    several segments
+    """
+
+    tmpdir = None
+
+    def __init__(self, algorithm='sha256', **opts):
+        cls = self.__class__
+        if cls.tmpdir is None:
+            cls.tmpdir = tempfile.TemporaryDirectory()
+
+        dirpath = tempfile.mkdtemp(dir=cls.tmpdir.name)
+        super().__init__(dirpath, algorithm, segment_size=4, **opts)
+
+    @classmethod
+    def init_from_entries(cls, entries, algorithm='sha256', **opts):
+        tree = cls(algorithm, **opts)
+        tree.append_entries(entries)
+
+        return tree
+
+
 def pytest_addoption(parser):
     parser.addoption('--algorithm', default='sha256',
         choices=constants.ALGORITHMS,
         help='Hash algorithm to be used')
     parser.addoption('--extended', action='store_true', default=False,
         help='Test against all supported hash algorothms')
-    parser.addoption('--backend', choices=['inmemory', 'sqlite'], default='inmemory',
+    parser.addoption('--backend', choices=['inmemory', 'compact', 'sqlite', 'mmap', 'tiered',
+        'partitioned'], default='inmemory',
         help='Storage backend')
     parser.addoption('--maxsize', type=int, default=DEFAULT_MAXSIZE,
         help='Maximum size of tree fixtures')
@@ -67,6 +143,18 @@ def resolve_backend(option):
     if option.backend == 'sqlite':
         return SqliteTree
 
+    if option.backend == 'compact':
+        return CompactTree
+
+    if option.backend == 'mmap':
+        return MmapTree
+
+    if option.backend == 'tiered':
+        return TieredTree
+
+    if option.backend == 'partitioned':
+        return PartitionedSqliteTree
+
     return InmemoryTree
 
 
@@ -0,0 +1,88 @@
+import pickle
+import pytest
+from tests.conftest import tree_and_index, tree_and_range
+
+from pymerkle import AuditProof, verify_audit, InvalidChallenge, InvalidProof
+
+
+def audit_cases():
+    cases = []
+    for (tree, size1, size2) in tree_and_range():
+        indices = list(range(size1 + 2, size2 + 1, 2))
+        cases += [(tree, size1 + 1, size2, indices), (tree, size1 + 1, size2,
+            [])]
+
+    for (tree, index) in tree_and_index():
+        size = tree.get_size()
+        cases += [(tree, index, size, [index, size]), (tree, index, size,
+            list(range(1, size + 1)))]
+
+    return cases
+
+
+@pytest.mark.parametrize('tree, size1, size2, indices', audit_cases())
+def test_audit_success(tree, size1, size2, indices):
+    proof = tree.prove_audit(size1, indices, size2)
+    bases = [tree.get_leaf(index) for index in proof.indices]
+    state1, state2 = tree.get_state(size1), tree.get_state(size2)
+
+    verify_audit(bases, state1, state2, proof)
+    verify_audit(bases, state1, state2, AuditProof.deserialize(
+        proof.serialize()))
+    verify_audit(bases, state1, state2, pickle.loads(pickle.dumps(proof)))
+
+    separate = len(tree.prove_consistency(size1, size2).path) + \
+        sum(len(tree.prove_inclusion(index, size2).path) - 1 for index in
+            proof.indices)
+    assert len(proof.path) <= separate
+
+
+@pytest.mark.parametrize('tree, index', tree_and_index(default_config=True))
+def test_audit_failure(tree, index):
+    size = tree.get_size()
+    indices = [index]
+    proof = tree.prove_audit(index, indices)
+    bases = [tree.get_leaf(index)]
+    state1, state2 = tree.get_state(index), tree.get_state()
+    forged = tree.hash_buff(b'random')
+
+    with pytest.raises(InvalidProof):
+        verify_audit([forged], state1, state2, proof)
+
+    with pytest.raises(InvalidProof):
+        verify_audit(bases, forged, state2, proof)
+
+    with pytest.raises(InvalidProof):
+        verify_audit(bases, state1, forged, proof)
+
+    with pytest.raises(InvalidProof):
+        verify_audit([], state1, state2, proof)
+
+    with pytest.raises(InvalidProof):
+        verify_audit(bases, state1, state2, AuditProof(proof.algorithm,
+            proof.security, index, size, indices, proof.path + [forged]))
+
+    if proof.path:
+        with pytest.raises(InvalidProof):
+            verify_audit(bases, state1, state2, AuditProof(proof.algorithm,
+                proof.security, index, size, indices, proof.path[1:]))
+
+
+@pytest.mark.parametrize('tree, index', tree_and_index(default_config=True))
+def test_audit_invalid_challenge(tree, index):
+    size = tree.get_size()
+
+    with pytest.raises(InvalidChallenge):
+        tree.prove_audit(index, [index], size + 1)
+
+    with pytest.raises(InvalidChallenge):
+        tree.prove_audit(0, [index])
+
+    with pytest.raises(InvalidChallenge):
+        tree.prove_audit(index, [index], index - 1)
+
+    with pytest.raises(InvalidChallenge):
+        tree.prove_audit(index, [0, index])
+
+    with pytest.raises(InvalidChallenge):
+        tree.prove_audit(index, [size + 1])
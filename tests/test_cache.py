@@ -0,0 +1,183 @@
+import os
+import sys
+import pickle
+import subprocess
+import multiprocessing
+import pytest
+
+pytest.importorskip('multiprocessing.shared_memory')
+
+from pymerkle import InmemoryTree, SqliteTree
+from pymerkle.cache import SharedCache, _HEADER, _STATS
+
+
+entries = [f'entry-{i}'.encode() for i in range(300)]
+
+
+@pytest.fixture
+def cache():
+    cache = SharedCache(slots=1024)
+    yield cache
+    cache.close()
+    cache.unlink()
+
+
+def make_tree(**opts):
+    tree = SqliteTree(':memory:', **opts)
+    tree.append_entries(entries)
+
+    return tree
+
+
+def get_state(cache):
+    tree = make_tree(threshold=2, cache=cache)
+    return tree.get_state()
+
+
+def test_shared_cache(cache):
+    tree = make_tree(threshold=2, cache=cache)
+    other = InmemoryTree.init_from_entries(entries, threshold=2,
+        disable_cache=True)
+
+    for size in range(1, len(entries) + 1):
+        assert tree._get_root(0, size) == other.get_state(size)
+
+    info = tree.get_cache_info()
+    assert info.hits > 0 and info.misses > 0
+    assert info.size > 0
+    assert info.capacity == 1024 * 32
+
+    tree.cache_clear()
+    info = tree.get_cache_info()
+    assert (info.size, info.hits, info.misses) == (0, 0, 0)
+
+
+def test_attach(cache):
+    cache[(0, 4)] = b'\x01' * 32
+
+    with SharedCache(cache.name, create=False) as other:
+        assert other.slots == cache.slots
+        assert other[(0, 4)] == b'\x01' * 32
+
+        with pytest.raises(KeyError):
+            other[(4, 4)]
+
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_pickle(cache):
+    cache[(8, 8)] = b'\x02' * 32
+
+    clone = pickle.loads(pickle.dumps(cache))
+    assert clone.name == cache.name
+    assert clone[(8, 8)] == b'\x02' * 32
+    clone.close()
+
+
+def test_torn_write(cache):
+    cache[(0, 2)] = b'\x03' * 32
+
+    position = next(cache._probe(0, 2))
+    end = position + cache.slotsize
+    cache.buf[end - 1: end] = b'\x04'
+
+    with pytest.raises(KeyError):
+        cache[(0, 2)]
+
+
+def test_overflow():
+    with SharedCache(slots=4, digest_size=1) as cache:
+        try:
+            for offset in range(64):
+                cache[(offset, 1)] = bytes([offset])
+
+            assert cache[(63, 1)] == bytes([63])
+            assert cache.currsize == 4
+        finally:
+            cache.unlink()
+
+
+def test_invalid_digest(cache):
+    with pytest.raises(ValueError):
+        cache[(0, 2)] = b'\x00'
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='fork not available')
+def test_across_processes(cache):
+    state = get_state(cache)
+    misses = cache.misses
+
+    ctx = multiprocessing.get_context('fork')
+    with ctx.Pool(3) as pool:
+        states = pool.map(get_state, [cache] * 3)
+
+    assert states == [state] * 3
+    assert cache.misses == misses
+    assert cache.hits >= 3
+
+
+def claim_stat(args):
+    name, barrier = args
+    with SharedCache(name, create=False) as cache:
+        barrier.wait()
+        return cache._get_stat()
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='fork not available')
+def test_claim_stats(cache):
+    ctx = multiprocessing.get_context('fork')
+    with ctx.Manager() as manager, ctx.Pool(8) as pool:
+        barrier = manager.Barrier(8)
+        stats = pool.map(claim_stat, [(cache.name, barrier)] * 8)
+
+    assert None not in stats
+    assert len(set(stats)) == 8
+
+
+@pytest.mark.skipif(os.name != 'posix', reason='posix only')
+def test_reclaim_stats(cache):
+    process = subprocess.Popen([sys.executable, '-c', ''])
+    process.wait()
+
+    for i in range(cache.nprocs):
+        _STATS.pack_into(cache.buf, _HEADER.size + i * _STATS.size,
+            process.pid, 1, 2)
+
+    with pytest.raises(KeyError):
+        cache[(0, 4)]
+
+    assert cache._get_stat() is not None
+    assert (cache.hits, cache.misses) == (cache.nprocs, 2 * cache.nprocs + 1)
+
+
+def test_digest_size(cache):
+    with pytest.raises(ValueError):
+        InmemoryTree('sha512', cache=cache)
+
+    with SharedCache(slots=1024, digest_size=64) as other:
+        try:
+            tree = make_tree(algorithm='sha512', threshold=2, cache=other)
+            reference = InmemoryTree.init_from_entries(entries, 'sha512',
+                disable_cache=True)
+
+            assert tree.prove_inclusion(42).serialize() == \
+                reference.prove_inclusion(42).serialize()
+            assert other.currsize > 0
+        finally:
+            other.unlink()
+
+
+def attach_and_exit(name):
+    with SharedCache(name, create=False) as cache:
+        return cache[(0, 4)]
+
+
+def test_attach_untracked(cache):
+    cache[(0, 4)] = b'\x05' * 32
+
+    ctx = multiprocessing.get_context('spawn')
+    with ctx.Pool(1) as pool:
+        assert pool.map(attach_and_exit, [cache.name]) == [b'\x05' * 32]
+
+    with SharedCache(cache.name, create=False) as other:
+        assert other[(0, 4)] == b'\x05' * 32
@@ -0,0 +1,81 @@
+import pytest
+
+from pymerkle import InmemoryTree, CompactTree
+from pymerkle.concrete.inmemory import Leaf
+
+
+entries = [f'entry-{i}'.encode() for i in range(70)]
+
+reference = InmemoryTree.init_from_entries(entries)
+tree = CompactTree.init_from_entries(entries, threshold=1 << 10)
+
+
+@pytest.mark.parametrize('size', range(1, len(entries) + 1))
+def test_state(size):
+    assert tree.get_state(size) == reference.get_state(size)
+
+
+@pytest.mark.parametrize('size', range(1, len(entries) + 1))
+def test_proofs(size):
+    for index in (1, (size + 1) // 2, size):
+        assert tree.prove_inclusion(index, size).serialize() == \
+            reference.prove_inclusion(index, size).serialize()
+
+    for prior in (1, (size + 2) // 3, size):
+        assert tree.prove_consistency(prior, size).serialize() == \
+            reference.prove_consistency(prior, size).serialize()
+
+
+def test_levels():
+    digest_size = tree.digest_size
+
+    for height, level in enumerate(tree.levels):
+        width = 1 << height
+        assert len(level) == (len(entries) >> height) * digest_size
+
+        for offset in range(0, len(entries) - width + 1, width):
+            assert tree._get_subroot(offset, width) == \
+                reference._get_root(offset, offset + width)
+
+
+@pytest.mark.parametrize('opts', [{}, {'disable_cache': True}])
+def test_no_leaves_read(opts):
+    tree = CompactTree.init_from_entries(entries, **opts)
+    tree._get_leaves = None
+
+    for index in range(1, len(entries) + 1):
+        tree.prove_inclusion(index)
+
+
+def test_entries():
+    assert tree.get_entry(7) == entries[6]
+
+    with pytest.raises(ValueError):
+        tree.get_entry(len(entries) + 1)
+
+
+def test_disable_entries():
+    tree = CompactTree.init_from_entries(entries, disable_entries=True)
+    assert tree.entries is None
+    assert tree.get_state() == reference.get_state()
+
+    with pytest.raises(ValueError):
+        tree.get_entry(1)
+
+
+def test_leaf_slots():
+    assert not hasattr(Leaf(b'foo', b'bar'), '__dict__')
+
+
+@pytest.mark.parametrize('prior', range(0, 20))
+def test_append_entries(prior):
+    tree = CompactTree.init_from_entries(entries[:prior])
+    tree.append_entries(entries[prior:prior + 7])
+    tree.append_entries(entries[prior + 7:])
+
+    expected = CompactTree()
+    for data in entries:
+        expected.append_entry(data)
+
+    assert tree.levels == expected.levels
+    assert tree.entries == entries
@@ -1,8 +1,8 @@
 import pytest
-from tests.conftest import tree_and_index
+from tests.conftest import make_trees, tree_and_index
 
-from pymerkle import verify_inclusion, verify_consistency, InvalidChallenge, \
-    InvalidProof
+from pymerkle import InmemoryTree, ConsistencyVerifier, verify_inclusion, \
+    verify_consistency, MerkleProof, InvalidChallenge, InvalidProof
 
 
 @pytest.mark.parametrize('tree, size1', tree_and_index())
@@ -53,3 +53,143 @@ def test_consistency_invalid_challenge(tree, size1):
 
     with pytest.raises(InvalidChallenge):
         tree.prove_consistency(-1, size1)
+
+
+@pytest.mark.parametrize('tree', make_trees(default_config=True))
+def test_consistency_many(tree):
+    size2 = tree.get_size()
+    if size2 == 0:
+        with pytest.raises(InvalidChallenge):
+            tree.prove_consistency_many([1])
+        return
+
+    sizes1 = list(range(size2, 0, -1)) + [1, size2]
+    proofs = tree.prove_consistency_many(sizes1, size2)
+
+    for (size1, proof) in zip(sizes1, proofs):
+        assert proof.serialize() == tree.prove_consistency(size1,
+            size2).serialize()
+        verify_consistency(tree.get_state(size1), tree.get_state(size2),
+            proof)
+
+    assert tree.prove_consistency_many([]) == []
+
+    with pytest.raises(InvalidChallenge):
+        tree.prove_consistency_many([1], size2 + 1)
+
+    with pytest.raises(InvalidChallenge):
+        tree.prove_consistency_many([0, 1], size2)
+
+    with pytest.raises(InvalidChallenge):
+        tree.prove_consistency_many([size2 + 1])
+
+
+def test_consistency_verifier(monkeypatch):
+    tree = InmemoryTree.init_from_entries([f'{i}'.encode() for i in
+        range(50)])
+    state = tree.get_state
+
+    verifier = ConsistencyVerifier()
+    assert verifier.latest is None
+    with pytest.raises(ValueError):
+        verifier.update(10, state(10), tree.prove_consistency(1, 10))
+
+    verifier.trust(3, state(3))
+    for size in (10, 20, 50):
+        verifier.update(size, state(size), tree.prove_consistency(
+            verifier.latest[0], size))
+        assert verifier.latest == (size, state(size))
+
+    with pytest.raises(InvalidProof):
+        verifier.update(50, state(49), tree.prove_consistency(50, 50))
+    assert verifier.latest == (50, state(50))
+
+    with pytest.raises(ValueError):
+        verifier.trust(10, state(11))
+
+    calls = []
+    monkeypatch.setattr(MerkleProof, 'resolve', lambda proof: calls.append(
+        proof))
+
+    assert verifier.is_consistent(3, state(3), 50, state(50))
+    assert verifier.is_consistent(50, state(50), 3, state(3))
+    verifier.verify(3, state(3), 50, state(50), tree.prove_consistency(3, 50))
+    verifier.verify(10, state(10), 20, state(20), tree.prove_consistency(10,
+        20))
+    assert not calls
+
+    assert not verifier.is_consistent(5, state(5), 50, state(50))
+    assert not verifier.is_consistent(3, state(4), 50, state(50))
+
+
+def test_consistency_verifier_merge():
+    tree = InmemoryTree.init_from_entries([f'{i}'.encode() for i in
+        range(50)])
+    state = tree.get_state
+
+    verifier = ConsistencyVerifier()
+    verifier.trust(5, state(5))
+
+    verifier.verify(20, state(20), 40, state(40), tree.prove_consistency(20,
+        40))
+    assert verifier.latest == (5, state(5))
+    assert not verifier.is_consistent(5, state(5), 40, state(40))
+    assert verifier.is_consistent(20, state(20), 40, state(40))
+
+    verifier.verify(5, state(5), 30, state(30), tree.prove_consistency(5, 30))
+    verifier.verify(30, state(30), 40, state(40), tree.prove_consistency(30,
+        40))
+    assert verifier.latest == (40, state(40))
+    assert verifier.is_consistent(5, state(5), 20, state(20))
+
+
+def test_consistency_verifier_fork():
+    entries = [f'{i}'.encode() for i in range(30)]
+    tree = InmemoryTree.init_from_entries(entries)
+    fork = InmemoryTree.init_from_entries(entries[:10] + [b'forged'] +
+        entries[11:])
+
+    verifier = ConsistencyVerifier()
+    verifier.trust(5, tree.get_state(5))
+
+    verifier.verify(5, tree.get_state(5), 30, tree.get_state(30),
+        tree.prove_consistency(5, 30))
+    verifier.verify(5, fork.get_state(5), 30, fork.get_state(30),
+        fork.prove_consistency(5, 30))
+
+    assert verifier.latest == (30, tree.get_state(30))
+    assert not verifier.is_consistent(30, tree.get_state(30), 30,
+        fork.get_state(30))
+    assert not verifier.is_consistent(20, fork.get_state(20), 30,
+        tree.get_state(30))
+
+    with pytest.raises(InvalidProof):
+        verifier.verify(30, tree.get_state(30), 30, fork.get_state(30),
+            fork.prove_consistency(30, 30))
+
+
+def test_consistency_verifier_sizes():
+    tree = InmemoryTree.init_from_entries([f'{i}'.encode() for i in
+        range(50)])
+    state = tree.get_state
+
+    verifier = ConsistencyVerifier()
+    verifier.trust(10, state(10))
+
+    proof = tree.prove_consistency(10, 20)
+    proof.size = 10 ** 9
+    with pytest.raises(InvalidProof):
+        verifier.update(10 ** 9, state(20), proof)
+
+    proof = tree.prove_consistency(10, 20)
+    with pytest.raises(InvalidProof):
+        verifier.update(21, state(20), proof)
+
+    with pytest.raises(InvalidProof):
+        verifier.verify(12, state(10), 20, state(20), proof)
+
+    with pytest.raises(InvalidProof):
+        verifier.verify(0, state(10), 20, state(20), proof)
+
+    assert verifier.latest == (10, state(10))
+    assert not verifier.ancestors
@@ -1,8 +1,9 @@
 from itertools import product
 import pytest
 
+from pymerkle import InvalidChallenge
 from pymerkle.utils import decompose
-from tests.conftest import option, tree_and_index, tree_and_range
+from tests.conftest import option, make_trees, tree_and_index, tree_and_range
 
 
 @pytest.mark.parametrize('tree, start, limit', tree_and_range())
@@ -33,6 +34,23 @@ def test_state(tree, size):
     assert state == tree._get_root(0, size)
 
 
+@pytest.mark.parametrize('tree', make_trees())
+def test_states(tree):
+    size = tree.get_size()
+    sizes = list(range(size, 0, -1)) + [size // 2, 0, size]
+
+    states = tree.get_states(sizes)
+    assert states == [tree.get_state(n) if n else tree.hash_empty() for n in
+        sizes]
+    assert tree.get_states([]) == []
+
+    with pytest.raises(InvalidChallenge):
+        tree.get_states([size + 1])
+
+    with pytest.raises(InvalidChallenge):
+        tree.get_states([-1])
+
+
 @pytest.mark.parametrize('tree, start, limit', tree_and_range())
 def test_inclusion_path(tree, start, limit):
     for bit, offset in product([0, 1], range(start, limit)):
@@ -0,0 +1,115 @@
+import os
+import pytest
+
+from pymerkle import InmemoryTree, CompactTree
+from pymerkle.dump import level_sizes
+
+
+entries = [f'entry-{i}'.encode() for i in range(40)]
+
+
+@pytest.fixture
+def path(tmp_path):
+    return os.path.join(tmp_path, 'merkle.dump')
+
+
+@pytest.mark.parametrize('size', range(len(entries) + 1))
+def test_level_sizes(size):
+    sizes = level_sizes(size)
+    assert sum(sizes) == max(2 * size - 1, 0)
+
+
+@pytest.mark.parametrize('size', range(len(entries) + 1))
+def test_inmemory(path, size):
+    tree = InmemoryTree.init_from_entries(entries[:size],
+        disable_security=True)
+    tree.dump(path)
+
+    clone = InmemoryTree.load(path)
+    clone.hashfunc = None
+
+    assert not clone.security
+    assert str(clone) == str(tree)
+    assert [leaf.data for leaf in clone.leaves] == entries[:size]
+
+    clone.hashfunc = tree.hashfunc
+    for offset in range(size):
+        assert clone._inclusion_path_fallback(offset) == \
+            tree._inclusion_path_fallback(offset)
+
+
+@pytest.mark.parametrize('size', range(len(entries) + 1))
+def test_compact(path, size):
+    tree = CompactTree.init_from_entries(entries[:size], algorithm='sha512')
+    tree.dump(path)
+
+    clone = CompactTree.load(path)
+    assert clone.algorithm == 'sha512'
+    assert clone.levels == tree.levels
+    assert clone.entries == entries[:size]
+
+
+@pytest.mark.parametrize('size', range(1, len(entries) + 1))
+def test_interchangeable(path, size):
+    tree = InmemoryTree.init_from_entries(entries[:size])
+    tree.dump(path)
+
+    clone = CompactTree.load(path)
+    assert clone.levels == CompactTree.init_from_entries(
+        entries[:size]).levels
+
+    clone.dump(path, disable_entries=True)
+    assert str(InmemoryTree.load(path)) == str(tree)
+
+
+def test_disable_entries(path):
+    tree = InmemoryTree.init_from_entries(entries)
+    tree.dump(path, disable_entries=True)
+
+    clone = InmemoryTree.load(path)
+    assert all(leaf.data is None for leaf in clone.leaves)
+
+    clone = CompactTree.load(path)
+    assert clone.entries is None
+    assert clone.get_state() == tree.get_state()
+
+
+def test_non_binary(path):
+    tree = InmemoryTree.init_from_entries(entries)
+    tree.leaves[1].data = 'bar'
+
+    with pytest.raises(ValueError):
+        tree.dump(path)
+
+    assert not os.path.exists(path)
+
+
+@pytest.mark.parametrize('cut', [1, 32, 100])
+def test_corrupted(path, cut):
+    InmemoryTree.init_from_entries(entries).dump(path)
+
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    with open(path, 'wb') as f:
+        f.write(data[:-cut])
+
+    with pytest.raises(ValueError):
+        InmemoryTree.load(path)
+
+
+@pytest.mark.parametrize('cls', [InmemoryTree, CompactTree])
+def test_load_options(path, cls):
+    tree = cls.init_from_entries(entries, algorithm='sha512',
+        disable_security=True)
+    tree.dump(path)
+
+    clone = cls.load(path, algorithm='sha512', disable_security=True)
+    assert (clone.algorithm, clone.security) == ('sha512', False)
+    assert clone.get_state() == tree.get_state()
+
+    with pytest.raises(ValueError):
+        cls.load(path, disable_security=False)
+
+    with pytest.raises(ValueError):
+        cls.load(path, algorithm='sha256')
@@ -1,8 +1,10 @@
 import pytest
-from tests.conftest import tree_and_index
+from tests.conftest import option, resolve_backend, tree_and_index, \
+    tree_and_range
 
-from pymerkle import verify_inclusion, verify_consistency, InvalidChallenge, \
-    InvalidProof
+from pymerkle import MerkleProof, verify_inclusion, verify_consistency, \
+    InvalidChallenge, InvalidProof
+from pymerkle.proof import update_inclusion
 
 
 @pytest.mark.parametrize('tree, index', tree_and_index())
@@ -49,3 +51,84 @@ def test_inclusion_invalid_challenge(tree, index):
 
     with pytest.raises(InvalidChallenge):
         tree.prove_inclusion(index + 1, index)
+
+
+@pytest.mark.parametrize('tree, index', tree_and_index())
+def test_update_inclusion(tree, index):
+    size2 = tree.get_size()
+    base = tree.get_leaf(index)
+
+    for size1 in range(index, size2 + 1):
+        inclusion = tree.prove_inclusion(index, size1)
+        consistency = tree.prove_consistency(size1, size2)
+
+        proof = update_inclusion(index, inclusion, consistency)
+        assert proof.serialize() == tree.prove_inclusion(index,
+            size2).serialize()
+
+        verify_inclusion(base, tree.get_state(), proof)
+
+
+@pytest.mark.parametrize('tree, index', tree_and_index(default_config=True))
+def test_update_inclusion_mismatch(tree, index):
+    size2 = tree.get_size()
+    inclusion = tree.prove_inclusion(index, index)
+    consistency = tree.prove_consistency(index, size2)
+
+    if index < size2:
+        with pytest.raises(InvalidProof):
+            update_inclusion(index, inclusion, tree.prove_consistency(
+                index + 1, size2))
+
+    if index > 1:
+        with pytest.raises(InvalidProof):
+            update_inclusion(index - 1, inclusion, consistency)
+
+    with pytest.raises(InvalidProof):
+        update_inclusion(index + 1, inclusion, consistency)
+
+
+@pytest.mark.parametrize('tree, start, end', tree_and_range() +
+    [(tree, index - 1, tree.get_size()) for (tree, index) in tree_and_index()])
+def test_iter_inclusion_proofs(tree, start, end):
+    proofs = list(tree.iter_inclusion_proofs(start, end, chunksize=3))
+    assert [proof.serialize() for proof in proofs] == [tree.prove_inclusion(
+        index).serialize() for index in range(start + 1, end + 1)]
+
+    size = end
+    encodings = tree.iter_inclusion_proofs(start, end, size, binary=True)
+    for (index, buff) in zip(range(start + 1, end + 1), encodings):
+        assert buff == tree.prove_inclusion(index, size).to_bytes()
+        verify_inclusion(tree.get_leaf(index), tree.get_state(size),
+            MerkleProof.from_bytes(buff))
+
+
+@pytest.mark.parametrize('tree, index', tree_and_index(default_config=True))
+def test_iter_inclusion_proofs_invalid_challenge(tree, index):
+    size = tree.get_size()
+
+    with pytest.raises(InvalidChallenge):
+        tree.iter_inclusion_proofs(0, index, size + 1)
+
+    with pytest.raises(InvalidChallenge):
+        tree.iter_inclusion_proofs(index, index)
+
+    with pytest.raises(InvalidChallenge):
+        tree.iter_inclusion_proofs(index - 1, index, index - 1)
+
+
+@pytest.mark.parametrize('size1', [0, 1, 2, 5, 8, 13])
+@pytest.mark.parametrize('count', [1, 2, 3, 7, 16, 21])
+def test_append_with_proofs(size1, count):
+    MerkleTree = resolve_backend(option)
+    entries = [f'entry-{i}'.encode() for i in range(size1 + count)]
+    tree = MerkleTree.init_from_entries(entries[:size1])
+
+    index, proofs = tree.append_entries(entries[size1:], prove=True)
+    assert index == size1 + count
+    assert [proof.serialize() for proof in proofs] == [tree.prove_inclusion(
+        index).serialize() for index in range(size1 + 1, size1 + count + 1)]
+
+    index, proof = tree.append_entry(b'foo', prove=True)
+    assert proof.serialize() == tree.prove_inclusion(index).serialize()
+    verify_inclusion(tree.get_leaf(index), tree.get_state(), proof)
@@ -0,0 +1,175 @@
+import io
+import pytest
+
+from pymerkle import InmemoryTree
+
+
+entries = [f'entry-{i}'.encode() for i in range(40)]
+
+
+def append_one_by_one(entries):
+    tree = InmemoryTree()
+    for data in entries:
+        tree.append_entry(data)
+
+    return tree
+
+
+@pytest.mark.parametrize('size', range(len(entries) + 1))
+def test_init_from_entries(size):
+    tree = InmemoryTree.init_from_entries(entries[:size])
+    expected = append_one_by_one(entries[:size])
+
+    assert str(tree) == str(expected)
+    assert tree.get_size() == size
+
+
+@pytest.mark.parametrize('prior', range(0, 20))
+def test_append_entries(prior):
+    expected = append_one_by_one(entries)
+
+    tree = InmemoryTree.init_from_entries(entries[:prior])
+    assert tree.append_entries(entries[prior:prior + 7]) == \
+        min(prior + 7, len(entries))
+    assert tree.append_entries(entries[prior + 7:]) == len(entries)
+    assert tree.append_entries([]) == len(entries)
+
+    assert str(tree) == str(expected)
+    assert tree.root.parent is None
+
+    for offset in range(len(entries)):
+        assert tree._inclusion_path_fallback(offset) == \
+            expected._inclusion_path_fallback(offset)
+
+
+@pytest.mark.parametrize('size', range(1, len(entries) + 1))
+def test_structural_paths(size):
+    tree = InmemoryTree.init_from_entries(entries)
+
+    for offset in range(size):
+        assert tree._inclusion_path_fallback(offset, size) == \
+            tree._inclusion_path_naive(0, offset, size, 0)
+
+    for prior in range(1, size + 1):
+        assert tree._consistency_path_fallback(prior, size) == \
+            tree._consistency_path_naive(0, prior, size, 0)
+
+
+@pytest.mark.parametrize('opts', [{}, {'disable_cache': True}])
+def test_no_leaves_read(opts):
+    tree = InmemoryTree.init_from_entries(entries, threshold=1, **opts)
+    tree._get_leaves = None
+
+    for size in range(1, len(entries) + 1):
+        state = tree.get_state(size)
+        for index in range(1, size + 1):
+            proof = tree.prove_inclusion(index, size)
+            assert proof.resolve() == state
+
+        for prior in range(1, size + 1):
+            proof = tree.prove_consistency(prior, size)
+            assert proof.retrieve_prior_state() == tree.get_state(prior)
+
+    assert tree.get_cache_info().size == 0
+
+
+def render(tree, **kwargs):
+    buff = io.StringIO()
+    tree.render(buff, **kwargs)
+    return buff.getvalue()
+
+
+def expand_recursively(node, indent=2, trim=None, level=0, ignored=None):
+    ignored = ignored or []
+
+    if level == 0:
+        out = 2 * '\n' + ' └─' if not node.parent else ''
+    else:
+        out = (indent + 1) * ' '
+
+    for col in range(1, level):
+        out += (' │' if col not in ignored else 2 * ' ') + indent * ' '
+
+    if node.is_left_child():
+        out += ' ├──'
+
+    if node.is_right_child():
+        out += ' └──'
+        ignored += [level]
+
+    checksum = node.digest.hex()
+    out += ((checksum[:trim] + '...') if trim else checksum) + '\n'
+
+    if node.is_leaf():
+        return out
+
+    recursion = (indent, trim, level + 1, ignored[:])
+
+    return out + expand_recursively(node.left, *recursion) + \
+        expand_recursively(node.right, *recursion)
+
+
+@pytest.mark.parametrize('size', range(len(entries) + 1))
+def test_render(size):
+    tree = InmemoryTree.init_from_entries(entries[:size])
+
+    assert render(tree) == str(tree)
+
+    if size > 0:
+        assert str(tree) == expand_recursively(tree.root, 2, 8) + '\n'
+
+        for node in tree.leaves + [tree.root.left, tree.root.right]:
+            if node:
+                for args in [(2, 8), (3, None), (1, 4, 2, [1])]:
+                    assert node.expand(*args) == \
+                        expand_recursively(node, *args)
+
+
+def count_nodes(node, depth):
+    if node.is_leaf() or depth == 0:
+        return 1
+
+    return 1 + count_nodes(node.left, depth - 1) + \
+        count_nodes(node.right, depth - 1)
+
+
+@pytest.mark.parametrize('depth', range(8))
+def test_render_max_depth(depth):
+    tree = InmemoryTree.init_from_entries(entries)
+    lines = render(tree, max_depth=depth).strip('\n').split('\n')
+
+    assert len(lines) == count_nodes(tree.root, depth)
+    remaining = iter(str(tree).strip('\n').split('\n'))
+    assert all(line in remaining for line in lines)
+    assert render(tree, max_depth=10) == str(tree)
+
+
+@pytest.mark.parametrize('start, limit', [(0, 1), (5, 6), (7, 19), (39, 40),
+    (0, 40)])
+def test_render_window(start, limit):
+    tree = InmemoryTree.init_from_entries(entries)
+    out = render(tree, window=(start, limit), trim=None)
+
+    for offset, leaf in enumerate(tree.leaves):
+        assert (leaf.digest.hex() in out) == (start <= offset < limit)
+
+    assert tree.root.digest.hex() in out
+
+
+def test_render_subroot():
+    tree = InmemoryTree.init_from_entries(entries)
+    node = tree._get_subroot_node(9, 3)
+
+    assert render(tree, subroot=(9, 3)) == node.expand(2, 8) + '\n'
+
+    with pytest.raises(ValueError):
+        render(tree, subroot=(10, 3))
+
+    with pytest.raises(ValueError):
+        render(tree, subroot=(41, 0))
+
+
+def test_render_empty():
+    tree = InmemoryTree()
+
+    assert render(tree) == str(tree) == '\n └─[None]\n'
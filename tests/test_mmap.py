@@ -0,0 +1,202 @@
+import gc
+import os
+import pickle
+import pytest
+
+from pymerkle import InmemoryTree, MmapTree, verify_inclusion, \
+    verify_consistency
+
+
+entries = [f'entry-{i}'.encode() for i in range(100)]
+
+
+@pytest.fixture
+def path(tmp_path):
+    return os.path.join(tmp_path, 'merkle.bin')
+
+
+def test_reopen(path):
+    with MmapTree(path) as tree:
+        tree.append_entries(entries[:60])
+        tree.append_entry(entries[60])
+        state = tree.get_state()
+
+    with MmapTree(path) as tree:
+        assert tree.get_size() == 61
+        assert tree.get_state() == state
+        assert tree.get_entry(61) == entries[61 - 1]
+
+        tree.append_entries(entries[61:])
+        assert tree.get_state() == \
+            InmemoryTree.init_from_entries(entries).get_state()
+
+
+def test_proofs(path):
+    reference = InmemoryTree.init_from_entries(entries)
+
+    with MmapTree(path, fsync=False) as tree:
+        tree.append_entries(entries, chunksize=7)
+
+        state = tree.get_state()
+        for index in (1, 33, 64, 100):
+            proof = tree.prove_inclusion(index)
+            assert proof.serialize() == \
+                reference.prove_inclusion(index).serialize()
+            verify_inclusion(tree.get_leaf(index), state, proof)
+
+        proof = tree.prove_consistency(37, 100)
+        verify_consistency(tree.get_state(37), state, proof)
+
+
+def test_leaves(path):
+    with MmapTree(path, fsync=False) as tree:
+        tree.append_entries(entries[:10])
+        assert tree._get_leaves(0, 10) == \
+            [tree.hash_buff(data) for data in entries[:10]]
+
+        tree.append_entries(entries[10:])
+        assert tree._get_leaves(95, 5) == \
+            [tree.get_leaf(index) for index in range(96, 101)]
+        assert tree._get_leaves(99, 1) == [tree.get_leaf(100)]
+        assert tree._get_leaves(100, 1) == []
+
+
+def test_discard_uncommitted(path):
+    with MmapTree(path) as tree:
+        tree.append_entries(entries[:10])
+        state = tree.get_state()
+
+    with open(path, 'ab') as f:
+        f.write(os.urandom(3 * 32 + 5))
+
+    with open(path + '.entries', 'ab') as f:
+        f.write(b'\x05\x00\x00\x00trunc')
+
+    with MmapTree(path) as tree:
+        assert tree.get_size() == 10
+        assert tree.get_state() == state
+
+        tree.append_entry(b'foo')
+        assert tree.get_entry(11) == b'foo'
+        assert tree.get_state() == \
+            InmemoryTree.init_from_entries(entries[:10] + [b'foo']).get_state()
+
+
+def test_disable_entries(path):
+    with MmapTree(path, disable_entries=True) as tree:
+        tree.append_entries(entries)
+
+        with pytest.raises(ValueError):
+            tree.get_entry(1)
+
+    assert not os.path.exists(path + '.entries')
+
+    with pytest.raises(ValueError):
+        MmapTree(path)
+
+
+@pytest.mark.parametrize('opts', [{'algorithm': 'sha512'},
+                                  {'disable_security': True}])
+def test_incompatible_reopen(path, opts):
+    with MmapTree(path) as tree:
+        tree.append_entries(entries)
+
+    with pytest.raises(ValueError):
+        MmapTree(path, **opts)
+
+
+def test_pickle(path):
+    with MmapTree(path) as tree:
+        tree.append_entries(entries)
+        clone = pickle.loads(pickle.dumps(tree))
+
+        assert clone.get_state() == tree.get_state()
+        assert clone.get_entry(7) == tree.get_entry(7)
+        clone.close()
+
+
+def test_pickle_during_append(path):
+    with MmapTree(path, fsync=False) as tree:
+        tree.append_entries(entries[:50])
+        state = tree.get_state()
+
+        # Uncommitted tail of an append in progress
+        os.pwrite(tree.fd, b'\x00' * tree.digest_size * 10,
+            os.fstat(tree.fd).st_size)
+        length = os.fstat(tree.fd).st_size
+
+        clone = pickle.loads(pickle.dumps(tree))
+        assert os.fstat(tree.fd).st_size == length
+        assert clone.get_size() == 50
+        assert clone.get_state() == state
+
+        with pytest.raises(ValueError):
+            clone.append_entry(b'foo')
+
+        clone.close()
+
+    with MmapTree(path) as tree:
+        assert tree.get_size() == 50
+        assert tree.get_state() == state
+
+
+def test_writer_lock(path):
+    with MmapTree(path, fsync=False) as tree:
+        tree.append_entries(entries[:50])
+        state = tree.get_state()
+
+        # Uncommitted tail of an append in progress
+        os.pwrite(tree.fd, b'\x00' * tree.digest_size * 10,
+            os.fstat(tree.fd).st_size)
+        length = os.fstat(tree.fd).st_size
+
+        with pytest.raises(ValueError):
+            MmapTree(path)
+
+        with MmapTree(path, readonly=True) as reader:
+            assert reader.get_size() == 50
+            assert reader.get_state() == state
+            assert reader.get_entry(7) == entries[6]
+
+            with pytest.raises(ValueError):
+                reader.append_entry(b'foo')
+
+        assert os.fstat(tree.fd).st_size == length
+
+        tree.append_entries(entries[50:])
+        assert tree.get_state() == \
+            InmemoryTree.init_from_entries(entries).get_state()
+
+    with MmapTree(path) as tree:
+        assert tree.get_size() == len(entries)
+
+
+def test_readonly_missing(path):
+    with pytest.raises(FileNotFoundError):
+        MmapTree(path, readonly=True)
+
+    assert not os.path.exists(path)
+
+
+def test_truncated(path):
+    with MmapTree(path) as tree:
+        tree.append_entries(entries)
+
+    os.truncate(path, os.path.getsize(path) - 32)
+
+    for _ in range(2):
+        with pytest.raises(ValueError, match='truncated'):
+            MmapTree(path)
+
+
+def test_release_files(path):
+    tree = MmapTree(path)
+    tree.append_entries(entries)
+    fds = [tree.fd, tree.entries_fd, tree.index_fd]
+
+    del tree
+    gc.collect()
+
+    for fd in fds:
+        with pytest.raises(OSError):
+            os.fstat(fd)
@@ -0,0 +1,194 @@
+import os
+import pickle
+import sqlite3
+from threading import Thread
+import pytest
+
+from pymerkle import InmemoryTree, SqliteTree, PartitionedSqliteTree
+
+
+entries = [f'entry-{i:03}'.encode() for i in range(100)]
+
+reference = InmemoryTree.init_from_entries(entries)
+
+
+@pytest.mark.parametrize('workers', [1, 4])
+def test_segments(tmp_path, workers):
+    tree = PartitionedSqliteTree(tmp_path, segment_size=8, workers=workers)
+    for data in entries[:5]:
+        tree.append_entry(data)
+    assert tree.append_entries(entries[5:]) == len(entries)
+
+    assert sorted(os.listdir(tmp_path)) == ['segment-%08d.db' % k for k in
+        range(13)]
+    assert len(tree.roots) == 12
+    assert all(segment.immutable for segment in tree.segments[:12])
+    assert not tree.segments[12].immutable
+
+    assert tree._get_leaves(0, len(entries)) == \
+        reference._get_leaves(0, len(entries))
+    assert tree._get_leaves(13, 30) == reference._get_leaves(13, 30)
+    assert tree._get_leaves(95, 10) == reference._get_leaves(95, 10)
+    assert tree.get_entry(42) == entries[41]
+
+    for size in range(1, len(entries) + 1):
+        assert tree.get_state(size) == reference.get_state(size)
+
+    for index in (1, 8, 9, 64, 97, 100):
+        assert tree.prove_inclusion(index).serialize() == \
+            reference.prove_inclusion(index).serialize()
+
+    for size1 in (1, 8, 33, 96):
+        assert tree.prove_consistency(size1).serialize() == \
+            reference.prove_consistency(size1).serialize()
+
+    tree.close()
+
+
+def test_sealed_subroots(tmp_path):
+    tree = PartitionedSqliteTree(tmp_path, segment_size=8, disable_cache=True)
+    tree.append_entries(entries)
+
+    tree._get_leaves = None
+    assert tree.get_state(96) == reference.get_state(96)
+    assert tree._get_subroot(32, 32) == reference._get_subroot(32, 32)
+
+    tree.close()
+
+
+def test_reopen(tmp_path):
+    with PartitionedSqliteTree(tmp_path, segment_size=8) as tree:
+        tree.append_entries(entries[:50])
+
+    with PartitionedSqliteTree(tmp_path, segment_size=8) as tree:
+        assert tree.get_size() == 50
+        assert len(tree.roots) == 6
+
+        tree.append_entries(entries[50:])
+        assert tree.get_state() == reference.get_state()
+
+    with pytest.raises(ValueError):
+        PartitionedSqliteTree(tmp_path, segment_size=4)
+
+    with pytest.raises(ValueError):
+        PartitionedSqliteTree(tmp_path, segment_size=16)
+
+
+def test_seal_on_reopen(tmp_path):
+    with SqliteTree(os.path.join(tmp_path, 'segment-00000000.db')) as segment:
+        segment.append_entries(entries[:8])
+
+    with PartitionedSqliteTree(tmp_path, segment_size=8) as tree:
+        assert tree.roots == [reference.get_state(8)]
+        assert tree.segments[0].immutable
+
+        tree.append_entries(entries[8:])
+        assert tree.get_state() == reference.get_state()
+
+
+def test_sealed_is_readonly(tmp_path):
+    with PartitionedSqliteTree(tmp_path, segment_size=8) as tree:
+        tree.append_entries(entries[:8])
+
+        with pytest.raises(sqlite3.OperationalError):
+            tree.segments[0].append_entry(b'foo')
+
+
+def test_invalid_directory(tmp_path):
+    with pytest.raises(ValueError):
+        PartitionedSqliteTree(tmp_path, segment_size=6)
+
+    with PartitionedSqliteTree(tmp_path, segment_size=8) as tree:
+        tree.append_entries(entries[:20])
+
+    os.remove(os.path.join(tmp_path, 'segment-00000001.db'))
+    with pytest.raises(ValueError):
+        PartitionedSqliteTree(tmp_path, segment_size=8)
+
+
+def test_pickle(tmp_path):
+    tree = PartitionedSqliteTree(tmp_path, segment_size=8)
+    tree.append_entries(entries)
+
+    clone = pickle.loads(pickle.dumps(tree))
+    assert clone.get_state() == tree.get_state()
+    assert clone._get_leaves(0, 20) == tree._get_leaves(0, 20)
+
+    clone.close()
+    tree.close()
+
+
+def test_cached_size(tmp_path):
+    tree = PartitionedSqliteTree(tmp_path, segment_size=8)
+    tree.append_entries(entries[:50])
+
+    def fail():
+        raise AssertionError('size should not be queried')
+
+    tree.segments[-1].get_size = fail
+    assert tree.get_size() == 50
+    assert tree.prove_inclusion(42).serialize() == \
+        reference.prove_inclusion(42, 50).serialize()
+
+    del tree.segments[-1].get_size
+    tree.append_entries(entries[50:])
+    assert tree.get_size() == len(entries)
+    assert tree.get_state() == reference.get_state()
+
+    tree.close()
+
+
+@pytest.mark.parametrize('workers', [1, 4])
+def test_max_readers(tmp_path, workers):
+    tree = PartitionedSqliteTree(tmp_path, segment_size=8, workers=workers,
+        max_readers=2, disable_cache=True)
+    tree.append_entries(entries)
+
+    for _ in range(2):
+        assert tree._get_leaves(0, len(entries)) == \
+            reference._get_leaves(0, len(entries))
+        assert tree.get_entries(0, len(entries)) == entries
+        assert [tree.get_entry(index) for index in range(1, 101)] == entries
+
+    assert sum(len(segment.readers) for segment in tree.segments) <= \
+        2 * (workers + 1)
+
+    with pytest.raises(ValueError):
+        PartitionedSqliteTree(tmp_path, segment_size=8, max_readers=0)
+
+    tree.close()
+
+
+def test_reads_during_seal(tmp_path):
+    tree = PartitionedSqliteTree(tmp_path, segment_size=16)
+    tree.append_entry(entries[0])
+
+    done = []
+    errors = []
+
+    def read():
+        while not done:
+            try:
+                size = tree.get_size()
+                assert tree._get_leaves(0, size) == \
+                    reference._get_leaves(0, size)
+                assert tree.get_state(size) == reference.get_state(size)
+            except Exception as err:
+                errors.append(err)
+
+    threads = [Thread(target=read) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+
+    for data in entries[1:]:
+        tree.append_entry(data)
+
+    done.append(True)
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert len(tree.roots) == 6
+    assert tree.get_state() == reference.get_state()
+
+    tree.close()
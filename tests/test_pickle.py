@@ -0,0 +1,102 @@
+import os
+import pickle
+import multiprocessing
+import pytest
+
+from pymerkle import InmemoryTree, SqliteTree
+
+
+entries = [f'entry-{i}'.encode() for i in range(300)]
+
+
+def prove(args):
+    tree, index = args
+    return tree.prove_inclusion(index).serialize()
+
+
+def get_state(tree):
+    return tree.get_state(), tree.get_cache_info().size
+
+
+@pytest.fixture
+def dbfile(tmp_path):
+    return os.path.join(tmp_path, 'merkle.db')
+
+
+def test_pickle_inmemory():
+    tree = InmemoryTree.init_from_entries(entries, threshold=2)
+    clone = pickle.loads(pickle.dumps(tree))
+
+    assert clone.get_state() == tree.get_state()
+    assert clone.prove_inclusion(7).serialize() == \
+        tree.prove_inclusion(7).serialize()
+
+
+def test_pickle_sqlite(dbfile):
+    with SqliteTree(dbfile, pragmas={'journal_mode': 'WAL'}) as tree:
+        tree.append_entries(entries)
+        data = pickle.dumps(tree)
+
+        assert b'entry-' not in data
+
+        with pickle.loads(data) as clone:
+            assert clone.pragmas == tree.pragmas
+            assert clone.get_state() == tree.get_state()
+
+
+def test_pickle_sqlite_in_memory():
+    tree = SqliteTree(':memory:')
+
+    with pytest.raises(TypeError):
+        pickle.dumps(tree)
+
+
+@pytest.mark.parametrize('pickle_cache', [False, True])
+def test_pickle_cache(dbfile, pickle_cache):
+    with SqliteTree(dbfile, threshold=2, pickle_cache=pickle_cache) as tree:
+        tree.append_entries(entries)
+        tree.get_state()
+
+        clone = pickle.loads(pickle.dumps(tree))
+        assert (clone.get_cache_info().size > 0) == pickle_cache
+        assert clone.get_state() == tree.get_state()
+        clone.close()
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='fork not available')
+def test_process_pool(dbfile):
+    with SqliteTree(dbfile, threshold=2) as tree:
+        tree.append_entries(entries)
+        state = tree.get_state()
+        cachesize = tree.get_cache_info().size
+        con = tree.con
+
+        ctx = multiprocessing.get_context('fork')
+        with ctx.Pool(2) as pool:
+            results = pool.map(get_state, [tree] * 4)
+            proofs = pool.map(prove, [(tree, i) for i in (1, 17, 300)])
+
+        assert all(result == (state, cachesize) for result in results)
+        assert proofs == [prove((tree, i)) for i in (1, 17, 300)]
+        assert tree.con is con
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='fork not available')
+def test_reinit_after_fork(dbfile):
+    with SqliteTree(dbfile) as tree:
+        tree.append_entries(entries)
+        tree.get_size()
+
+        rfd, wfd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            try:
+                ok = tree._con is None and not tree.readers and \
+                    tree.get_state() == tree.get_state(300)
+                os.write(wfd, b'1' if ok else b'0')
+            finally:
+                os._exit(0)
+
+        os.waitpid(pid, 0)
+        assert os.read(rfd, 1) == b'1'
+        assert tree._con is not None
@@ -0,0 +1,194 @@
+import os
+import pickle
+import pytest
+from tests.conftest import tree_and_index
+
+from pymerkle import InmemoryTree, MerkleProof, InvalidProof, \
+    verify_inclusion, verify_consistency, verify_many
+from pymerkle.proof import read_proofs, write_proofs
+from pymerkle.hasher import get_hasher
+
+
+@pytest.mark.parametrize('tree, index', tree_and_index())
+def test_binary_inclusion(tree, index):
+    proof = tree.prove_inclusion(index)
+    buff = proof.to_bytes()
+
+    decoded = MerkleProof.from_bytes(buff)
+    assert decoded.serialize() == proof.serialize()
+    assert decoded.to_bytes() == buff
+
+    verify_inclusion(tree.get_leaf(index), tree.get_state(), decoded)
+
+
+@pytest.mark.parametrize('tree, index', tree_and_index())
+def test_binary_consistency(tree, index):
+    proof = tree.prove_consistency(index)
+    buff = proof.to_bytes()
+
+    decoded = MerkleProof.from_bytes(bytearray(buff))
+    assert decoded.serialize() == proof.serialize()
+    assert decoded.to_bytes() == buff
+
+    verify_consistency(tree.get_state(index), tree.get_state(), decoded)
+
+
+def test_binary_invalid():
+    proof = MerkleProof('sha256', True, 5, [0, 1, 0], [1, 0, 1],
+        [bytes(32), bytes(range(32)), bytes(32)])
+    buff = proof.to_bytes()
+
+    assert len(buff) == 16 + 1 + 1 + 3 * 32
+
+    with pytest.raises(ValueError):
+        MerkleProof.from_bytes(buff[:10])
+
+    with pytest.raises(ValueError):
+        MerkleProof.from_bytes(buff[:-1])
+
+    with pytest.raises(ValueError):
+        MerkleProof.from_bytes(buff + b'\x00')
+
+    with pytest.raises(ValueError):
+        MerkleProof.from_bytes(b'\x02' + buff[1:])
+
+    with pytest.raises(ValueError):
+        MerkleProof.from_bytes(buff[:1] + b'\xff' + buff[2:])
+
+    with pytest.raises(ValueError):
+        MerkleProof.from_bytes(buff[:1] + b'\x04' + buff[2:])
+
+    with pytest.raises(ValueError):
+        MerkleProof('sha256', True, 5, [2], [], [bytes(32)]).to_bytes()
+
+
+@pytest.mark.parametrize('tree, index', tree_and_index())
+def test_pickle(tree, index):
+    proof = tree.prove_consistency(index)
+
+    clone = pickle.loads(pickle.dumps(MerkleProof.from_bytes(
+        proof.to_bytes())))
+    assert clone.serialize() == proof.serialize()
+
+    verify_consistency(tree.get_state(index), tree.get_state(), clone)
+
+
+def test_compact_proof():
+    proof = MerkleProof('sha256', True, 5, [0, 1, 1], [],
+        [bytes(32), bytes(range(32)), bytes(32)])
+
+    assert not hasattr(proof, '__dict__')
+    assert proof.rule == [0, 1, 1]
+    assert proof.subset == []
+    assert MerkleProof('sha256', True, 5, 0b110, None,
+        proof.path).serialize() == proof.serialize()
+
+    assert proof.hasher is get_hasher('sha256', True)
+    assert proof.hasher is not get_hasher('sha256', False)
+
+    with pytest.raises(ValueError):
+        MerkleProof('sha256', True, 5, [0, 1], [], proof.path)
+
+    with pytest.raises(ValueError):
+        MerkleProof('sha256', True, 5, [0, 1, 1], [1, 0], proof.path)
+
+    with pytest.raises(ValueError):
+        MerkleProof('unknown', True, 5, proof.rule, [], proof.path)
+
+    path = proof.path
+    with pytest.raises(ValueError):
+        MerkleProof('sha256', True, 5, 1 << len(path), None, path)
+
+    with pytest.raises(ValueError):
+        MerkleProof('sha256', True, 5, 0, 1 << len(path), path)
+
+    with pytest.raises(ValueError):
+        MerkleProof('sha256', True, 5, -1, None, path)
+
+    assert MerkleProof('sha256', True, 5, (1 << len(path)) - 1, None,
+        path).rule == [1] * len(path)
+
+
+def make_items(tree):
+    size = tree.get_size()
+    state = tree.get_state()
+
+    items = [('inclusion', tree.get_leaf(index), state,
+        tree.prove_inclusion(index)) for index in range(1, size + 1)]
+    items += [('consistency', tree.get_state(size1), state,
+        tree.prove_consistency(size1)) for size1 in range(1, size + 1)]
+
+    return items
+
+
+@pytest.mark.parametrize('processes', [None, 2])
+def test_verify_many(processes):
+    tree = InmemoryTree.init_from_entries([f'{i}'.encode() for i in
+        range(30)])
+    items = make_items(tree)
+
+    assert verify_many(items, processes=processes, chunksize=7) == \
+        bytearray([1] * 60)
+
+    items[3] = items[3][:1] + (items[4][1],) + items[3][2:]
+    items[40] = items[40][:2] + (bytes(32),) + items[40][3:]
+    results = verify_many(iter(items), processes=processes, chunksize=7)
+    assert [i for (i, valid) in enumerate(results) if not valid] == [3, 40]
+
+    with pytest.raises(InvalidProof, match='Proof 3 is invalid'):
+        verify_many(items, processes=processes, chunksize=7, fail_fast=True)
+
+    assert verify_many([]) == bytearray()
+
+
+def test_verify_many_malformed():
+    tree = InmemoryTree.init_from_entries([f'{i}'.encode() for i in
+        range(30)])
+    items = make_items(tree)[:2] + make_items(tree)[30:32]
+
+    # Kind is chosen by the caller, not by the proof
+    _, _, root, proof = items[2]
+    forged = [('inclusion', proof.path[0], root, proof)]
+    _, base, root, proof = items[0]
+    forged += [('consistency', base, root, proof)]
+
+    unknown = MerkleProof('sha256', True, proof.size, proof.rule, [],
+        proof.path)
+    unknown.algorithm = 'unknown'
+    forged += [('inclusion', base, root, unknown)]
+    forged += [('inclusion', base, root, MerkleProof('sha256', True, 1, [],
+        [], []))]
+    forged += [('inclusion', base, root, None)]
+    forged += [('unknown', base, root, proof)]
+    forged += [(base, root, proof)]
+
+    results = verify_many(items[:2] + forged + items[2:])
+    assert results == bytearray([1, 1] + [0] * len(forged) + [1, 1])
+
+
+@pytest.mark.parametrize('binary', [False, True])
+def test_proof_file(tmp_path, binary):
+    tree = InmemoryTree.init_from_entries([f'{i}'.encode() for i in
+        range(30)])
+    items = make_items(tree)
+    path = os.path.join(tmp_path, 'proofs')
+
+    assert write_proofs(path, items, binary=binary) == len(items)
+
+    decoded = list(read_proofs(path, binary=binary))
+    assert [(kind, first, second, proof.serialize()) for (kind, first,
+        second, proof) in decoded] == [(kind, first, second,
+            proof.serialize()) for (kind, first, second, proof) in items]
+    assert verify_many(read_proofs(path, binary=binary)) == \
+        bytearray([1] * 60)
+
+    with pytest.raises(ValueError):
+        write_proofs(os.path.join(tmp_path, 'other'), [('unknown',) +
+            items[0][1:]], binary=binary)
+
+    if binary:
+        with open(path, 'ab') as f:
+            f.write(b'\x20\x20')
+
+        with pytest.raises(ValueError):
+            list(read_proofs(path, binary=True))
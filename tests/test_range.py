@@ -0,0 +1,73 @@
+import pickle
+import pytest
+from tests.conftest import tree_and_index, tree_and_range
+
+from pymerkle import RangeProof, verify_range, InvalidChallenge, InvalidProof
+
+
+@pytest.mark.parametrize('tree, start, end', tree_and_range() +
+    [(tree, index - 1, tree.get_size()) for (tree, index) in tree_and_index()])
+def test_range_success(tree, start, end):
+    bases = tree._get_leaves(start, end - start)
+    proof = tree.prove_range(start, end)
+
+    verify_range(bases, tree.get_state(), proof)
+    verify_range(bases, tree.get_state(), RangeProof.deserialize(
+        proof.serialize()))
+    verify_range(bases, tree.get_state(), pickle.loads(pickle.dumps(proof)))
+
+    assert len(proof.path) <= 2 * tree.get_size().bit_length()
+
+
+@pytest.mark.parametrize('tree, start, end', tree_and_range(
+    default_config=True))
+def test_range_against_prior(tree, start, end):
+    for size in range(end, tree.get_size() + 1):
+        proof = tree.prove_range(start, end, size)
+        verify_range(tree._get_leaves(start, end - start),
+            tree.get_state(size), proof)
+
+
+@pytest.mark.parametrize('tree, start, end', tree_and_range(
+    default_config=True))
+def test_range_failure(tree, start, end):
+    bases = tree._get_leaves(start, end - start)
+    proof = tree.prove_range(start, end)
+    state = tree.get_state()
+
+    with pytest.raises(InvalidProof):
+        verify_range(bases[:-1], state, proof)
+
+    with pytest.raises(InvalidProof):
+        verify_range([tree.hash_buff(b'random')] + bases[1:], state, proof)
+
+    with pytest.raises(InvalidProof):
+        verify_range(bases, tree.hash_buff(b'random'), proof)
+
+    with pytest.raises(InvalidProof):
+        verify_range(bases, state, RangeProof(proof.algorithm,
+            proof.security, proof.size, proof.start, proof.end,
+            proof.path + [state]))
+
+    if proof.path:
+        with pytest.raises(InvalidProof):
+            verify_range(bases, state, RangeProof(proof.algorithm,
+                proof.security, proof.size, proof.start, proof.end,
+                proof.path[1:]))
+
+
+@pytest.mark.parametrize('tree, index', tree_and_index(default_config=True))
+def test_range_invalid_challenge(tree, index):
+    size = tree.get_size()
+
+    with pytest.raises(InvalidChallenge):
+        tree.prove_range(0, index, size + 1)
+
+    with pytest.raises(InvalidChallenge):
+        tree.prove_range(index, index)
+
+    with pytest.raises(InvalidChallenge):
+        tree.prove_range(0, size + 1)
+
+    with pytest.raises(InvalidChallenge):
+        tree.prove_range(-1, index)
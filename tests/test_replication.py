@@ -0,0 +1,151 @@
+import os
+import pytest
+
+from pymerkle import InmemoryTree, CompactTree, SqliteTree, MmapTree, \
+    TieredTree, PartitionedSqliteTree, InvalidProof, InvalidChallenge
+from pymerkle.replication import sync, find_divergence
+
+
+entries = [f'entry-{i:03}'.encode() for i in range(100)]
+
+
+@pytest.fixture
+def source(tmp_path):
+    tree = SqliteTree(os.path.join(tmp_path, 'source.db'))
+    tree.append_entries(entries)
+
+    yield tree
+
+    tree.close()
+
+
+@pytest.fixture(params=['inmemory', 'compact', 'sqlite', 'mmap',
+    'partitioned'])
+def destination(request, tmp_path):
+    if request.param == 'inmemory':
+        return InmemoryTree()
+
+    if request.param == 'compact':
+        return CompactTree()
+
+    if request.param == 'sqlite':
+        return SqliteTree(os.path.join(tmp_path, 'replica.db'))
+
+    if request.param == 'mmap':
+        return MmapTree(os.path.join(tmp_path, 'replica.bin'), fsync=False)
+
+    return PartitionedSqliteTree(os.path.join(tmp_path, 'replica'),
+        segment_size=8)
+
+
+@pytest.mark.parametrize('chunksize', [1, 7, 100])
+def test_sync(source, destination, chunksize):
+    assert sync(source, destination, size=30, chunksize=chunksize) == 30
+    assert destination.get_state() == source.get_state(30)
+
+    assert sync(source, destination, chunksize=chunksize) == 70
+    assert destination.get_state() == source.get_state()
+    assert destination.get_entries(0, 100) == entries
+
+    assert sync(source, destination) == 0
+
+
+def test_tampered_entry(source, destination):
+    sync(source, destination, size=20)
+
+    with source.con:
+        source.cur.execute('UPDATE leaf SET entry = ? WHERE id = ?',
+            (b'forged', 45))
+
+    with pytest.raises(InvalidProof):
+        sync(source, destination, chunksize=10)
+
+    assert destination.get_size() == 40
+
+
+def test_tampered_history(source, destination):
+    sync(source, destination, size=20)
+
+    forged = b'forged'
+    with source.con:
+        source.cur.execute('UPDATE leaf SET entry = ?, hash = ? WHERE id = ?',
+            (forged, source.hash_buff(forged), 5))
+
+    with pytest.raises(InvalidProof):
+        sync(source, destination)
+
+    assert destination.get_size() == 20
+
+
+def test_invalid_sync(source):
+    with pytest.raises(ValueError):
+        sync(source, InmemoryTree(disable_security=True))
+
+    with pytest.raises(ValueError):
+        sync(source, InmemoryTree(algorithm='sha512'))
+
+    destination = InmemoryTree.init_from_entries(entries[:50])
+    with pytest.raises(ValueError):
+        sync(source, destination, size=40)
+
+
+@pytest.mark.parametrize('offset, width', [(0, 100), (3, 5), (95, 10),
+    (100, 3), (7, 1), (0, 0)])
+def test_get_entries(tmp_path, offset, width):
+    trees = [InmemoryTree(), CompactTree(),
+        SqliteTree(os.path.join(tmp_path, 'merkle.db')),
+        MmapTree(os.path.join(tmp_path, 'merkle.bin'), fsync=False),
+        PartitionedSqliteTree(os.path.join(tmp_path, 'merkle'),
+            segment_size=8),
+        TieredTree(SqliteTree(':memory:'), budget=500)]
+
+    for tree in trees:
+        tree.append_entries(entries)
+        assert tree.get_entries(offset, width) == \
+            entries[offset: offset + width]
+
+
+@pytest.mark.parametrize('size', [1, 2, 13, 64, 100])
+def test_find_divergence(size):
+    tree = InmemoryTree.init_from_entries(entries)
+
+    for index in range(1, size + 1):
+        forged = entries[:index - 1] + [b'forged'] + entries[index:]
+        other = CompactTree.init_from_entries(forged)
+
+        assert find_divergence(tree, other, size) == index
+        assert find_divergence(other, tree, size) == index
+
+    assert find_divergence(tree, CompactTree.init_from_entries(
+        entries[:size])) is None
+
+
+def test_find_divergence_out_of_bounds():
+    tree = InmemoryTree.init_from_entries(entries)
+    other = CompactTree.init_from_entries(entries[:50])
+
+    assert find_divergence(tree, other, 50) is None
+
+    for size in (51, 100, 101):
+        with pytest.raises(InvalidChallenge):
+            find_divergence(tree, other, size)
+
+        with pytest.raises(InvalidChallenge):
+            find_divergence(other, tree, size)
+
+
+def test_find_divergence_oracle():
+    tree = InmemoryTree.init_from_entries(entries)
+    forged = entries[:70] + [b'forged'] + entries[71:]
+    other = CompactTree.init_from_entries(forged, threshold=1024)
+
+    calls = []
+    def oracle(offset, width):
+        calls.append((offset, width))
+        return other._get_subroot(offset, width)
+
+    assert find_divergence(tree, oracle) == 71
+    assert len(calls) <= 2 * 7
+
+    with pytest.raises(InvalidChallenge):
+        find_divergence(tree, oracle, size=101)
@@ -0,0 +1,143 @@
+import os
+import time
+import pytest
+
+from pymerkle import InmemoryTree, SqliteTree, CompactTree, ShardedLog, \
+    ShardedProof, InvalidChallenge, InvalidProof, verify_sharded_inclusion
+
+
+entries = [f'entry-{i:03}'.encode() for i in range(100)]
+
+
+def make_log(nr_shards=3, top=None, **kwargs):
+    shards = [CompactTree() for _ in range(nr_shards)]
+    return ShardedLog(shards, top or InmemoryTree(), **kwargs)
+
+
+def test_append_entries():
+    log = make_log()
+
+    locations = log.append_entries(entries)
+    assert len(locations) == len(entries)
+
+    for ((shard, index), data) in zip(locations, entries):
+        assert log.shards[shard].get_entry(index) == data
+
+    assert [tree.get_size() for tree in log.shards] == [34, 34, 32]
+    assert log.append_entry(b'foo') == (0, 35)
+    assert log.append_entry(b'bar') == (1, 35)
+    assert log.append_entry(b'baz', shard=1) == (1, 36)
+
+    log.close()
+
+
+def test_commit():
+    log = make_log()
+    assert log.commit() == 0
+
+    log.append_entries(entries[:10])
+    assert log.commit() == 3
+    assert log.commit() == 3
+
+    log.append_entry(b'foo', shard=2)
+    assert log.commit() == 4
+
+    log.close()
+    assert log.top.get_size() == 4
+
+
+def test_prove_inclusion():
+    log = make_log()
+    locations = log.append_entries(entries[:50])
+    log.commit()
+    state = log.get_state()
+
+    log.append_entries(entries[50:])
+    log.commit()
+
+    for ((shard, index), data) in zip(locations, entries):
+        proof = log.prove_inclusion(shard, index, size=3)
+        base = log.shards[shard].get_leaf(index)
+
+        verify_sharded_inclusion(base, state, proof)
+        verify_sharded_inclusion(base, state, ShardedProof.deserialize(
+            proof.serialize()))
+
+        proof = log.prove_inclusion(shard, index)
+        verify_sharded_inclusion(base, log.get_state(), proof)
+
+        with pytest.raises(InvalidProof):
+            verify_sharded_inclusion(base, log.get_state(), ShardedProof(
+                proof.shard, proof.size - 1, proof.state, proof.inclusion,
+                proof.commitment))
+
+        with pytest.raises(InvalidProof):
+            verify_sharded_inclusion(log.shards[shard].get_leaf(index + 1),
+                log.get_state(), proof)
+
+    log.close()
+
+
+def test_uncommitted():
+    log = make_log()
+    log.append_entries(entries[:30])
+
+    with pytest.raises(InvalidChallenge):
+        log.prove_inclusion(0, 1)
+
+    log.commit()
+    log.append_entry(b'foo', shard=0)
+
+    with pytest.raises(InvalidChallenge):
+        log.prove_inclusion(0, 11)
+
+    with pytest.raises(InvalidChallenge):
+        log.prove_inclusion(3, 1)
+
+    log.close()
+
+
+def test_periodic_commit():
+    log = make_log(interval=0.01)
+    log.append_entries(entries)
+
+    while log.top.get_size() < 3:
+        time.sleep(0.01)
+
+    log.close()
+    assert log.top.get_size() == 3
+
+
+def test_reopen(tmp_path):
+    def open_log():
+        shards = [SqliteTree(os.path.join(tmp_path, f'shard-{k}.db')) for k in
+            range(2)]
+        top = SqliteTree(os.path.join(tmp_path, 'top.db'))
+        return ShardedLog(shards, top)
+
+    with open_log() as log:
+        log.append_entries(entries)
+
+    with open_log() as log:
+        assert [commits[-1][1] for commits in log.commits] == [50, 50]
+
+        proof = log.prove_inclusion(1, 7)
+        verify_sharded_inclusion(log.shards[1].get_leaf(7), log.get_state(),
+            proof)
+
+
+@pytest.mark.parametrize('top', ['inmemory', 'compact'])
+def test_reopen_in_memory_top(top):
+    top = InmemoryTree() if top == 'inmemory' else CompactTree()
+    shards = [CompactTree() for _ in range(2)]
+
+    with ShardedLog(shards, top) as log:
+        log.append_entries(entries)
+
+    state = top.get_state()
+    with ShardedLog(shards, top) as log:
+        assert [commits[-1][1] for commits in log.commits] == [50, 50]
+        assert log.get_state() == state
+
+        proof = log.prove_inclusion(0, 7)
+        verify_sharded_inclusion(log.shards[0].get_leaf(7), state, proof)
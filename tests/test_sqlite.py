@@ -0,0 +1,155 @@
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from threading import Thread
+import pytest
+
+from pymerkle import SqliteTree, verify_inclusion
+
+
+pragmas = {'journal_mode': 'WAL', 'synchronous': 'NORMAL',
+           'mmap_size': 1 << 24, 'cache_size': -4096, 'page_size': 8192,
+           'temp_store': 'MEMORY'}
+
+
+@pytest.fixture
+def dbfile(tmp_path):
+    return os.path.join(tmp_path, 'merkle.db')
+
+
+def test_pragmas(dbfile):
+    with SqliteTree(dbfile, pragmas=pragmas) as tree:
+        tree.append_entries([b'foo', b'bar', b'baz'])
+
+        assert tree.con.execute('PRAGMA journal_mode').fetchone() == 'wal'
+        assert tree.con.execute('PRAGMA page_size').fetchone() == 8192
+
+        cur = tree._get_cursor()
+        assert cur.connection is not tree.con
+        assert cur.execute('PRAGMA cache_size').fetchone() == -4096
+        assert cur.execute('PRAGMA temp_store').fetchone() == 2
+
+
+@pytest.mark.parametrize('pragma', [{'foreign_keys': 'ON'},
+                                    {'journal_mode': 'WAL; DROP TABLE leaf'}])
+def test_invalid_pragmas(dbfile, pragma):
+    with pytest.raises(ValueError):
+        SqliteTree(dbfile, pragmas=pragma)
+
+
+def test_readers_see_appends(dbfile):
+    with SqliteTree(dbfile, pragmas=pragmas) as tree:
+        assert tree.get_size() == 0
+
+        tree.append_entry(b'foo')
+        assert tree.get_size() == 1
+        assert tree.get_leaf(1) == tree.hash_buff(b'foo')
+
+
+def test_readonly_readers(dbfile):
+    with SqliteTree(dbfile) as tree:
+        tree.append_entry(b'foo')
+
+        cur = tree._get_cursor()
+        with pytest.raises(sqlite3.OperationalError):
+            cur.execute('DELETE FROM leaf')
+
+
+def test_concurrent_proofs(dbfile):
+    entries = [f'entry-{i}'.encode() for i in range(300)]
+
+    with SqliteTree(dbfile, pragmas=pragmas, threshold=4) as tree:
+        tree.append_entries(entries)
+        state = tree.get_state()
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            proofs = list(executor.map(tree.prove_inclusion,
+                range(1, len(entries) + 1)))
+
+        for index, proof in enumerate(proofs, start=1):
+            verify_inclusion(tree.get_leaf(index), state, proof)
+
+        assert len(tree.readers) > 1
+
+
+def test_short_lived_threads(dbfile):
+    entries = [f'entry-{i}'.encode() for i in range(100)]
+
+    with SqliteTree(dbfile, pool_size=2) as tree:
+        tree.append_entries(entries)
+
+        for index in range(1, 301):
+            thread = Thread(target=tree.prove_inclusion,
+                args=(1 + index % len(entries),))
+            thread.start()
+            thread.join()
+
+        assert len(tree.readers) <= 2
+        assert len(tree.idle) <= 2
+
+        threads = [Thread(target=tree.prove_inclusion, args=(index,)) for
+            index in range(1, 33)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(tree.readers) <= 2
+        verify_inclusion(tree.get_leaf(42), tree.get_state(),
+            tree.prove_inclusion(42))
+
+
+@pytest.mark.parametrize('mode', ['readonly', 'immutable'])
+def test_readonly_mode(dbfile, mode):
+    with SqliteTree(dbfile) as writer:
+        writer.append_entries([b'foo', b'bar', b'baz'])
+
+        with SqliteTree(dbfile, **{mode: True}) as tree:
+            assert tree.get_size() == 3
+            assert tree.get_state() == writer.get_state()
+            assert tree.get_entry(2) == b'bar'
+
+            with pytest.raises(sqlite3.OperationalError):
+                tree.append_entry(b'qux')
+
+            with pytest.raises(sqlite3.OperationalError):
+                tree.append_entries([b'qux'])
+
+
+def test_readonly_nonexistent(dbfile):
+    with pytest.raises(sqlite3.OperationalError):
+        SqliteTree(dbfile, readonly=True).get_size()
+
+    assert not os.path.exists(dbfile)
+
+
+def test_readonly_in_memory():
+    with pytest.raises(ValueError):
+        SqliteTree(':memory:', readonly=True)
+
+
+def test_readonly_polling(dbfile):
+    with SqliteTree(dbfile, pragmas={'journal_mode': 'WAL'}) as writer:
+        writer.append_entries([b'foo', b'bar'])
+
+        with SqliteTree(dbfile, readonly=True) as tree:
+            assert tree.get_size() == 2
+
+            writer.append_entry(b'baz')
+            assert tree.get_size() == 3
+            assert tree.get_state() == writer.get_state()
+
+
+def test_snapshot(dbfile):
+    with SqliteTree(dbfile, pragmas={'journal_mode': 'WAL'}) as writer:
+        writer.append_entries([b'foo', b'bar'])
+
+        with SqliteTree(dbfile, readonly=True) as tree:
+            with tree.snapshot():
+                size = tree.get_size()
+                writer.append_entries([b'baz', b'qux'])
+
+                assert tree.get_size() == size
+                assert tree.get_state() == writer.get_state(size)
+
+            assert tree.get_size() == 4
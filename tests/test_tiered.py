@@ -0,0 +1,107 @@
+import os
+import time
+import pytest
+
+from pymerkle import InmemoryTree, SqliteTree, MmapTree, TieredTree
+
+
+entries = [f'entry-{i:03}'.encode() for i in range(300)]
+
+reference = InmemoryTree.init_from_entries(entries)
+
+
+@pytest.fixture(params=['sqlite', 'mmap'])
+def cold(request, tmp_path):
+    if request.param == 'sqlite':
+        return SqliteTree(os.path.join(tmp_path, 'merkle.db'))
+
+    return MmapTree(os.path.join(tmp_path, 'merkle.bin'), fsync=False)
+
+
+@pytest.mark.parametrize('disable_async', [True, False])
+def test_stitching(cold, disable_async):
+    tree = TieredTree(cold, budget=1000, threshold=4,
+        disable_async=disable_async)
+
+    for data in entries[:100]:
+        tree.append_entry(data)
+    tree.append_entries(entries[100:])
+
+    if not disable_async:
+        tree._spill(tree.budget // 2)
+
+    info = tree.get_spill_info()
+    assert info.size <= info.budget
+    assert info.hot + info.cold == len(entries)
+    assert info.cold > 0 and info.spills > 0
+
+    start = info.cold
+    assert tree._get_leaves(start - 3, 6) == \
+        reference._get_leaves(start - 3, 6)
+    assert tree.get_entry(start) == entries[start - 1]
+    assert tree.get_entry(start + 1) == entries[start]
+
+    for size in (1, start, start + 1, len(entries)):
+        assert tree.get_state(size) == reference.get_state(size)
+
+    for index in (1, start, start + 1, len(entries)):
+        assert tree.prove_inclusion(index).serialize() == \
+            reference.prove_inclusion(index).serialize()
+
+    tree.close()
+
+
+def test_flush_and_reopen(tmp_path):
+    path = os.path.join(tmp_path, 'merkle.bin')
+
+    with TieredTree(MmapTree(path), budget=1 << 20) as tree:
+        tree.append_entries(entries[:200])
+        assert tree.get_spill_info().cold == 0
+
+    with TieredTree(MmapTree(path), budget=1 << 20) as tree:
+        info = tree.get_spill_info()
+        assert (info.hot, info.cold) == (0, 200)
+
+        tree.append_entries(entries[200:])
+        assert tree.get_state() == reference.get_state()
+
+    with MmapTree(path) as tree:
+        assert tree.get_state() == reference.get_state()
+
+
+def test_hashing_configuration(cold):
+    cold.close()
+
+    cold = SqliteTree(':memory:', algorithm='sha512', disable_security=True)
+    tree = TieredTree(cold)
+    assert (tree.algorithm, tree.security) == ('sha512', False)
+
+
+@pytest.mark.parametrize('disable_async', [True, False])
+def test_spill_error(disable_async):
+    cold = SqliteTree(':memory:')
+    tree = TieredTree(cold, budget=100, disable_async=disable_async)
+
+    def fail(entries, digests):
+        raise OSError('disk full')
+
+    cold._store_leaves = fail
+    assert tree.append_entries(entries[:10]) == 10
+
+    while tree.error is None:
+        time.sleep(0.01)
+
+    with pytest.raises(OSError):
+        tree.append_entries(entries[10:20])
+
+    assert tree.get_size() == 10
+    assert tree.get_state() == reference.get_state(10)
+
+    closed = []
+    close = cold.close
+    cold.close = lambda: closed.append(close())
+
+    with pytest.raises(OSError):
+        tree.close()
+
+    assert closed